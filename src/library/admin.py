@@ -1,6 +1,8 @@
 from django.contrib import admin
 
 from .models import Book, Author, Borrow
+from lms.utils.admin import CatalogAdmin
 
 
-admin.site.register([Book, Author, Borrow])
+admin.site.register([Book, Author], CatalogAdmin)
+admin.site.register(Borrow)
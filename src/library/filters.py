@@ -0,0 +1,101 @@
+import json
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, Q, QuerySet
+from rest_framework import serializers
+
+from .models import SEARCH_CONFIG, Author, Book
+
+
+def _parse_bool(name, value):
+    lowered = value.lower()
+    if lowered in ("true", "1"):
+        return True
+    if lowered in ("false", "0"):
+        return False
+    raise serializers.ValidationError({name: ["Must be 'true' or 'false'."]})
+
+
+def search_query(params) -> Optional[SearchQuery]:
+    """The full-text query of the ``q`` param, if there is one."""
+    q = params.get("q", "").strip()
+    if not q:
+        return None
+    return SearchQuery(q, config=SEARCH_CONFIG, search_type="websearch")
+
+
+def filter_books(queryset: QuerySet, params) -> QuerySet:
+    """
+    Apply the catalog query params to a ``Book`` queryset.
+
+    ``q`` runs a full-text search over title, publisher, genre and author
+    names; ``arank_search`` orders the matches by relevance. ``genre``,
+    ``publisher``, ``author`` (id or name) and ``available`` are exact
+    filters.
+    """
+    genre = params.get("genre")
+    if genre:
+        queryset = queryset.filter(genre__iexact=genre)
+
+    publisher = params.get("publisher")
+    if publisher:
+        queryset = queryset.filter(publisher__iexact=publisher)
+
+    author = params.get("author")
+    if author:
+        if author.isdigit():
+            authors = Author.objects.filter(pk=int(author))
+        else:
+            authors = Author.objects.filter(
+                Q(first_name__iexact=author) | Q(last_name__iexact=author)
+            )
+        queryset = queryset.filter(
+            pk__in=Book.authors.through.objects.filter(author__in=authors).values(
+                "book_id"
+            )
+        )
+
+    available = params.get("available")
+    if available:
+        if _parse_bool("available", available):
+            queryset = queryset.filter(is_available=True, quantity__gt=0)
+        else:
+            queryset = queryset.filter(Q(is_available=False) | Q(quantity__lte=0))
+
+    query = search_query(params)
+    if query is not None:
+        queryset = queryset.filter(search_vector=query)
+
+    return queryset
+
+
+# A broad term has at least this many matches among the newest books in the
+# catalog, so listing its matches newest first finds a page within a few
+# thousand rows of the created_at index.
+RECENT_BOOKS = 1500
+RECENT_MATCHES = 5
+
+
+async def arank_search(queryset: QuerySet, query: SearchQuery) -> Optional[QuerySet]:
+    """
+    ``queryset``, a search for ``query``, by relevance and newest first among
+    equals, or None for a broad term, best left in the queryset's newest
+    first order.
+
+    Ranking reads the search vector of every match, so terms the planner
+    expects to match more than ``SEARCH_RANK_LIMIT`` books are broad. The
+    estimate is checked against the newest books before it is trusted: for
+    words that never occur together it can be far too high, and walking the
+    created_at index for matches that are not there reads the whole catalog.
+    """
+    plan = json.loads(await queryset.order_by().aexplain(format="json"))
+    if plan[0]["Plan"]["Plan Rows"] > settings.SEARCH_RANK_LIMIT:
+        newest = Book.objects.filter(is_deleted=False).order_by("-created_at", "-pk")
+        recent = queryset.order_by().filter(pk__in=newest.values("pk")[:RECENT_BOOKS])
+        if await recent[:RECENT_MATCHES].acount() == RECENT_MATCHES:
+            return None
+    return queryset.annotate(rank=SearchRank(F("search_vector"), query)).order_by(
+        "-rank", "-created_at", "-pk"
+    )
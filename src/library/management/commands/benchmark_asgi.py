@@ -0,0 +1,284 @@
+import asyncio
+import importlib.util
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from library.models import Book
+
+SERVERS = ("wsgi", "asgi")
+HOST = "127.0.0.1"
+
+
+def percentile(values, percent):
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare a WSGI server (gunicorn with gthread workers) with an ASGI "
+        "server (uvicorn) under many concurrent connections, 1000 by default. "
+        "Each server runs this project with the current settings and the API "
+        "cache off; every request opens a connection of its own. Needs "
+        "gunicorn and uvicorn installed. Run with settings that turn DEBUG "
+        "off, since DEBUG keeps every query in memory. Reads only, against "
+        "the configured database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--connections",
+            type=int,
+            default=1000,
+            help="Connections open at once",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=3000,
+            help="Timed requests per endpoint and server",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=300,
+            help="Untimed requests per endpoint and server before timing",
+        )
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            help=(
+                "Endpoint to request, repeatable; the book list and the "
+                "detail of the first book by default"
+            ),
+        )
+        parser.add_argument(
+            "--servers",
+            default=",".join(SERVERS),
+            help="Comma separated servers out of " + ", ".join(SERVERS),
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Worker processes of either server",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=64,
+            help="Threads per gunicorn worker",
+        )
+        parser.add_argument(
+            "--port",
+            type=int,
+            default=8766,
+            help="Port the servers listen on",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=60,
+            help="Seconds before a request counts as failed",
+        )
+
+    def handle(self, *args, **options):
+        servers = options["servers"].split(",")
+        if unknown := set(servers) - set(SERVERS):
+            raise CommandError(f"Unknown servers: {', '.join(sorted(unknown))}.")
+        for server, module in (("wsgi", "gunicorn"), ("asgi", "uvicorn")):
+            if server in servers and importlib.util.find_spec(module) is None:
+                raise CommandError(f"{module} is not installed.")
+        if options["requests"] < 2:
+            raise CommandError("--requests must be at least 2.")
+        paths = options["paths"]
+        if paths is None:
+            book_id = Book.objects.values_list("pk", flat=True).order_by("pk").first()
+            if book_id is None:
+                raise CommandError("No books to request; run seed_data first.")
+            paths = [
+                "/api/v1/books/?limit=10&reviews=none",
+                f"/api/v1/books/{book_id}/",
+            ]
+
+        # The load generator holds a socket per connection.
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        wanted = 2 * options["connections"] + 256
+        if soft != resource.RLIM_INFINITY and soft < wanted:
+            if hard != resource.RLIM_INFINITY and hard < wanted:
+                raise CommandError(
+                    f"{options['connections']} connections need {wanted} open "
+                    f"files; the limit is {hard}."
+                )
+            resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+
+        self.stdout.write(
+            f"{options['requests']} requests over {options['connections']} "
+            f"concurrent connections, {options['workers']} worker(s)"
+        )
+        self.stdout.write(
+            f"  {'server':<8}{'endpoint':<42}{'ok':>7}{'errors':>8}{'rps':>8}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        )
+        results = {}
+        for server in servers:
+            with self.serve(server, options):
+                for path in paths:
+                    self.load(path, options, options["warmup"])
+                    result = self.load(path, options, options["requests"])
+                    results[server, path] = result
+                    latencies = result["latencies"] or [0, 0]
+                    self.stdout.write(
+                        f"  {server:<8}{path:<42}{len(result['latencies']):>7}"
+                        f"{result['errors']:>8}{result['rps']:>8.1f}"
+                        f"{percentile(latencies, 50):>9.0f}"
+                        f"{percentile(latencies, 95):>9.0f}"
+                        f"{percentile(latencies, 99):>9.0f}"
+                    )
+
+        if len(servers) == 2:
+            for path in paths:
+                wsgi, asgi = results["wsgi", path], results["asgi", path]
+                if wsgi["rps"]:
+                    self.stdout.write(
+                        f"{path}: ASGI serves {asgi['rps'] / wsgi['rps']:.2f}x "
+                        f"the requests per second of WSGI"
+                    )
+
+    def command_line(self, server, options):
+        if server == "wsgi":
+            return [
+                sys.executable,
+                "-m",
+                "gunicorn",
+                "lms.wsgi",
+                "--bind",
+                f"{HOST}:{options['port']}",
+                "--workers",
+                str(options["workers"]),
+                "--worker-class",
+                "gthread",
+                "--threads",
+                str(options["threads"]),
+                "--backlog",
+                str(options["connections"] * 2),
+                "--log-level",
+                "warning",
+            ]
+        return [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "lms.asgi:application",
+            "--host",
+            HOST,
+            "--port",
+            str(options["port"]),
+            "--workers",
+            str(options["workers"]),
+            "--backlog",
+            str(options["connections"] * 2),
+            "--log-level",
+            "warning",
+        ]
+
+    @contextmanager
+    def serve(self, server, options):
+        """Run ``server`` in a subprocess, once it answers requests."""
+        env = dict(os.environ, API_CACHE_TIMEOUT="0")
+        env["PYTHONPATH"] = os.pathsep.join(
+            filter(None, [str(settings.BASE_DIR), env.get("PYTHONPATH")])
+        )
+        with tempfile.TemporaryFile() as log:
+            process = subprocess.Popen(
+                self.command_line(server, options),
+                cwd=settings.BASE_DIR,
+                env=env,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+            try:
+                self.wait_until_ready(process, options)
+            except CommandError:
+                self.stop(process)
+                log.seek(0)
+                output = log.read().decode(errors="replace")
+                raise CommandError(f"The {server} server did not start:\n{output}")
+            try:
+                yield
+            finally:
+                self.stop(process)
+
+    def wait_until_ready(self, process, options):
+        url = f"http://{HOST}:{options['port']}/api/v1/books/?limit=1"
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline and process.poll() is None:
+            try:
+                urllib.request.urlopen(url, timeout=5).read()
+                return
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.2)
+        raise CommandError("Server did not start.")
+
+    def stop(self, process):
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def load(self, path, options, total):
+        """
+        Send ``total`` GETs of ``path`` from ``--connections`` clients at once,
+        each request on a new connection.
+        """
+        request = (
+            f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n"
+        ).encode()
+        latencies = []
+        errors = 0
+        remaining = total
+
+        async def client():
+            nonlocal errors, remaining
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                try:
+                    reader, writer = await asyncio.open_connection(
+                        HOST, options["port"]
+                    )
+                    writer.write(request)
+                    await writer.drain()
+                    response = await asyncio.wait_for(reader.read(), options["timeout"])
+                    writer.close()
+                except (OSError, asyncio.TimeoutError):
+                    errors += 1
+                    continue
+                if response.startswith(b"HTTP/1.1 200"):
+                    latencies.append((time.perf_counter() - started) * 1000)
+                else:
+                    errors += 1
+
+        async def run():
+            await asyncio.gather(*(client() for _ in range(options["connections"])))
+
+        started = time.perf_counter()
+        asyncio.run(run())
+        elapsed = time.perf_counter() - started
+        return {
+            "latencies": latencies,
+            "errors": errors,
+            "rps": len(latencies) / elapsed,
+        }
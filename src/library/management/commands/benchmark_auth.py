@@ -0,0 +1,138 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from library.models import Book
+from rest_framework_simplejwt.tokens import AccessToken
+from users.authentication import forget_user
+from users.models import User
+from users.tokens import UserRefreshToken
+
+# lookup: a token without the user claims and no user cache, so every request
+# reads the user row, as every request did before the claims were added.
+# cached: the same token with the per-process user cache.
+# claims: a token carrying the claims; permissions are checked from it alone.
+MODES = ("lookup", "cached", "claims")
+
+
+def percentile(values, percent):
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare authenticated GETs per second when every request reads the "
+        "user row, when it comes from the per-process user cache and when "
+        "the token claims answer the permission check. Reads only, against "
+        "the configured database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=2000,
+            help="Timed requests per mode",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=50,
+            help="Untimed requests per mode before timing",
+        )
+        parser.add_argument(
+            "--path",
+            help=(
+                "Endpoint to request as a librarian; a one row page of the "
+                "borrows of the first book by default"
+            ),
+        )
+        parser.add_argument(
+            "--modes",
+            default=",".join(MODES),
+            help="Comma separated modes out of " + ", ".join(MODES),
+        )
+
+    def handle(self, *args, **options):
+        modes = options["modes"].split(",")
+        if unknown := set(modes) - set(MODES):
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}.")
+        if options["requests"] < 2:
+            raise CommandError("--requests must be at least 2.")
+        librarian = (
+            User.objects.filter(role=User.Roles.LIBRARIAN, is_active=True)
+            .order_by("pk")
+            .first()
+        )
+        if librarian is None:
+            raise CommandError("No librarian to sign in as; run seed_data first.")
+        path = options["path"]
+        if path is None:
+            book_id = Book.objects.values_list("pk", flat=True).order_by("pk").first()
+            if book_id is None:
+                raise CommandError("No books to request; run seed_data first.")
+            path = f"/api/v1/books/{book_id}/borrow/?fields=id&limit=1"
+
+        self.stdout.write(f"GET {path}, {options['requests']} requests per mode")
+        self.stdout.write(
+            f"  {'mode':<10}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'user queries/req':>18}"
+        )
+        results = {}
+        for mode in modes:
+            results[mode] = self.run_mode(mode, librarian, path, options)
+            result = results[mode]
+            self.stdout.write(
+                f"  {mode:<10}{result['rps']:>9.0f}{result['p50_ms']:>9.2f}"
+                f"{result['p95_ms']:>9.2f}{result['user_queries']:>18}"
+            )
+
+        if "lookup" in results:
+            baseline = results["lookup"]["rps"]
+            for mode, result in results.items():
+                if mode != "lookup":
+                    self.stdout.write(
+                        f"{mode}: {result['rps'] / baseline:.2f}x the requests "
+                        f"per second of reading the user row every time"
+                    )
+
+    def run_mode(self, mode, librarian, path, options):
+        if mode == "claims":
+            token = UserRefreshToken.for_user(librarian).access_token
+        else:
+            token = AccessToken.for_user(librarian)
+        ttl = 0 if mode == "lookup" else settings.USER_CACHE_TTL
+        client = Client(HTTP_HOST="localhost", HTTP_AUTHORIZATION=f"Bearer {token}")
+        forget_user(librarian.pk)
+        latencies = []
+        with override_settings(API_CACHE_TIMEOUT=0, USER_CACHE_TTL=ttl):
+            for _ in range(options["warmup"]):
+                self.get(client, path)
+            with CaptureQueriesContext(connection) as queries:
+                self.get(client, path)
+            user_queries = sum(
+                'FROM "users"' in query["sql"] for query in queries.captured_queries
+            )
+            started = time.perf_counter()
+            for _ in range(options["requests"]):
+                request_started = time.perf_counter()
+                self.get(client, path)
+                latencies.append((time.perf_counter() - request_started) * 1000)
+            elapsed = time.perf_counter() - started
+        forget_user(librarian.pk)
+
+        return {
+            "rps": options["requests"] / elapsed,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "user_queries": user_queries,
+        }
+
+    def get(self, client, path):
+        response = client.get(path)
+        if response.status_code != 200:
+            raise CommandError(f"GET {path} answered {response.status_code}.")
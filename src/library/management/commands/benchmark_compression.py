@@ -0,0 +1,82 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from lms.middleware import brotli, compress
+from users.models import User
+from users.tokens import UserRefreshToken
+
+ENDPOINTS = [
+    "/api/v1/books/?limit=100",
+    "/api/v1/books/?limit=100&reviews=top3",
+    "/api/v1/review/?limit=100",
+    "/api/v1/borrow/?limit=100",
+    "/api/v1/user/all/?limit=100",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetch the largest list endpoints and report the bytes saved and the "
+        "CPU time spent compressing each of them with gzip and Brotli"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Compressions per body; the average time is reported",
+        )
+        parser.add_argument(
+            "--gzip-levels",
+            default="1,6,9",
+            help="Comma separated gzip levels to try",
+        )
+        parser.add_argument(
+            "--brotli-qualities",
+            default="1,4,6,11",
+            help="Comma separated Brotli qualities to try",
+        )
+
+    def handle(self, *args, **options):
+        admin = User.objects.filter(is_superuser=True, is_active=True).first()
+        if admin is None:
+            raise CommandError("An active superuser is needed; run seed_data.")
+        token = UserRefreshToken.for_user(admin).access_token
+        client = Client(HTTP_HOST="localhost", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        settings_to_try = [
+            ("gzip", f"level {level}", {"COMPRESSION_GZIP_LEVEL": int(level)})
+            for level in options["gzip_levels"].split(",")
+        ]
+        if brotli is not None:
+            settings_to_try += [
+                ("br", f"q {quality}", {"COMPRESSION_BROTLI_QUALITY": int(quality)})
+                for quality in options["brotli_qualities"].split(",")
+            ]
+        else:
+            self.stdout.write("brotli is not installed, only gzip is measured.")
+
+        for url in ENDPOINTS:
+            response = client.get(url, HTTP_ACCEPT="application/json")
+            if response.status_code != 200:
+                raise CommandError(f"{url} returned {response.status_code}")
+            body = response.content
+            self.stdout.write(f"\n{url}  {len(body)} bytes")
+            self.stdout.write(
+                f"  {'encoding':<14}{'bytes':>10}{'saved':>9}{'ms':>9}{'MB/s':>9}"
+            )
+            for encoding, label, overrides in settings_to_try:
+                with override_settings(**overrides):
+                    started = time.perf_counter()
+                    for _ in range(options["repeat"]):
+                        compressed = compress(body, encoding)
+                    elapsed = (time.perf_counter() - started) / options["repeat"]
+                saved = 1 - len(compressed) / len(body)
+                self.stdout.write(
+                    f"  {encoding + ' ' + label:<14}{len(compressed):>10}"
+                    f"{saved:>9.1%}{1000 * elapsed:>9.2f}"
+                    f"{len(body) / elapsed / 1e6:>9.1f}"
+                )
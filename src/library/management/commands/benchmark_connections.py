@@ -0,0 +1,163 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import override_settings
+from library.models import Book
+
+MODES = ("connect", "persistent", "pool")
+
+
+def percentile(values, percent):
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request latency of a short endpoint with a new database "
+        "connection per request, persistent connections and a connection "
+        "pool, and how long getting a connection takes in each mode. Reads "
+        "only, against the configured database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Timed requests per mode",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=10,
+            help="Untimed requests per mode before timing",
+        )
+        parser.add_argument(
+            "--path",
+            help="Endpoint to request; the detail of the first book by default",
+        )
+        parser.add_argument(
+            "--modes",
+            default=",".join(MODES),
+            help="Comma separated modes out of " + ", ".join(MODES),
+        )
+
+    def handle(self, *args, **options):
+        modes = options["modes"].split(",")
+        if unknown := set(modes) - set(MODES):
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}.")
+        if options["requests"] < 2:
+            raise CommandError("--requests must be at least 2.")
+        path = options["path"]
+        if path is None:
+            book_id = Book.objects.values_list("pk", flat=True).order_by("pk").first()
+            if book_id is None:
+                raise CommandError("No books to request; run seed_data first.")
+            path = f"/api/v1/books/{book_id}/"
+
+        settings_dict = connection.settings_dict
+        saved = {
+            "CONN_MAX_AGE": settings_dict["CONN_MAX_AGE"],
+            "OPTIONS": dict(settings_dict["OPTIONS"]),
+        }
+        # True is psycopg's defaults, when the settings configure no pool.
+        pool_options = saved["OPTIONS"].get("pool") or True
+
+        opened = []
+        connection_created.connect(
+            lambda sender, connection, **kwargs: opened.append(connection.alias),
+            weak=False,
+            dispatch_uid="benchmark_connections",
+        )
+        self.stdout.write(f"GET {path}, {options['requests']} requests per mode")
+        self.stdout.write(
+            f"  {'mode':<12}{'p50 ms':>9}{'p95 ms':>9}{'mean ms':>9}"
+            f"{'connect ms':>12}{'connects/req':>14}"
+        )
+        results = {}
+        try:
+            for mode in modes:
+                self.configure(mode, saved, pool_options)
+                results[mode] = self.run_mode(path, options, opened)
+                result = results[mode]
+                connect = (
+                    "-"
+                    if result["connect_ms"] is None
+                    else f"{result['connect_ms']:.2f}"
+                )
+                self.stdout.write(
+                    f"  {mode:<12}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                    f"{result['mean_ms']:>9.2f}{connect:>12}"
+                    f"{result['opened']:>14.2f}"
+                )
+        finally:
+            connection_created.disconnect(dispatch_uid="benchmark_connections")
+            connection.close()
+            connection.close_pool()
+            settings_dict["CONN_MAX_AGE"] = saved["CONN_MAX_AGE"]
+            settings_dict["OPTIONS"] = saved["OPTIONS"]
+
+        if "connect" in results:
+            baseline = results["connect"]["p50_ms"]
+            for mode, result in results.items():
+                if mode != "connect":
+                    self.stdout.write(
+                        f"{mode}: {baseline - result['p50_ms']:.2f} ms less per "
+                        f"request at p50 than connecting every time"
+                    )
+
+    def configure(self, mode, saved, pool_options):
+        """Switch the default connection to ``mode`` from a clean state."""
+        connection.close()
+        connection.close_pool()
+        settings_dict = connection.settings_dict
+        options = {
+            key: value for key, value in saved["OPTIONS"].items() if key != "pool"
+        }
+        if mode == "pool":
+            options["pool"] = pool_options
+        settings_dict["OPTIONS"] = options
+        settings_dict["CONN_MAX_AGE"] = 600 if mode == "persistent" else 0
+
+    def run_mode(self, path, options, opened):
+        client = Client(HTTP_HOST="localhost")
+        latencies = []
+        # Every request does its queries instead of reading the API cache.
+        with override_settings(API_CACHE_TIMEOUT=0):
+            for i in range(options["warmup"] + options["requests"]):
+                if i == options["warmup"]:
+                    opened.clear()
+                started = time.perf_counter()
+                response = client.get(path)
+                # The test client keeps connections open across requests; a
+                # server closes or returns them when the request finishes.
+                close_old_connections()
+                elapsed = time.perf_counter() - started
+                if response.status_code != 200:
+                    raise CommandError(f"GET {path} answered {response.status_code}.")
+                if i >= options["warmup"]:
+                    latencies.append(elapsed * 1000)
+
+        opened_per_request = len(opened) / len(latencies)
+
+        connects = []
+        if connection.settings_dict["CONN_MAX_AGE"] == 0:
+            # Getting a connection on its own: a new one, or one out of the pool.
+            for _ in range(options["requests"]):
+                connection.close()
+                started = time.perf_counter()
+                connection.ensure_connection()
+                connects.append((time.perf_counter() - started) * 1000)
+            connection.close()
+
+        return {
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "mean_ms": statistics.mean(latencies),
+            "connect_ms": statistics.median(connects) if connects else None,
+            "opened": opened_per_request,
+        }
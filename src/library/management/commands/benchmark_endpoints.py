@@ -0,0 +1,523 @@
+import gc
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+from library.models import Book, Borrow
+from reviews.models import BookReview
+from users.models import User
+from users.tokens import UserRefreshToken
+
+# Timestamps of generated rows end here so every run builds the same data.
+DATASET_END = "2025-12-31"
+BULK_SIZE = 5
+AUTHOR = {
+    "first_name": "Laxmi Prasad",
+    "last_name": "Devkota",
+    "address": "Kathmandu",
+    "country": "Nepal",
+}
+
+# (label, method, role, request) for every route of the users, library and
+# reviews apps. ``request(fixtures, i)`` returns the path and body of the
+# i-th request; write endpoints take a different row each time.
+ENDPOINTS = [
+    (
+        "POST user/register/",
+        "POST",
+        None,
+        lambda f, i: (
+            "/api/v1/user/register/",
+            {
+                "email": f"bench-{f.size}-{i}@example.com",
+                "password": "password123",
+                "first_name": "Bench",
+                "last_name": "User",
+            },
+        ),
+    ),
+    (
+        "POST user/login/",
+        "POST",
+        None,
+        lambda f, i: (
+            "/api/v1/user/login/",
+            {"email": f.users[i][1], "password": "password123"},
+        ),
+    ),
+    (
+        "POST token/refresh/",
+        "POST",
+        None,
+        lambda f, i: ("/api/v1/token/refresh/", {"refresh_token": f.refresh_token}),
+    ),
+    (
+        "PATCH user/<id>/",
+        "PATCH",
+        "admin",
+        lambda f, i: (f"/api/v1/user/{f.users[i][0]}/", {"address": "Pokhara"}),
+    ),
+    (
+        "GET user/all/",
+        "GET",
+        "admin",
+        lambda f, i: ("/api/v1/user/all/?limit=20", None),
+    ),
+    ("GET user/export/", "GET", "admin", lambda f, i: ("/api/v1/user/export/", None)),
+    ("GET books/", "GET", "user", lambda f, i: ("/api/v1/books/?limit=20", None)),
+    (
+        "GET books/ reviews=none",
+        "GET",
+        "user",
+        lambda f, i: ("/api/v1/books/?limit=20&reviews=none", None),
+    ),
+    (
+        "GET books/ q=",
+        "GET",
+        "user",
+        lambda f, i: ("/api/v1/books/?limit=20&q=silent%20river", None),
+    ),
+    (
+        "POST books/",
+        "POST",
+        "librarian",
+        lambda f, i: (
+            "/api/v1/books/",
+            {
+                "title": f"Benchmark Book {f.size}-{i}",
+                "quantity": 3,
+                "publisher": "FinePrint",
+                "genre": "Fiction",
+                "authors": [AUTHOR],
+            },
+        ),
+    ),
+    (
+        "GET books/export/",
+        "GET",
+        "librarian",
+        lambda f, i: ("/api/v1/books/export/", None),
+    ),
+    (
+        "GET books/<id>/",
+        "GET",
+        "user",
+        lambda f, i: (f"/api/v1/books/{f.popular(i)}/", None),
+    ),
+    (
+        "PATCH books/<id>/",
+        "PATCH",
+        "librarian",
+        lambda f, i: (f"/api/v1/books/{f.popular(i)}/", {"genre": "Fiction"}),
+    ),
+    (
+        "DELETE books/<id>/",
+        "DELETE",
+        "librarian",
+        lambda f, i: (f"/api/v1/books/{f.delete_books[i]}/", None),
+    ),
+    (
+        "GET books/<id>/borrow/",
+        "GET",
+        "librarian",
+        lambda f, i: (f"/api/v1/books/{f.popular(i)}/borrow/?limit=20", None),
+    ),
+    ("GET borrow/", "GET", "admin", lambda f, i: ("/api/v1/borrow/?limit=20", None)),
+    (
+        "POST borrow/",
+        "POST",
+        "librarian",
+        lambda f, i: (
+            "/api/v1/borrow/",
+            {"users": f.users[i][0], "books": f.borrow_books[i]},
+        ),
+    ),
+    (
+        "GET borrow/export/",
+        "GET",
+        "librarian",
+        lambda f, i: ("/api/v1/borrow/export/", None),
+    ),
+    (
+        "POST borrow/bulk/",
+        "POST",
+        "librarian",
+        lambda f, i: (
+            "/api/v1/borrow/bulk/",
+            {
+                "items": [
+                    {"users": f.users[i][0], "books": book}
+                    for book in f.bulk_borrow_books[i]
+                ]
+            },
+        ),
+    ),
+    (
+        "POST borrow/bulk/return/",
+        "POST",
+        "librarian",
+        lambda f, i: ("/api/v1/borrow/bulk/return/", {"ids": f.bulk_return_borrows[i]}),
+    ),
+    (
+        "PATCH borrow/<id>/",
+        "PATCH",
+        "librarian",
+        lambda f, i: (f"/api/v1/borrow/{f.return_borrows[i]}/", {"is_returned": True}),
+    ),
+    ("GET review/", "GET", "user", lambda f, i: ("/api/v1/review/?limit=20", None)),
+    (
+        "POST review/",
+        "POST",
+        "user",
+        lambda f, i: (
+            "/api/v1/review/",
+            {"book": f.popular(i), "rating": 4, "comment": "Benchmark"},
+        ),
+    ),
+    (
+        "GET review/export/",
+        "GET",
+        "librarian",
+        lambda f, i: ("/api/v1/review/export/", None),
+    ),
+    (
+        "GET review/book/<id>/",
+        "GET",
+        "user",
+        lambda f, i: (f"/api/v1/review/book/{f.popular(i)}/?limit=20", None),
+    ),
+    (
+        "DELETE review/<id>/",
+        "DELETE",
+        "librarian",
+        lambda f, i: (f"/api/v1/review/{f.delete_reviews[i]}/", None),
+    ),
+]
+
+
+class Fixtures:
+    """Ids and tokens the requests of one dataset size are built from."""
+
+    def __init__(self, size, runs):
+        self.size = size
+        self.roles = {
+            "admin": User.objects.get(email="admin@gmail.com"),
+            "librarian": User.objects.get(email="librarian@gmail.com"),
+        }
+        generated = User.objects.filter(email__endswith="@example.com").exclude(
+            email__startswith="bench-"
+        )
+        self.roles["user"] = generated.order_by("pk").first()
+        self.refresh_token = str(UserRefreshToken.for_user(self.roles["user"]))
+        self.users = list(
+            generated.order_by("pk").values_list("pk", "email")[1 : runs + 1]
+        )
+        if len(self.users) < runs:
+            raise CommandError(f"Need {runs} generated users, found {len(self.users)}.")
+
+        live = Book.objects.filter(is_deleted=False)
+        # The most reviewed books are the most expensive to render.
+        self.popular_books = list(
+            live.order_by("-review_count", "pk").values_list("pk", flat=True)[:50]
+        )
+        in_stock = iter(
+            live.filter(quantity__gt=0)
+            .exclude(pk__in=self.popular_books)
+            .order_by("pk")
+            .values_list("pk", flat=True)[: runs * (3 + 2 * BULK_SIZE)]
+        )
+
+        def take(count):
+            books = [book for _, book in zip(range(count), in_stock)]
+            if len(books) < count:
+                raise CommandError("Not enough books in stock; use a larger size.")
+            return books
+
+        self.borrow_books = take(runs)
+        self.delete_books = take(runs)
+        self.bulk_borrow_books = [take(BULK_SIZE) for _ in range(runs)]
+        borrows = Borrow.objects.bulk_create(
+            Borrow(users_id=self.users[0][0], books_id=book)
+            for book in take(runs * (1 + BULK_SIZE))
+        )
+        ids = [borrow.pk for borrow in borrows]
+        self.return_borrows = ids[:runs]
+        self.bulk_return_borrows = [
+            ids[runs + n * BULK_SIZE : runs + (n + 1) * BULK_SIZE] for n in range(runs)
+        ]
+        self.delete_reviews = list(
+            BookReview.objects.filter(is_deleted=False)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:runs]
+        )
+
+    def popular(self, i):
+        return self.popular_books[i % len(self.popular_books)]
+
+    def headers(self, role):
+        if role is None:
+            return {}
+        token = UserRefreshToken.for_user(self.roles[role]).access_token
+        return {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+
+class QueryCounter:
+    """``execute_wrapper`` counting the queries of a request and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def percentile(values, percent):
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every API route against freshly generated datasets in a "
+        "throwaway test database. Reports latency percentiles, SQL queries, "
+        "response size and Python allocations per endpoint, saves the "
+        "results as a JSON baseline and fails when a run regresses against one"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="1000,10000",
+            help="Comma separated dataset sizes, in books; each size adds to "
+            "the previous one",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=50,
+            help="Timed requests per endpoint",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=3,
+            help="Untimed requests per endpoint before timing",
+        )
+        parser.add_argument(
+            "--alloc-samples",
+            type=int,
+            default=3,
+            help="Requests per endpoint run under tracemalloc",
+        )
+        parser.add_argument(
+            "--filter",
+            default="",
+            help="Only benchmark endpoints whose label contains this text",
+        )
+        parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="Keep the API response cache on; by default every request "
+            "does the full work",
+        )
+        parser.add_argument("--output", help="Write the results to this JSON file")
+        parser.add_argument(
+            "--compare",
+            help="Baseline JSON file to compare the results against",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.5,
+            help="Allowed relative growth of latency and allocations before "
+            "--compare fails; query counts and status codes must not change",
+        )
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options["sizes"].split(","))
+        runs = options["warmup"] + options["requests"] + options["alloc_samples"]
+        if options["requests"] < 2:
+            raise CommandError("--requests must be at least 2.")
+        endpoints = [
+            endpoint for endpoint in ENDPOINTS if options["filter"] in endpoint[0]
+        ]
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+
+        self.stdout.write(f"Creating the test database ({connection.vendor})...")
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        results = {}
+        try:
+            call_command("seed_data", stdout=StringIO())
+            books = users = 0
+            for index, size in enumerate(sizes):
+                target_users = max(size // 10, 2 * runs, users + 1)
+                self.stdout.write(f"Generating {size} books...")
+                call_command(
+                    "generate_dataset",
+                    books=size - books,
+                    users=target_users - users,
+                    borrows_per_user=10,
+                    seed=index,
+                    end=DATASET_END,
+                    stdout=StringIO(),
+                )
+                books, users = size, target_users
+                overrides = {} if options["cache"] else {"API_CACHE_TIMEOUT": 0}
+                with override_settings(**overrides):
+                    results[str(size)] = self.run_size(size, runs, endpoints, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "database": connection.vendor,
+            "requests": options["requests"],
+            "cache": options["cache"],
+            "results": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if baseline is not None:
+            self.compare(results, baseline["results"], options["threshold"])
+
+    def run_size(self, size, runs, endpoints, options):
+        fixtures = Fixtures(size, runs)
+        client = Client(HTTP_HOST="localhost")
+        self.stdout.write(f"\n{size} books")
+        self.stdout.write(
+            f"  {'endpoint':<28}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'queries':>9}{'sql ms':>9}{'KB':>9}{'alloc KB':>10}  status"
+        )
+        results = {}
+        for label, method, role, build in endpoints:
+            headers = fixtures.headers(role)
+            # Garbage left by the previous endpoint is not collected on its time.
+            gc.collect()
+            latencies, queries, sql_times, sizes, peaks = [], [], [], [], []
+            statuses = set()
+            for i in range(runs):
+                path, data = build(fixtures, i)
+                # Logins come from distinct addresses, as the throttle would
+                # otherwise answer them.
+                extra = {**headers, "REMOTE_ADDR": f"10.0.{i // 250}.{i % 250 + 1}"}
+                timed = options["warmup"] <= i < options["warmup"] + options["requests"]
+                traced = i >= options["warmup"] + options["requests"]
+                counter = QueryCounter()
+                if traced:
+                    tracemalloc.start()
+                started = time.perf_counter()
+                with connection.execute_wrapper(counter):
+                    response = self.request(client, method, path, data, extra)
+                    length = self.consume(response)
+                elapsed = time.perf_counter() - started
+                if traced:
+                    peaks.append(tracemalloc.get_traced_memory()[1])
+                    tracemalloc.stop()
+                statuses.add(response.status_code)
+                if i == 0 and response.status_code >= 400 and not response.streaming:
+                    self.stderr.write(
+                        f"{label}: {response.status_code} "
+                        f"{response.content[:200].decode(errors='replace')}"
+                    )
+                if timed:
+                    latencies.append(elapsed * 1000)
+                    queries.append(counter.count)
+                    sql_times.append(counter.seconds * 1000)
+                    sizes.append(length)
+
+            result = {
+                "p50_ms": round(percentile(latencies, 50), 3),
+                "p95_ms": round(percentile(latencies, 95), 3),
+                "p99_ms": round(percentile(latencies, 99), 3),
+                "queries": round(statistics.mean(queries), 2),
+                "sql_ms": round(statistics.mean(sql_times), 3),
+                "bytes": round(statistics.mean(sizes)),
+                "alloc_kb": (
+                    round(statistics.median(peaks) / 1024, 1) if peaks else None
+                ),
+                "status": sorted(statuses),
+            }
+            results[label] = result
+            alloc = "-" if result["alloc_kb"] is None else f"{result['alloc_kb']:.0f}"
+            self.stdout.write(
+                f"  {label:<28}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                f"{result['p99_ms']:>9.2f}{result['queries']:>9.1f}"
+                f"{result['sql_ms']:>9.2f}{result['bytes'] / 1024:>9.1f}"
+                f"{alloc:>10}  {','.join(map(str, result['status']))}"
+            )
+        return results
+
+    def request(self, client, method, path, data, extra):
+        if method == "GET":
+            return client.get(path, **extra)
+        return client.generic(
+            method,
+            path,
+            json.dumps(data) if data is not None else "",
+            content_type="application/json",
+            **extra,
+        )
+
+    def consume(self, response):
+        """Read the whole body, so streamed exports are timed in full."""
+        if response.streaming:
+            return sum(len(chunk) for chunk in response.streaming_content)
+        return len(response.content)
+
+    def compare(self, results, baseline, threshold):
+        regressions = []
+        for size, endpoints in results.items():
+            for label, new in endpoints.items():
+                old = baseline.get(size, {}).get(label)
+                if old is None:
+                    continue
+                where = f"{label} at {size} books"
+                if new["status"] != old["status"]:
+                    regressions.append(
+                        f"{where}: status {old['status']} -> {new['status']}"
+                    )
+                # Query counts do not depend on timing, so any growth counts.
+                if new["queries"] > old["queries"] + 0.5:
+                    regressions.append(
+                        f"{where}: queries {old['queries']} -> {new['queries']}"
+                    )
+                for key, floor in (("p50_ms", 2), ("p95_ms", 5), ("alloc_kb", 64)):
+                    if old.get(key) is None or new.get(key) is None:
+                        continue
+                    # Differences below the floor are noise on small values.
+                    if (
+                        new[key] > old[key] * (1 + threshold)
+                        and new[key] - old[key] > floor
+                    ):
+                        regressions.append(f"{where}: {key} {old[key]} -> {new[key]}")
+
+        if regressions:
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(regression))
+            raise CommandError(
+                f"{len(regressions)} regressions beyond the baseline "
+                f"(threshold {threshold:.0%})."
+            )
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline!"))
@@ -0,0 +1,159 @@
+import statistics
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.test.utils import override_settings
+from users.hashing import hashing_stats
+from users.models import User
+
+PASSWORD = "benchmark-password"
+
+
+def percentile(values, percent):
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time catalog reads while idle and while clients loop on the login "
+        "endpoint, to see how much password hashing slows everything else "
+        "down. Uses the hasher and login throttles of the current settings; "
+        "compare hashers with PASSWORD_HASHER=pbkdf2 or argon2, and lift the "
+        "throttles with LOGIN_IP_RATE and LOGIN_ACCOUNT_RATE. Creates a "
+        "temporary user and deletes it afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=4,
+            help="Clients logging in at the same time",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=100,
+            help="Timed catalog reads per phase",
+        )
+        parser.add_argument(
+            "--path",
+            default="/api/v1/books/?limit=10&reviews=none",
+            help="Catalog endpoint to time",
+        )
+        parser.add_argument(
+            "--wrong-password",
+            action="store_true",
+            help="Log in with a wrong password, as a guessing attack would",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 2:
+            raise CommandError("--requests must be at least 2.")
+        if options["clients"] < 1:
+            raise CommandError("--clients must be at least 1.")
+        email = f"benchmark-login-{uuid.uuid4().hex[:12]}@example.com"
+        user = User.objects.create_user(email=email, password=PASSWORD)
+        try:
+            with override_settings(API_CACHE_TIMEOUT=0):
+                self.run(email, options)
+        finally:
+            user.delete()
+            connection.close()
+
+    def run(self, email, options):
+        password = "wrong-password" if options["wrong_password"] else PASSWORD
+        self.stdout.write(
+            f"GET {options['path']}, {options['requests']} requests per phase, "
+            f"hasher {settings.PASSWORD_HASHERS[0].rsplit('.', 1)[-1]}"
+        )
+        idle = self.read(options)
+
+        stop = threading.Event()
+        outcomes = {"ok": 0, "wrong": 0, "throttled": 0, "busy": 0, "other": 0}
+        logins = []
+        lock = threading.Lock()
+
+        def login():
+            client = Client(HTTP_HOST="localhost")
+            try:
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    response = client.post(
+                        "/api/v1/user/login/",
+                        {"email": email, "password": password},
+                        content_type="application/json",
+                    )
+                    elapsed = (time.perf_counter() - started) * 1000
+                    outcome = {
+                        200: "ok",
+                        400: "wrong",
+                        429: "throttled",
+                        503: "busy",
+                    }.get(response.status_code, "other")
+                    with lock:
+                        outcomes[outcome] += 1
+                        if outcome in ("ok", "wrong"):
+                            logins.append(elapsed)
+                    if outcome in ("throttled", "busy"):
+                        # Refusals are cheap for a server, but a tight retry
+                        # loop here would only compete for this process' GIL.
+                        time.sleep(0.05)
+            finally:
+                connection.close()
+
+        clients = [threading.Thread(target=login) for _ in range(options["clients"])]
+        started = time.perf_counter()
+        for client in clients:
+            client.start()
+        try:
+            # Let the hashing pool start before timing.
+            time.sleep(1)
+            loaded = self.read(options)
+        finally:
+            stop.set()
+            for client in clients:
+                client.join()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"  {'phase':<24}{'p50 ms':>9}{'p95 ms':>9}")
+        for label, latencies in (
+            ("idle", idle),
+            (f"{options['clients']} clients logging in", loaded),
+        ):
+            self.stdout.write(
+                f"  {label:<24}{percentile(latencies, 50):>9.1f}"
+                f"{percentile(latencies, 95):>9.1f}"
+            )
+        hashed = outcomes["ok"] + outcomes["wrong"]
+        self.stdout.write(
+            f"Logins: {hashed / elapsed:.1f}/s hashed, "
+            + ", ".join(f"{count} {name}" for name, count in outcomes.items())
+        )
+        if logins:
+            self.stdout.write(f"Login p50 {statistics.median(logins):.1f} ms")
+        stats = hashing_stats()
+        self.stdout.write(
+            f"Hashing pool: {stats['workers']} workers, "
+            f"{stats['rejected']} rejected, {stats['timeouts']} timed out, "
+            f"average {stats['latency_avg_ms']} ms"
+        )
+
+    def read(self, options):
+        client = Client(HTTP_HOST="localhost")
+        latencies = []
+        for _ in range(options["requests"]):
+            started = time.perf_counter()
+            response = client.get(options["path"])
+            close_old_connections()
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise CommandError(
+                    f"GET {options['path']} answered {response.status_code}."
+                )
+        return latencies
@@ -0,0 +1,82 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from lms.utils.renderers import FastJSONRenderer
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from users.models import User
+
+ENDPOINTS = [
+    "/api/v1/books/",
+    "/api/v1/books/?reviews=none",
+    "/api/v1/borrow/",
+    "/api/v1/review/",
+    "/api/v1/user/all/",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time encoding real list pages with DRF's JSONRenderer and with "
+        "FastJSONRenderer, and compare the bytes they produce. Reads only, "
+        "against the configured database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=100,
+            help="Rows per page",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=50,
+            help="Renders per page and renderer; the mean is reported",
+        )
+
+    def handle(self, *args, **options):
+        admin = User.objects.filter(is_superuser=True).order_by("pk").first()
+        if admin is None:
+            raise CommandError("No admin to sign in as; run seed_data first.")
+        client = APIClient(HTTP_HOST="localhost")
+        client.force_authenticate(admin)
+
+        self.stdout.write(
+            f"{'page':<36}{'bytes':>10}{'drf ms':>9}{'fast ms':>9}{'x':>7}"
+            f"{'same':>6}"
+        )
+        differ = []
+        for path in ENDPOINTS:
+            separator = "&" if "?" in path else "?"
+            url = f"{path}{separator}limit={options['limit']}"
+            with override_settings(API_CACHE_TIMEOUT=0):
+                response = client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f"GET {url} answered {response.status_code}.")
+
+            drf_ms, expected = self.run_case(JSONRenderer(), response.data, options)
+            fast_ms, output = self.run_case(FastJSONRenderer(), response.data, options)
+            same = output == expected
+            if not same:
+                differ.append(url)
+            self.stdout.write(
+                f"{url:<36}{len(output):>10}{drf_ms:>9.2f}{fast_ms:>9.2f}"
+                f"{drf_ms / fast_ms:>7.2f}{'yes' if same else 'no':>6}"
+            )
+
+        if differ:
+            # Floats in exponent notation are the one known difference.
+            self.stdout.write(
+                self.style.WARNING(f"Output differs for: {', '.join(differ)}")
+            )
+
+    def run_case(self, renderer, data, options):
+        output = renderer.render(data)
+        started = time.perf_counter()
+        for _ in range(options["repeat"]):
+            renderer.render(data)
+        elapsed = 1000 * (time.perf_counter() - started) / options["repeat"]
+        return elapsed, output
@@ -0,0 +1,141 @@
+import statistics
+import time
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import Client
+from django.test.utils import override_settings
+from library.models import Book
+from lms.utils.timing import install_query_recorder, request_timer
+
+# Words of generate_dataset titles, publishers and genres, from about 10% of
+# the catalog down to a handful of books, plus phrases and negation. Two
+# genres, or a genre and a publisher, are never or seldom on the same book,
+# though the planner expects them to be.
+TERMS = [
+    "penguin",
+    "fiction",
+    "river",
+    "silent river",
+    "golden -kingdom",
+    "monsoon lantern",
+    '"midnight harbour"',
+    "devkota",
+    "poetry fiction",
+    "penguin fiction",
+]
+
+
+def percentile(values, percent):
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time catalog searches (GET /api/v1/books/?q=) for broad and narrow "
+        "terms against the configured database, with the response cache off. "
+        "Fails when a term's p95 is over --target-ms. Reads only; run it on a "
+        "large dataset, e.g. generate_dataset --books 1000000"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=30,
+            help="Timed requests per term",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=3,
+            help="Untimed requests per term before timing",
+        )
+        parser.add_argument(
+            "--terms",
+            help="Comma separated search terms; a built-in mix by default",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=20,
+            help="Page size",
+        )
+        parser.add_argument(
+            "--page",
+            type=int,
+            default=1,
+            help="Page number to request",
+        )
+        parser.add_argument(
+            "--target-ms",
+            type=float,
+            default=50,
+            help="Highest acceptable p95 per term",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 2:
+            raise CommandError("--requests must be at least 2.")
+        terms = options["terms"].split(",") if options["terms"] else TERMS
+        books = Book.objects.count()
+        if not books:
+            raise CommandError("No books to search; run generate_dataset first.")
+
+        install_query_recorder()
+        client = Client(HTTP_HOST="localhost")
+        self.stdout.write(
+            f"{books} books, {options['requests']} requests per term, "
+            f"page {options['page']} of size {options['limit']}"
+        )
+        self.stdout.write(
+            f"  {'term':<22}{'matches':>9}{'order':>8}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'db p50 ms':>11}"
+        )
+        over = []
+        with override_settings(API_CACHE_TIMEOUT=0):
+            for term in terms:
+                path = "/api/v1/books/?" + urlencode(
+                    {
+                        "q": term,
+                        "limit": options["limit"],
+                        "page": options["page"],
+                        "reviews": "none",
+                    }
+                )
+                latencies = []
+                db_ms = []
+                for i in range(options["warmup"] + options["requests"]):
+                    with request_timer() as timer:
+                        response = client.get(path)
+                    elapsed = time.perf_counter() - timer.started
+                    close_old_connections()
+                    if response.status_code != 200:
+                        raise CommandError(
+                            f"GET {path} answered {response.status_code}."
+                        )
+                    if i >= options["warmup"]:
+                        latencies.append(elapsed * 1000)
+                        db_ms.append(timer.db_seconds * 1000)
+                p95 = percentile(latencies, 95)
+                # Terms too broad to rank are listed newest first, uncounted.
+                count = response.json().get("count")
+                matches, order = ("-", "newest") if count is None else (count, "rank")
+                self.stdout.write(
+                    f"  {term:<22}{matches:>9}{order:>8}"
+                    f"{percentile(latencies, 50):>9.2f}{p95:>9.2f}"
+                    f"{statistics.median(db_ms):>11.2f}"
+                )
+                if p95 > options["target_ms"]:
+                    over.append(term)
+
+        if over:
+            raise CommandError(
+                f"p95 over {options['target_ms']:g} ms for: {', '.join(over)}."
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Every term answered within {options['target_ms']:g} ms at p95."
+            )
+        )
@@ -0,0 +1,158 @@
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+from library.models import Author, Book
+from library.serializers import AuthorSerializer, BookListSerializer
+from reviews.models import BookReview
+from reviews.serializers import BookReviewListSerializer
+from users.models import User
+from users.serializers import UserListSerializer, UserSerializer
+
+
+def _prefetched(model, rows):
+    """A queryset that behaves like the result of ``prefetch_related``."""
+    queryset = model.objects.all()
+    queryset._result_cache = rows
+    queryset._prefetch_done = True
+    return queryset
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the list serializers on in-memory pages, DRF's generic path "
+        "against the compiled one, and check both render the same JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=10000,
+            help="Number of instances per page",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Runs per case; the fastest one is reported",
+        )
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        repeat = options["repeat"]
+        books, reviews, users, authors = self.build_rows(rows)
+
+        cases = [
+            ("AuthorSerializer", AuthorSerializer, authors, {}),
+            ("UserSerializer", UserSerializer, users, {}),
+            ("UserListSerializer", UserListSerializer, users, {}),
+            ("BookReviewListSerializer", BookReviewListSerializer, reviews, {}),
+            ("BookListSerializer", BookListSerializer, books, {}),
+            (
+                "BookListSerializer reviews=none",
+                BookListSerializer,
+                books,
+                {"reviews": "none"},
+            ),
+            (
+                "BookListSerializer fields=id,title,authors",
+                BookListSerializer,
+                books,
+                {"fields": {"id", "title", "authors"}},
+            ),
+        ]
+
+        self.stdout.write(
+            f"{'serializer':<44}{'drf ms':>10}{'compiled ms':>13}{'x':>7}"
+        )
+        for name, serializer_class, instances, context in cases:
+            with override_settings(COMPILED_SERIALIZERS=False):
+                drf_ms, expected = self.run_case(
+                    serializer_class, instances, context, repeat
+                )
+            with override_settings(COMPILED_SERIALIZERS=True):
+                compiled_ms, output = self.run_case(
+                    serializer_class, instances, context, repeat
+                )
+            if output != expected:
+                raise CommandError(f"{name}: compiled output differs from DRF's")
+            self.stdout.write(
+                f"{name:<44}{drf_ms:>10.1f}{compiled_ms:>13.1f}"
+                f"{drf_ms / compiled_ms:>7.2f}"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Compiled output is identical."))
+
+    def run_case(self, serializer_class, instances, context, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            data = serializer_class(instances, many=True, context=context).data
+            elapsed = 1000 * (time.perf_counter() - started)
+            best = elapsed if best is None else min(best, elapsed)
+        return best, json.dumps(data, default=str)
+
+    def build_rows(self, rows):
+        now = timezone.now()
+        users = [
+            User(
+                id=i,
+                email=f"user{i}@example.com",
+                first_name=f"First{i}",
+                last_name=None if i % 7 == 0 else f"Last{i}",
+                address=f"Street {i}",
+                phone_number=f"98{i:08d}",
+                date_joined=now - timedelta(minutes=i),
+                role=User.Roles.USER,
+            )
+            for i in range(1, rows + 1)
+        ]
+        authors = [
+            Author(
+                id=i,
+                first_name=f"Author{i}",
+                last_name=f"Writer{i}",
+                address=None if i % 5 == 0 else f"City {i}",
+                country="Nepal",
+            )
+            for i in range(1, rows + 1)
+        ]
+
+        books = []
+        reviews = []
+        for i in range(1, rows + 1):
+            book = Book(
+                id=i,
+                title=f"Book {i}",
+                is_available=i % 3 != 0,
+                quantity=i % 11,
+                publisher=f"Publisher {i % 50}",
+                genre=None if i % 9 == 0 else "Fiction",
+                created_at=now - timedelta(hours=i),
+                review_count=2,
+                rating_avg=3.5,
+            )
+            book_reviews = []
+            for j in range(2):
+                review = BookReview(
+                    id=2 * i + j,
+                    book=book,
+                    user=users[(i + j) % rows],
+                    rating=3 + j,
+                    comment=f"Review {j} of book {i}",
+                    created_at=now - timedelta(hours=i, minutes=j),
+                )
+                book_reviews.append(review)
+            reviews.extend(book_reviews)
+            book._prefetched_objects_cache = {
+                "authors": _prefetched(
+                    Author, [authors[i - 1], authors[(i * 7) % rows]]
+                ),
+                "reviews": _prefetched(BookReview, book_reviews),
+            }
+            books.append(book)
+        return books, reviews, users, authors
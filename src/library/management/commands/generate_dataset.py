@@ -0,0 +1,422 @@
+import random
+import string
+import time
+from bisect import bisect
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from library.models import Author, Book, Borrow
+from reviews.models import BookReview
+from users.models import User
+
+# fmt: off
+FIRST_NAMES = [
+    "Aarav", "Anita", "Bikash", "Binita", "Deepak", "Gita", "Hari", "Ishaan",
+    "Kabita", "Kiran", "Laxmi", "Manish", "Maya", "Nabin", "Nisha", "Pooja",
+    "Prakash", "Rajesh", "Rita", "Sabin", "Sarita", "Sita", "Suman", "Sunita",
+    "Ada", "Alan", "Clara", "David", "Emma", "George", "Hannah", "James",
+    "Julia", "Leo", "Lucy", "Mark", "Nora", "Oliver", "Rosa", "Sam",
+]
+LAST_NAMES = [
+    "Adhikari", "Basnet", "Bhattarai", "Dahal", "Gurung", "KC", "Karki",
+    "Khadka", "Koirala", "Lama", "Magar", "Pandey", "Poudel", "Rai", "Sharma",
+    "Shrestha", "Tamang", "Thapa", "Wagle", "Brown", "Clark", "Evans",
+    "Garcia", "Hughes", "Jones", "Lopez", "Miller", "Moore", "Smith", "Wilson",
+]
+CITIES = ["Kathmandu", "Pokhara", "Lalitpur", "Biratnagar", "London", "Boston"]
+COUNTRIES = ["Nepal", "Nepal", "Nepal", "India", "United Kingdom", "USA"]
+ADJECTIVES = [
+    "Silent", "Broken", "Golden", "Hidden", "Last", "Lost", "Midnight",
+    "Northern", "Quiet", "Red", "Secret", "Small", "Summer", "Winter",
+    "Wandering", "Burning", "Distant", "Forgotten", "Paper", "Long",
+]
+NOUNS = [
+    "River", "Mountain", "Garden", "City", "Letters", "House", "Road",
+    "Season", "Kingdom", "Sky", "Harbour", "Village", "Promise", "Song",
+    "Shadow", "Journey", "Window", "Festival", "Monsoon", "Lantern",
+]
+PUBLISHERS = [
+    "Sajha Prakashan", "Nepalaya Publication", "FinePrint",
+    "Nepali Sahitya Parishad", "Penguin", "HarperCollins", "Vintage",
+    "Bloomsbury", "Ratna Pustak Bhandar", "Book Hill",
+]
+GENRES = [
+    "Fiction", "Romance", "Epic Poetry", "History", "Biography", "Science",
+    "Fantasy", "Mystery", "Poetry", "Travel", "Philosophy", "Children",
+]
+COMMENTS = [
+    None, "Loved it.", "Could not put it down.", "A bit slow in the middle.",
+    "Beautifully written.", "Not for me.", "Worth a second read.",
+    "The ending surprised me.", "Good, but too long.",
+]
+# fmt: on
+RATINGS = [1, 2, 3, 4, 5]
+# Most ratings are positive, as on real catalogs.
+RATING_WEIGHTS = [5, 5, 15, 35, 40]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large synthetic dataset of users, authors, books, borrows "
+        "and reviews for load tests and benchmarks. Rows are written with "
+        "COPY and are the same for the same seed and --end; review and "
+        "borrow popularity follows a Zipf-like skew. Generated users share "
+        "the password 'password123'"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--books", type=int, default=100000)
+        parser.add_argument(
+            "--authors",
+            type=int,
+            help="Size of the author pool; a fifth of --books by default",
+        )
+        parser.add_argument(
+            "--authors-per-book",
+            type=int,
+            default=2,
+            help="Each book gets between one and this many authors",
+        )
+        parser.add_argument(
+            "--borrows-per-user",
+            type=int,
+            default=20,
+            help="Average borrows per user",
+        )
+        parser.add_argument(
+            "--reviews",
+            type=int,
+            help="Total reviews; five per book by default",
+        )
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=0.8,
+            help="Zipf exponent of book popularity for borrows and reviews",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="Length of the period the timestamps are spread over",
+        )
+        parser.add_argument(
+            "--end",
+            help="Last day of that period (YYYY-MM-DD); today by default",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("generate_dataset writes with COPY and needs Postgres.")
+
+        self.seed = options["seed"]
+        self.rng = random.Random(self.seed)
+        n_users = options["users"]
+        n_books = options["books"]
+        n_authors = options["authors"] or max(1, n_books // 5)
+        n_reviews = options["reviews"]
+        if n_reviews is None:
+            n_reviews = n_books * 5
+        if min(n_users, n_books, n_authors, options["authors_per_book"]) < 1:
+            raise CommandError("Users, books and authors must be at least 1.")
+
+        end = datetime.combine(
+            (
+                datetime.strptime(options["end"], "%Y-%m-%d").date()
+                if options["end"]
+                else datetime.now(dt_timezone.utc).date()
+            ),
+            dt_time.max,
+            tzinfo=dt_timezone.utc,
+        )
+        self.start = end - timedelta(days=options["days"])
+        self.span = (end - self.start).total_seconds()
+
+        # Rows get explicit ids after the current maximum so the foreign keys
+        # can be written without reading anything back; the sequences are
+        # moved past them at the end.
+        self.first_ids = {
+            model: (model.objects.aggregate(top=Max("pk"))["top"] or 0) + 1
+            for model in (User, Author, Book)
+        }
+        self.total = 0
+        self.loaded = []
+        started = time.monotonic()
+
+        # Maintaining the secondary indexes and checking the foreign keys row
+        # by row is most of the cost of loading the big tables, so both are
+        # dropped and built again in bulk after. DDL is transactional in
+        # Postgres; a failed run leaves them in place.
+        indexed = [Book, Borrow, BookReview]
+        with transaction.atomic():
+            foreign_keys = self.drop_foreign_keys(
+                ["books_authors", "borrows", "book_reviews"]
+            )
+            self.alter_indexes(indexed, "remove_index")
+            self.copy(
+                "users",
+                (
+                    "id",
+                    "email",
+                    "password",
+                    "first_name",
+                    "last_name",
+                    "date_joined",
+                    "address",
+                    "phone_number",
+                    "is_active",
+                    "is_staff",
+                    "is_superuser",
+                    "role",
+                ),
+                self.user_rows(n_users),
+            )
+            self.copy(
+                "authors",
+                ("id", "first_name", "last_name", "address", "country"),
+                self.author_rows(n_authors),
+            )
+            # Book creation times, so borrows and reviews come after them.
+            self.book_times = [self.moment() for _ in range(n_books)]
+            self.copy(
+                "books",
+                (
+                    "id",
+                    "title",
+                    "is_available",
+                    "quantity",
+                    "publisher",
+                    "genre",
+                    "created_at",
+                    "updated_at",
+                    "is_deleted",
+                    "review_count",
+                    "rating_avg",
+                ),
+                self.book_rows(n_books),
+            )
+            self.copy(
+                "books_authors",
+                ("book_id", "author_id"),
+                self.book_author_rows(n_books, n_authors, options["authors_per_book"]),
+            )
+
+            # Popularity rank r gets weight 1 / r ** skew; ranks are dealt to
+            # books at random so the popular ones are not just the oldest.
+            self.popular = list(range(n_books))
+            self.rng.shuffle(self.popular)
+            self.cum_weights = list(
+                accumulate(
+                    1 / rank ** options["skew"] for rank in range(1, n_books + 1)
+                )
+            )
+            self.copy(
+                "borrows",
+                (
+                    "users_id",
+                    "books_id",
+                    "borrowed_at",
+                    "borrow_duration",
+                    "is_returned",
+                ),
+                self.borrow_rows(n_users, options["borrows_per_user"]),
+            )
+            self.copy(
+                "book_reviews",
+                ("book_id", "user_id", "rating", "comment", "created_at", "is_deleted"),
+                self.review_rows(n_users, n_reviews),
+            )
+
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [User, Author, Book, Borrow, BookReview]
+                ):
+                    cursor.execute(sql)
+                # The planner still sees the tables as they were before the
+                # load and would scan books_authors once per book below.
+                for table in self.loaded:
+                    cursor.execute(f"ANALYZE {table}")
+
+            self.stdout.write("Building search vectors...")
+            first_book = self.first_ids[Book]
+            for start in range(first_book, first_book + n_books, 10000):
+                Book.objects.update_search_vectors(
+                    range(start, min(start + 10000, first_book + n_books))
+                )
+
+            self.stdout.write("Building indexes and foreign keys...")
+            self.alter_indexes(indexed, "add_index")
+            with connection.cursor() as cursor:
+                for table, name, definition in foreign_keys:
+                    cursor.execute(
+                        f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}"
+                    )
+
+        # Also bumps the catalog version, retiring cached pages in every worker.
+        call_command("rebuild_review_aggregates", stdout=self.stdout)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {self.total} rows in {elapsed:.0f}s "
+                f"({self.total / elapsed:.0f} rows/s)!"
+            )
+        )
+
+    def drop_foreign_keys(self, tables):
+        """Drop the foreign keys of ``tables``, returning their definitions."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) "
+                "FROM pg_constraint "
+                "WHERE contype = 'f' AND conrelid::regclass::text = ANY(%s)",
+                [tables],
+            )
+            foreign_keys = cursor.fetchall()
+            for table, name, _ in foreign_keys:
+                cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+        return foreign_keys
+
+    def alter_indexes(self, models, action):
+        with connection.schema_editor() as editor:
+            for model in models:
+                for index in model._meta.indexes:
+                    getattr(editor, action)(model, index)
+
+    def copy(self, table, columns, rows):
+        started = time.monotonic()
+        count = 0
+        with connection.cursor() as cursor:
+            with cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+                    count += 1
+        elapsed = time.monotonic() - started
+        self.total += count
+        self.loaded.append(table)
+        self.stdout.write(
+            f"{table}: {count} rows in {elapsed:.1f}s "
+            f"({count / max(elapsed, 1e-9):.0f} rows/s)"
+        )
+
+    def moment(self, after=None):
+        """A random timestamp in the period, later than ``after`` if given."""
+        start = after or self.start
+        span = self.span - (start - self.start).total_seconds()
+        return start + timedelta(seconds=self.rng.random() * span)
+
+    def pick_book(self):
+        """Index of a book, drawn by popularity."""
+        # What random.choices does, without building a list per draw.
+        point = self.rng.random() * self.cum_weights[-1]
+        return self.popular[bisect(self.cum_weights, point)]
+
+    def user_rows(self, count):
+        # Hashing is deliberately slow, so every generated user shares one.
+        # The salt comes from the seed, like every other column, and its own
+        # generator so the rows drawn from self.rng stay the same.
+        salt_rng = random.Random(f"password-salt-{self.seed}")
+        salt = "".join(salt_rng.choices(string.ascii_letters + string.digits, k=22))
+        password = make_password("password123", salt)
+        rng = self.rng
+        first_id = self.first_ids[User]
+        for offset in range(count):
+            pk = first_id + offset
+            yield (
+                pk,
+                f"user{pk}@example.com",
+                password,
+                rng.choice(FIRST_NAMES),
+                rng.choice(LAST_NAMES),
+                self.moment(),
+                rng.choice(CITIES),
+                f"98{rng.randrange(10**8):08d}",
+                True,
+                False,
+                False,
+                User.Roles.USER,
+            )
+
+    def author_rows(self, count):
+        rng = self.rng
+        first_id = self.first_ids[Author]
+        for offset in range(count):
+            city = rng.randrange(len(CITIES))
+            yield (
+                first_id + offset,
+                rng.choice(FIRST_NAMES),
+                rng.choice(LAST_NAMES),
+                CITIES[city],
+                COUNTRIES[city],
+            )
+
+    def book_rows(self, count):
+        rng = self.rng
+        first_id = self.first_ids[Book]
+        for offset in range(count):
+            quantity = rng.randrange(11)
+            created_at = self.book_times[offset]
+            yield (
+                first_id + offset,
+                f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {offset + 1}",
+                quantity > 0,
+                quantity,
+                rng.choice(PUBLISHERS),
+                rng.choice(GENRES),
+                created_at,
+                created_at,
+                rng.random() < 0.01,
+                0,
+                0.0,
+            )
+
+    def book_author_rows(self, n_books, n_authors, per_book):
+        rng = self.rng
+        first_book = self.first_ids[Book]
+        first_author = self.first_ids[Author]
+        for offset in range(n_books):
+            count = min(rng.randint(1, per_book), n_authors)
+            for author in rng.sample(range(n_authors), count):
+                yield first_book + offset, first_author + author
+
+    def borrow_rows(self, n_users, per_user):
+        rng = self.rng
+        first_user = self.first_ids[User]
+        first_book = self.first_ids[Book]
+        recent = self.start + timedelta(seconds=self.span) - timedelta(days=15)
+        for user in range(n_users):
+            for _ in range(rng.randint(0, 2 * per_user)):
+                book = self.pick_book()
+                borrowed_at = self.moment(self.book_times[book])
+                # Only recent borrows may still be out.
+                returned = borrowed_at < recent or rng.random() < 0.7
+                yield (
+                    first_user + user,
+                    first_book + book,
+                    borrowed_at,
+                    15,
+                    returned,
+                )
+
+    def review_rows(self, n_users, count):
+        rng = self.rng
+        first_user = self.first_ids[User]
+        first_book = self.first_ids[Book]
+        rating_weights = list(accumulate(RATING_WEIGHTS))
+        for _ in range(count):
+            book = self.pick_book()
+            yield (
+                first_book + book,
+                first_user + rng.randrange(n_users),
+                rng.choices(RATINGS, cum_weights=rating_weights)[0],
+                rng.choice(COMMENTS),
+                self.moment(self.book_times[book]),
+                rng.random() < 0.02,
+            )
@@ -0,0 +1,230 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from library.models import Author, Book
+from lms.utils.cache import invalidate_books
+
+BOOK_FIELDS = ("title", "publisher", "genre", "quantity", "is_available")
+# Rows per INSERT statement. Larger statements spend more time in
+# parameter binding than they save in round trips.
+INSERT_BATCH_SIZE = 1000
+
+
+def split_name(name):
+    """``"Laxmi Prasad Devkota"`` -> ``("Laxmi Prasad", "Devkota")``."""
+    parts = name.split()
+    if len(parts) < 2:
+        return name.strip(), ""
+    return " ".join(parts[:-1]), parts[-1]
+
+
+def parse_authors(value):
+    """
+    Authors as a list of names or of ``{"first_name", "last_name", ...}``
+    objects (JSONL), or one string of names separated by ``;`` (CSV).
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = [name for name in value.split(";") if name.strip()]
+    authors = []
+    for item in value:
+        if isinstance(item, str):
+            first_name, last_name = split_name(item)
+            item = {"first_name": first_name, "last_name": last_name}
+        authors.append(
+            {
+                "first_name": (item.get("first_name") or "").strip(),
+                "last_name": (item.get("last_name") or "").strip(),
+                "address": item.get("address") or None,
+                "country": item.get("country") or None,
+            }
+        )
+    return authors
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+
+class Command(BaseCommand):
+    help = (
+        "Import books and authors from a CSV or JSONL feed in batches. "
+        "Books already in the catalog (same title and publisher) are skipped, "
+        "so re-running an import is safe; --checkpoint resumes where it stopped"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSONL file")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="Feed format; guessed from the file extension by default",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows inserted per transaction",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="File recording how many rows are done; resumes from it",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        feed_format = options["format"] or (
+            "csv" if path.lower().endswith(".csv") else "jsonl"
+        )
+        batch_size = options["batch_size"]
+        checkpoint = options["checkpoint"]
+        done = self.read_checkpoint(checkpoint)
+
+        # (first_name, last_name) -> id, for every author in the catalog.
+        self.authors = {
+            (first_name or "", last_name or ""): pk
+            for pk, first_name, last_name in Author.objects.values_list(
+                "pk", "first_name", "last_name"
+            ).iterator(chunk_size=10000)
+        }
+        self.stats = {"books": 0, "authors": 0, "skipped": 0, "invalid": 0}
+
+        resumed_at = done
+        started = time.monotonic()
+        with open(path, newline="", encoding="utf-8") as feed:
+            rows = islice(self.read_rows(feed, feed_format), done, None)
+            if done:
+                self.stdout.write(f"Resuming after row {done}...")
+            while batch := list(islice(rows, batch_size)):
+                with transaction.atomic():
+                    self.import_batch(batch)
+                done += len(batch)
+                self.write_checkpoint(checkpoint, done)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"{done} rows: {self.stats['books']} books and "
+                    f"{self.stats['authors']} authors created, "
+                    f"{self.stats['skipped']} skipped, "
+                    f"{self.stats['invalid']} invalid "
+                    f"({(done - resumed_at) / elapsed:.0f} rows/s)"
+                )
+
+        invalidate_books()
+        self.stdout.write(self.style.SUCCESS("Catalog imported!"))
+
+    def read_rows(self, feed, feed_format):
+        """Yield one dict per feed row, without reading the file up front."""
+        if feed_format == "csv":
+            yield from csv.DictReader(feed)
+            return
+        for line_number, line in enumerate(feed, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                raise CommandError(f"Line {line_number} is not valid JSON.")
+
+    def import_batch(self, rows):
+        books = {}
+        for row in rows:
+            title = (row.get("title") or "").strip()
+            if not title:
+                self.stats["invalid"] += 1
+                continue
+            publisher = (row.get("publisher") or "").strip() or None
+            key = (title, publisher)
+            if key in books:
+                self.stats["skipped"] += 1
+                continue
+            try:
+                quantity = int(row.get("quantity") or 0)
+            except ValueError:
+                self.stats["invalid"] += 1
+                continue
+            is_available = row.get("is_available")
+            books[key] = {
+                "title": title,
+                "publisher": publisher,
+                "genre": (row.get("genre") or "").strip() or None,
+                "quantity": quantity,
+                "is_available": (
+                    quantity > 0
+                    if is_available in (None, "")
+                    else parse_bool(is_available)
+                ),
+                "authors": parse_authors(row.get("authors")),
+            }
+
+        existing = set(
+            Book.objects.filter(title__in={title for title, _ in books}).values_list(
+                "title", "publisher"
+            )
+        )
+        for key in existing & books.keys():
+            del books[key]
+            self.stats["skipped"] += 1
+        if not books:
+            return
+
+        self.create_missing_authors(
+            author for book in books.values() for author in book["authors"]
+        )
+        created = Book.objects.bulk_create(
+            [
+                Book(**{field: book[field] for field in BOOK_FIELDS})
+                for book in books.values()
+            ],
+            batch_size=INSERT_BATCH_SIZE,
+        )
+        Through = Book.authors.through
+        Through.objects.bulk_create(
+            [
+                Through(
+                    book_id=instance.pk,
+                    author_id=self.authors[(author["first_name"], author["last_name"])],
+                )
+                for instance, book in zip(created, books.values())
+                for author in book["authors"]
+            ],
+            batch_size=INSERT_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        Book.objects.update_search_vectors([instance.pk for instance in created])
+        self.stats["books"] += len(created)
+
+    def create_missing_authors(self, authors):
+        missing = {}
+        for author in authors:
+            key = (author["first_name"], author["last_name"])
+            if key not in self.authors and key not in missing:
+                missing[key] = Author(**author)
+        if not missing:
+            return
+        for instance in Author.objects.bulk_create(
+            missing.values(), batch_size=INSERT_BATCH_SIZE
+        ):
+            self.authors[(instance.first_name, instance.last_name)] = instance.pk
+        self.stats["authors"] += len(missing)
+
+    def read_checkpoint(self, checkpoint):
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as f:
+            return int(f.read().strip() or 0)
+
+    def write_checkpoint(self, checkpoint, done):
+        if not checkpoint:
+            return
+        # Written to a temporary file first so a crash never leaves it empty.
+        with open(f"{checkpoint}.tmp", "w") as f:
+            f.write(str(done))
+        os.replace(f"{checkpoint}.tmp", checkpoint)
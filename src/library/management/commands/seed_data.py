@@ -109,6 +109,7 @@ class Command(BaseCommand):
             },
         ]
 
+        seeded_ids = []
         for book_data in books_data:
             book, created = Book.objects.get_or_create(
                 title=book_data["title"],
@@ -122,5 +123,8 @@ class Command(BaseCommand):
             if created:
                 selected_authors = [authors[i] for i in book_data["author_indices"]]
                 book.authors.set(selected_authors)
+            seeded_ids.append(book.id)
+
+        Book.objects.update_search_vectors(seeded_ids)
 
         self.stdout.write(self.style.SUCCESS("Data seeded successfully!"))
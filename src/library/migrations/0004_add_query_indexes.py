@@ -0,0 +1,55 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:42
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking writes to tables that are already
+    # large; CREATE INDEX CONCURRENTLY cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ("library", "0003_delete_bookreview"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="book",
+            index=models.Index(
+                condition=models.Q(("is_deleted", False)),
+                fields=["-created_at", "-id"],
+                name="books_active_created_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="borrow",
+            index=models.Index(
+                fields=["-borrowed_at", "-id"], name="borrows_borrowed_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="borrow",
+            index=models.Index(
+                fields=["users", "-borrowed_at", "-id"],
+                name="borrows_user_borrowed_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="borrow",
+            index=models.Index(
+                fields=["books", "-borrowed_at", "-id"],
+                name="borrows_book_borrowed_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="borrow",
+            index=models.Index(
+                condition=models.Q(("is_returned", False)),
+                fields=["books"],
+                name="borrows_active_book_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:51
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Build the index without locking writes to the books table; CREATE
+    # INDEX CONCURRENTLY cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ("library", "0005_book_search_vector"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="book",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="books_search_idx"
+            ),
+        ),
+    ]
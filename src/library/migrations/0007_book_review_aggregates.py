@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0006_book_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="rating_avg",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name="book",
+            name="review_count",
+            field=models.IntegerField(default=0),
+        ),
+    ]
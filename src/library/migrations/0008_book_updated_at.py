@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-18 23:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0007_book_review_aggregates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-19 00:20
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the index without locking writes to the books table; CREATE
+    # INDEX CONCURRENTLY cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ("library", "0008_book_updated_at"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="book",
+            index=models.Index(fields=["title", "publisher"], name="books_title_idx"),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0009_book_title_index"),
+    ]
+
+    operations = [
+        # One row, bumped by lms.utils.cache.invalidate_books. Kept in the
+        # database so every worker, the admin and management commands agree
+        # on the catalog version.
+        migrations.RunSQL(
+            sql=[
+                "CREATE TABLE catalog_version ("
+                "id smallint PRIMARY KEY CHECK (id = 1), "
+                "version bigint NOT NULL, "
+                "changed_at timestamp with time zone NOT NULL)",
+                "INSERT INTO catalog_version VALUES (1, 1, now())",
+            ],
+            reverse_sql="DROP TABLE catalog_version",
+        ),
+    ]
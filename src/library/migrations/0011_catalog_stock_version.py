@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0010_catalog_version"),
+    ]
+
+    operations = [
+        # Bumped by lms.utils.cache.invalidate_stock on borrows and returns,
+        # which change a book's stock but not the rest of the catalog.
+        migrations.RunSQL(
+            sql=(
+                "ALTER TABLE catalog_version "
+                "ADD COLUMN stock_version bigint NOT NULL DEFAULT 1"
+            ),
+            reverse_sql="ALTER TABLE catalog_version DROP COLUMN stock_version",
+        ),
+    ]
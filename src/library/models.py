@@ -1,6 +1,13 @@
-from django.db import models
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import models, transaction
+from django.db.models.functions import Concat
+from django.utils import timezone
 from users.models import User
 
+SEARCH_CONFIG = "english"
+
 
 class Author(models.Model):
     class Meta:
@@ -12,9 +19,103 @@ class Author(models.Model):
     country = models.CharField(max_length=255, null=True)
 
 
+class BookManager(models.Manager):
+    def checkout(self, pk):
+        """
+        Take one copy of a book out of stock in a single conditional UPDATE.
+        Returns False when the book is deleted, unavailable or out of stock.
+        """
+        updated = self.filter(
+            pk=pk, is_deleted=False, is_available=True, quantity__gt=0
+        ).update(
+            quantity=models.F("quantity") - 1,
+            is_available=models.Case(
+                models.When(quantity__gt=1, then=models.Value(True)),
+                default=models.Value(False),
+            ),
+            updated_at=timezone.now(),
+        )
+        return updated == 1
+
+    def checkin(self, pk):
+        updated = self.filter(pk=pk).update(
+            quantity=models.F("quantity") + 1,
+            is_available=True,
+            updated_at=timezone.now(),
+        )
+        return updated == 1
+
+    def author_names(self, delimiter=" "):
+        """Subquery of a book's author full names joined by ``delimiter``."""
+        return models.Subquery(
+            self.model.authors.through.objects.filter(book_id=models.OuterRef("pk"))
+            .values("book_id")
+            .annotate(
+                names=StringAgg(
+                    Concat(
+                        "author__first_name",
+                        models.Value(" "),
+                        "author__last_name",
+                    ),
+                    delimiter=delimiter,
+                )
+            )
+            .values("names")
+        )
+
+    def update_search_vectors(self, pks=None):
+        """
+        Recompute the stored search document from the title, author names,
+        publisher and genre. Call it after a book or its authors change.
+        """
+        queryset = self.all() if pks is None else self.filter(pk__in=pks)
+        return queryset.update(
+            search_vector=SearchVector("title", weight="A", config=SEARCH_CONFIG)
+            + SearchVector(self.author_names(), weight="B", config=SEARCH_CONFIG)
+            + SearchVector("publisher", "genre", weight="C", config=SEARCH_CONFIG)
+        )
+
+    def record_review(self, pk, rating):
+        """Fold a new review's rating into the book's running aggregates."""
+        count = models.F("review_count")
+        return self.filter(pk=pk).update(
+            review_count=count + 1,
+            rating_avg=models.ExpressionWrapper(
+                (models.F("rating_avg") * count + rating) / (count + 1),
+                output_field=models.FloatField(),
+            ),
+            updated_at=timezone.now(),
+        )
+
+    def discard_review(self, pk, rating):
+        """Take a soft-deleted review's rating back out of the aggregates."""
+        count = models.F("review_count")
+        return self.filter(pk=pk, review_count__gt=0).update(
+            review_count=count - 1,
+            rating_avg=models.Case(
+                models.When(review_count__lte=1, then=models.Value(0.0)),
+                default=models.ExpressionWrapper(
+                    (models.F("rating_avg") * count - rating) / (count - 1),
+                    output_field=models.FloatField(),
+                ),
+            ),
+            updated_at=timezone.now(),
+        )
+
+
 class Book(models.Model):
     class Meta:
         db_table = "books"
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(is_deleted=False),
+                name="books_active_created_idx",
+            ),
+            GinIndex(fields=["search_vector"], name="books_search_idx"),
+            # Natural key used by import_catalog to skip known titles.
+            models.Index(fields=["title", "publisher"], name="books_title_idx"),
+        ]
 
     title = models.CharField(max_length=255)
     is_available = models.BooleanField(default=True)
@@ -22,13 +123,37 @@ class Book(models.Model):
     publisher = models.CharField(max_length=255, null=True)
     genre = models.CharField(max_length=100, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also set by the BookManager and bulk borrow updates, which bypass
+    # save(); conditional GETs use it as the book's version.
+    updated_at = models.DateTimeField(auto_now=True)
     is_deleted = models.BooleanField(default=False)
     authors = models.ManyToManyField(Author, related_name="books", blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    review_count = models.IntegerField(default=0)
+    rating_avg = models.FloatField(default=0)
+
+    objects = BookManager()
 
 
 class Borrow(models.Model):
     class Meta:
         db_table = "borrows"
+        indexes = [
+            models.Index(fields=["-borrowed_at", "-id"], name="borrows_borrowed_idx"),
+            models.Index(
+                fields=["users", "-borrowed_at", "-id"],
+                name="borrows_user_borrowed_idx",
+            ),
+            models.Index(
+                fields=["books", "-borrowed_at", "-id"],
+                name="borrows_book_borrowed_idx",
+            ),
+            models.Index(
+                fields=["books"],
+                condition=models.Q(is_returned=False),
+                name="borrows_active_book_idx",
+            ),
+        ]
 
     users = models.ForeignKey(User, on_delete=models.CASCADE, related_name="borrows")
     books = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="borrows")
@@ -36,3 +161,17 @@ class Borrow(models.Model):
     borrow_duration = models.IntegerField(default=15)
     is_returned = models.BooleanField(default=False)
 
+    def mark_returned(self):
+        """
+        Flip the borrow to returned and put the copy back in stock. Only the
+        request that actually flips ``is_returned`` restocks the book, so
+        repeated returns of the same borrow are no-ops.
+        """
+        with transaction.atomic():
+            updated = Borrow.objects.filter(pk=self.pk, is_returned=False).update(
+                is_returned=True
+            )
+            if updated:
+                Book.objects.checkin(self.books_id)
+        self.is_returned = True
+        return updated == 1
@@ -1,11 +1,30 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, Prefetch, QuerySet, Value, When
+from django.utils import timezone
+from django.utils.functional import cached_property
 from rest_framework import serializers
 from .models import Book, Author, Borrow
+from users.models import User
 from users.serializers import UserSerializer
+from lms.utils.cache import invalidate_books, invalidate_stock
+from lms.utils.metrics import record_borrows, record_returns
+from lms.utils.serializers import (
+    CompiledReadMixin,
+    Selection,
+    SparseFieldsMixin,
+    sub_expand,
+    sub_fields,
+    wants,
+)
+
+BULK_BORROW_MAX_ITEMS = 500
 
 # from reviews.serializers import BookReviewListSerializer
 
 
-class AuthorSerializer(serializers.ModelSerializer):
+class AuthorSerializer(CompiledReadMixin, serializers.ModelSerializer):
     class Meta:
         model = Author
         fields = ["id", "first_name", "last_name", "address", "country"]
@@ -32,6 +51,8 @@ class BookAddSerializer(serializers.ModelSerializer):
             author, _ = Author.objects.get_or_create(**author_data)
             book.authors.add(author)
             author.save()
+        Book.objects.update_search_vectors([book.id])
+        invalidate_books(book.id)
         return book
 
     def to_representation(self, instance):
@@ -53,13 +74,34 @@ class BookAddSerializer(serializers.ModelSerializer):
                 author, _ = Author.objects.get_or_create(**author_data)
                 instance.authors.add(author)
 
+        Book.objects.update_search_vectors([instance.id])
+        invalidate_books(instance.id)
         return instance
 
 
-class BookListSerializer(serializers.ModelSerializer):
+class BookListSerializer(
+    CompiledReadMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
+    """
+    Reads an optional ``reviews`` context value: ``"all"`` (default) inlines
+    every review, ``"top3"`` the three best rated and ``"none"`` drops the
+    field so only ``review_count`` and ``rating_avg`` are returned.
+    """
+
+    REVIEW_MODES = ("all", "top3", "none")
+
     authors = AuthorSerializer(many=True, read_only=True)
     reviews = serializers.SerializerMethodField()
 
+    collapsed_fields = {
+        "authors": lambda: serializers.PrimaryKeyRelatedField(
+            many=True, read_only=True
+        ),
+        "reviews": lambda: serializers.SerializerMethodField(
+            method_name="get_review_ids"
+        ),
+    }
+
     class Meta:
         model = Book
         fields = [
@@ -71,17 +113,89 @@ class BookListSerializer(serializers.ModelSerializer):
             "genre",
             "created_at",
             "is_deleted",
+            "review_count",
+            "rating_avg",
             "authors",
             "reviews",
         ]
 
-    def get_reviews(self, obj):
+    @staticmethod
+    def reviews_queryset(reviews: str = "all", expand: Selection = None) -> QuerySet:
+        from reviews.models import BookReview
+
+        queryset = BookReview.objects.filter(is_deleted=False)
+        if wants(expand, "user"):
+            queryset = queryset.select_related("user")
+        if reviews == "top3":
+            return queryset.order_by("-rating", "-created_at")
+        return queryset.order_by("-created_at")
+
+    @staticmethod
+    def setup_eager_loading(
+        queryset: QuerySet,
+        prefix: str = "",
+        reviews: str = "all",
+        fields: Selection = None,
+        expand: Selection = None,
+    ) -> QuerySet:
+        if wants(fields, "authors"):
+            queryset = queryset.prefetch_related(f"{prefix}authors")
+        if reviews == "none" or not wants(fields, "reviews"):
+            return queryset
+
+        if wants(expand, "reviews"):
+            reviews_queryset = BookListSerializer.reviews_queryset(
+                reviews, sub_expand(expand, "reviews")
+            )
+        else:
+            reviews_queryset = BookListSerializer.reviews_queryset(reviews, set()).only(
+                "id", "book_id"
+            )
+        if reviews == "top3":
+            # A sliced prefetch has to land in a plain list attribute.
+            return queryset.prefetch_related(
+                Prefetch(
+                    f"{prefix}reviews",
+                    queryset=reviews_queryset[:3],
+                    to_attr="top_reviews",
+                )
+            )
+        return queryset.prefetch_related(
+            Prefetch(f"{prefix}reviews", queryset=reviews_queryset)
+        )
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.context.get("reviews") == "none":
+            fields.pop("reviews", None)
+        return fields
+
+    def get_review_list(self, obj):
+        if self.context.get("reviews") == "top3" and hasattr(obj, "top_reviews"):
+            return obj.top_reviews
+        if "reviews" in getattr(obj, "_prefetched_objects_cache", {}):
+            return obj.reviews.all()
+
+        mode = self.context.get("reviews", "all")
+        reviews = self.reviews_queryset(mode).filter(book=obj)
+        if mode == "top3":
+            reviews = reviews[:3]
+        return reviews
+
+    @cached_property
+    def review_list_serializer(self):
         from reviews.serializers import BookReviewListSerializer
 
-        reviews = obj.reviews.filter(is_deleted=False).order_by("-created_at")
+        # Built once per serializer instead of once per book.
         return BookReviewListSerializer(
-            reviews, many=True, context={"request": self.context.get("request")}
-        ).data
+            many=True, context=self.nested_context("reviews")
+        )
+
+    def get_reviews(self, obj):
+        return self.review_list_serializer.to_representation(self.get_review_list(obj))
+
+    def get_review_ids(self, obj):
+        return [review.id for review in self.get_review_list(obj)]
 
 
 class BorrowSerializer(serializers.ModelSerializer):
@@ -95,14 +209,15 @@ class BorrowSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         book = validated_data["books"]
-        if not book.is_available or book.is_deleted or book.quantity <= 0:
-            raise serializers.ValidationError(
-                "This book is not available for borrowing."
-            )
-        borrow = Borrow.objects.create(**validated_data)
-        book.quantity -= 1
-        book.is_available = book.quantity > 0
-        book.save()
+        with transaction.atomic():
+            if not Book.objects.checkout(book.pk):
+                raise serializers.ValidationError(
+                    "This book is not available for borrowing."
+                )
+            borrow = Borrow.objects.create(**validated_data)
+            invalidate_stock(book.pk)
+            record_borrows()
+        book.refresh_from_db(fields=["quantity", "is_available"])
         return borrow
 
     def to_representation(self, instance):
@@ -117,21 +232,25 @@ class BorrowSerializer(serializers.ModelSerializer):
         return representation
 
     def update(self, instance, validated_data):
+        is_returned = validated_data.pop("is_returned", False)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        if instance.is_returned:
-            book = instance.books
-            book.quantity += 1
-            book.is_available = book.quantity > 0
-            book.save()
         instance.save()
+        if is_returned and instance.mark_returned():
+            invalidate_stock(instance.books_id)
+            record_returns()
         return instance
 
 
-class BorrowListSerializer(serializers.ModelSerializer):
+class BorrowListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     users = UserSerializer()
     books = BookListSerializer()
 
+    collapsed_fields = {
+        "users": lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+        "books": lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+    }
+
     class Meta:
         model = Borrow
         fields = [
@@ -143,6 +262,21 @@ class BorrowListSerializer(serializers.ModelSerializer):
             "is_returned",
         ]
 
+    @staticmethod
+    def setup_eager_loading(
+        queryset: QuerySet, fields: Selection = None, expand: Selection = None
+    ) -> QuerySet:
+        if wants(fields, "users") and wants(expand, "users"):
+            queryset = queryset.select_related("users")
+        if wants(fields, "books") and wants(expand, "books"):
+            queryset = BookListSerializer.setup_eager_loading(
+                queryset.select_related("books"),
+                prefix="books__",
+                fields=sub_fields(fields, "books"),
+                expand=sub_expand(expand, "books"),
+            )
+        return queryset
+
 
 class BorrowUpdateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -150,11 +284,163 @@ class BorrowUpdateSerializer(serializers.ModelSerializer):
         fields = ["is_returned"]
 
     def update(self, instance, validated_data):
-        instance.is_returned = validated_data.get("is_returned", instance.is_returned)
-        if instance.is_returned:
-            book = instance.books
-            book.quantity += 1
-            book.is_available = book.quantity > 0
-            book.save()
-        instance.save()
+        is_returned = validated_data.get("is_returned", instance.is_returned)
+        if is_returned:
+            if instance.mark_returned():
+                invalidate_stock(instance.books_id)
+                record_returns()
+        else:
+            # Un-returning takes the copy back out of stock. Only the request
+            # that flips ``is_returned`` does, like ``Borrow.mark_returned``.
+            with transaction.atomic():
+                reopened = Borrow.objects.filter(
+                    pk=instance.pk, is_returned=True
+                ).update(is_returned=False)
+                if reopened and not Book.objects.checkout(instance.books_id):
+                    raise serializers.ValidationError(
+                        "This book is not available for borrowing."
+                    )
+            if reopened:
+                invalidate_stock(instance.books_id)
+            instance.is_returned = False
         return instance
+
+
+class BorrowBulkItemSerializer(serializers.Serializer):
+    users = serializers.IntegerField()
+    books = serializers.IntegerField()
+    borrow_duration = serializers.IntegerField(required=False, default=15)
+
+
+class BorrowBulkSerializer(serializers.Serializer):
+    items = BorrowBulkItemSerializer(
+        many=True, allow_empty=False, max_length=BULK_BORROW_MAX_ITEMS
+    )
+
+    def create(self, validated_data):
+        items = validated_data["items"]
+        results = []
+        borrows = []
+        taken = Counter()
+
+        with transaction.atomic():
+            users = User.objects.in_bulk({item["users"] for item in items})
+            books = (
+                Book.objects.select_for_update()
+                .filter(is_deleted=False, is_available=True)
+                .only("id", "quantity")
+                .in_bulk({item["books"] for item in items})
+            )
+
+            for index, item in enumerate(items):
+                result = {
+                    "index": index,
+                    "users": item["users"],
+                    "books": item["books"],
+                }
+                book = books.get(item["books"])
+                if item["users"] not in users:
+                    result.update(success=False, error="User not found.")
+                elif book is None or book.quantity - taken[book.pk] <= 0:
+                    result.update(
+                        success=False,
+                        error="This book is not available for borrowing.",
+                    )
+                else:
+                    taken[book.pk] += 1
+                    result["success"] = True
+                    borrows.append(
+                        Borrow(
+                            users_id=item["users"],
+                            books_id=item["books"],
+                            borrow_duration=item["borrow_duration"],
+                        )
+                    )
+                results.append(result)
+
+            if borrows:
+                Borrow.objects.bulk_create(borrows)
+                Book.objects.filter(pk__in=taken).update(
+                    quantity=F("quantity")
+                    - Case(
+                        *[When(pk=pk, then=Value(n)) for pk, n in taken.items()],
+                        default=Value(0),
+                    ),
+                    is_available=Case(
+                        *[
+                            When(pk=pk, quantity__gt=n, then=Value(True))
+                            for pk, n in taken.items()
+                        ],
+                        default=Value(False),
+                    ),
+                    updated_at=timezone.now(),
+                )
+                invalidate_stock(*taken)
+                record_borrows(len(borrows))
+
+        created = iter(borrows)
+        for result in results:
+            if result["success"]:
+                result["id"] = next(created).pk
+        return results
+
+
+class BorrowBulkReturnSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=BULK_BORROW_MAX_ITEMS,
+    )
+
+    def create(self, validated_data):
+        ids = validated_data["ids"]
+        results = []
+        returned = set()
+        restock = Counter()
+
+        with transaction.atomic():
+            borrows = (
+                Borrow.objects.select_for_update()
+                .only("id", "books_id", "is_returned")
+                .in_bulk(set(ids))
+            )
+            for borrow_id in ids:
+                borrow = borrows.get(borrow_id)
+                if borrow is None:
+                    results.append(
+                        {
+                            "id": borrow_id,
+                            "success": False,
+                            "error": "Borrow not found.",
+                        }
+                    )
+                elif borrow.is_returned or borrow_id in returned:
+                    results.append(
+                        {
+                            "id": borrow_id,
+                            "success": False,
+                            "error": "Borrow already returned.",
+                        }
+                    )
+                else:
+                    returned.add(borrow_id)
+                    restock[borrow.books_id] += 1
+                    results.append({"id": borrow_id, "success": True})
+
+            if returned:
+                Borrow.objects.filter(pk__in=returned, is_returned=False).update(
+                    is_returned=True
+                )
+                Book.objects.filter(pk__in=restock).update(
+                    quantity=F("quantity")
+                    + Case(
+                        *[When(pk=pk, then=Value(n)) for pk, n in restock.items()],
+                        default=Value(0),
+                    ),
+                    is_available=True,
+                    updated_at=timezone.now(),
+                )
+                invalidate_stock(*restock)
+                record_returns(len(returned))
+
+        return results
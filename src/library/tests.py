@@ -1,3 +1,975 @@
-from django.test import TestCase
+import asyncio
+import base64
+import json
+import random
+import threading
 
-# Create your tests here.
+from django.db import connection
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers, status
+from rest_framework.permissions import AllowAny
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .models import Author, Book, Borrow
+from .serializers import BULK_BORROW_MAX_ITEMS
+from lms.utils.cache import cache_stats, get_cache, invalidate_books
+from lms.utils.pagination import paginated_list_response
+from lms.utils.response import api_response
+from lms.utils.views import AsyncAPIView
+from reviews.models import BookReview
+from users.models import User
+from users.tokens import UserRefreshToken
+
+
+def create_catalog(books=12, readers=12):
+    """
+    Books with one to three authors each, borrowed and reviewed once by
+    every reader. Returns the books and a librarian.
+    """
+    librarian = User.objects.create(email="librarian@example.com", role="librarian")
+    users = User.objects.bulk_create(
+        User(email=f"reader{i}@example.com") for i in range(readers)
+    )
+    authors = Author.objects.bulk_create(
+        Author(first_name=f"Author {i}", last_name="Example") for i in range(3)
+    )
+    created = Book.objects.bulk_create(
+        Book(title=f"Book {i}", quantity=readers) for i in range(books)
+    )
+    for i, book in enumerate(created):
+        book.authors.set(authors[: 1 + i % 3])
+    Borrow.objects.bulk_create(
+        Borrow(users=user, books=book) for book in created for user in users
+    )
+    BookReview.objects.bulk_create(
+        BookReview(user=user, book=book, rating=4, comment="Good read")
+        for book in created
+        for user in users
+    )
+    return created, librarian
+
+
+class IndexTestCase(TestCase):
+    def assertUsesIndex(self, queryset, index):
+        """
+        ``queryset`` can be answered from ``index``. Sequential scans are
+        turned off for the check, since a table of a few rows is cheaper to
+        scan than to look up, and so are bitmap scans, which the planner
+        picks over other indexes once earlier tests leave dead rows behind.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_bitmapscan = off")
+        self.assertIn(index, queryset.explain())
+
+
+def authenticated_client(user):
+    client = APIClient()
+    token = UserRefreshToken.for_user(user).access_token
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+    return client
+
+
+class CountingSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+
+    rows = 0
+
+    def to_representation(self, instance):
+        type(self).rows += 1
+        return super().to_representation(instance)
+
+
+class PaginatedListResponseTests(TestCase):
+    def list_page(self, limit):
+        request = Request(APIRequestFactory().get("/", {"limit": limit}))
+        CountingSerializer.rows = 0
+        with CaptureQueriesContext(connection) as queries:
+            response = paginated_list_response(
+                request, Book.objects.order_by("pk"), CountingSerializer
+            )
+        return response, [query["sql"] for query in queries.captured_queries]
+
+    def add_books(self, count):
+        Book.objects.bulk_create(
+            Book(title=f"Book {i}", quantity=1) for i in range(count)
+        )
+
+    def test_page_is_sliced_before_serializing(self):
+        self.add_books(30)
+        response, queries = self.list_page(5)
+
+        self.assertEqual(len(response.data["data"]), 5)
+        self.assertEqual(response.data["count"], 30)
+        self.assertEqual(CountingSerializer.rows, 5)
+        rows = [sql for sql in queries if "COUNT(" not in sql]
+        self.assertEqual(len(rows), 1)
+        self.assertIn("LIMIT 5", rows[0])
+
+    def test_cost_does_not_grow_with_the_table(self):
+        self.add_books(10)
+        _, small = self.list_page(5)
+        self.add_books(500)
+        response, large = self.list_page(5)
+
+        self.assertEqual(response.data["count"], 510)
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(CountingSerializer.rows, 5)
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.books, cls.librarian = create_catalog(books=8, readers=2)
+
+    def setUp(self):
+        self.client = authenticated_client(self.librarian)
+
+    def walk(self, url, link="next"):
+        """Ids of every page from ``url`` on, following ``link``."""
+        pages = []
+        while url is not None:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            self.assertNotIn("count", page)
+            pages.append([row["id"] for row in page["data"]])
+            url = page[link]
+        return pages, page
+
+    def assertRoundTrip(self, url, expected):
+        forward, last = self.walk(url)
+        self.assertEqual(sum(forward, []), expected)
+        self.assertTrue(all(len(ids) == 3 for ids in forward[:-1]))
+
+        # Back from the last page through the previous links.
+        backward, first = self.walk(last["previous"], "previous")
+        self.assertEqual(backward, forward[-2::-1])
+        self.assertIsNone(first["previous"])
+
+    def test_books_round_trip(self):
+        expected = list(
+            Book.objects.order_by("-created_at", "-pk").values_list("pk", flat=True)
+        )
+        self.assertRoundTrip("/api/v1/books/?cursor=&limit=3", expected)
+
+    def test_borrows_round_trip(self):
+        expected = list(
+            Borrow.objects.order_by("-borrowed_at", "-pk").values_list("pk", flat=True)
+        )
+        self.assertRoundTrip("/api/v1/borrow/?cursor=&limit=3", expected)
+
+    def test_rows_sharing_a_timestamp_are_ordered_by_id(self):
+        Book.objects.update(created_at=self.books[0].created_at)
+        expected = sorted((book.pk for book in self.books), reverse=True)
+
+        self.assertRoundTrip("/api/v1/books/?cursor=&limit=3", expected)
+
+    def test_invalid_cursor_is_not_found(self):
+        def encode(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+        for cursor in (
+            "not a cursor",
+            encode(["a", "list"]),
+            encode({"v": "yesterday", "i": 1, "r": False}),
+            encode({"v": "2026-01-01T00:00:00+00:00", "i": "one", "r": False}),
+            encode({"v": "2026-01-01T00:00:00+00:00", "i": 1}),
+        ):
+            with self.subTest(cursor=cursor):
+                response = self.client.get("/api/v1/books/", {"cursor": cursor})
+                self.assertEqual(response.status_code, 404)
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class ListQueryCountTests(TestCase):
+    """Each list runs a fixed number of queries, whatever the page size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.books, cls.librarian = create_catalog()
+
+    def setUp(self):
+        self.client = authenticated_client(self.librarian)
+
+    def assertQueriesPerPage(self, path, queries):
+        for limit in (2, 10):
+            with self.subTest(limit=limit), self.assertNumQueries(queries):
+                response = self.client.get(path, {"limit": limit})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()["data"]), limit)
+
+    def test_books(self):
+        # One of them reads the catalog version.
+        self.assertQueriesPerPage("/api/v1/books/", 5)
+
+    def test_borrows(self):
+        self.assertQueriesPerPage("/api/v1/borrow/", 4)
+
+    def test_book_borrows(self):
+        self.assertQueriesPerPage(f"/api/v1/books/{self.books[0].pk}/borrow/", 5)
+
+
+class QueryIndexTests(IndexTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.books, cls.librarian = create_catalog(books=3, readers=3)
+        cls.book = cls.books[0]
+        cls.user = cls.book.borrows.first().users
+
+    def test_book_list(self):
+        self.assertUsesIndex(
+            Book.objects.filter(is_deleted=False).order_by("-created_at", "-id")[:20],
+            "books_active_created_idx",
+        )
+
+    def test_borrow_list(self):
+        self.assertUsesIndex(
+            Borrow.objects.order_by("-borrowed_at", "-id")[:20],
+            "borrows_borrowed_idx",
+        )
+
+    def test_borrows_of_user(self):
+        self.assertUsesIndex(
+            Borrow.objects.filter(users=self.user).order_by("-borrowed_at", "-id")[:20],
+            "borrows_user_borrowed_idx",
+        )
+
+    def test_borrows_of_book(self):
+        self.assertUsesIndex(
+            Borrow.objects.filter(books=self.book).order_by("-borrowed_at", "-id")[:20],
+            "borrows_book_borrowed_idx",
+        )
+
+    def test_active_borrows_of_book(self):
+        self.assertUsesIndex(
+            Borrow.objects.filter(books=self.book, is_returned=False),
+            "borrows_active_book_idx",
+        )
+
+
+class BorrowReturnTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create(
+            email="librarian@example.com", role="librarian"
+        )
+        reader = User.objects.create(email="reader@example.com")
+        cls.book = Book.objects.create(title="Book", quantity=2)
+        Book.objects.checkout(cls.book.pk)
+        cls.borrow = Borrow.objects.create(users=reader, books=cls.book)
+
+    def setUp(self):
+        self.client = authenticated_client(self.librarian)
+
+    def set_returned(self, value):
+        return self.client.patch(
+            f"/api/v1/borrow/{self.borrow.pk}/", {"is_returned": value}, format="json"
+        )
+
+    def test_return_and_unreturn_keep_stock(self):
+        for value in (True, True, False, True):
+            self.assertEqual(self.set_returned(value).status_code, 200)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.quantity, 2)
+
+        self.set_returned(False)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.quantity, 1)
+
+    def test_unreturn_needs_a_copy_in_stock(self):
+        self.set_returned(True)
+        Book.objects.filter(pk=self.book.pk).update(quantity=0, is_available=False)
+
+        self.assertEqual(self.set_returned(False).status_code, 400)
+        self.borrow.refresh_from_db()
+        self.assertTrue(self.borrow.is_returned)
+
+
+class ConcurrentBorrowReturnTests(TransactionTestCase):
+    """Racing returns and un-returns never change stock more than once."""
+
+    threads = 8
+    requests = 20
+
+    def test_stock_matches_borrows(self):
+        librarian = User.objects.create(email="librarian@example.com", role="librarian")
+        readers = User.objects.bulk_create(
+            User(email=f"reader{i}@example.com") for i in range(3)
+        )
+        book = Book.objects.create(title="Book", quantity=5)
+        borrows = []
+        for reader in readers:
+            Book.objects.checkout(book.pk)
+            borrows.append(Borrow.objects.create(users=reader, books=book))
+        barrier = threading.Barrier(self.threads)
+        errors = []
+
+        def patch_borrows(seed):
+            rng = random.Random(seed)
+            client = authenticated_client(librarian)
+            try:
+                barrier.wait()
+                for _ in range(self.requests):
+                    response = client.patch(
+                        f"/api/v1/borrow/{rng.choice(borrows).pk}/",
+                        {"is_returned": rng.random() < 0.5},
+                        format="json",
+                    )
+                    if response.status_code != 200:
+                        errors.append(response.status_code)
+            finally:
+                connection.close()
+
+        workers = [
+            threading.Thread(target=patch_borrows, args=(seed,))
+            for seed in range(self.threads)
+        ]
+        with override_settings(API_CACHE_TIMEOUT=0):
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+        self.assertEqual(errors, [])
+        book.refresh_from_db()
+        active = Borrow.objects.filter(books=book, is_returned=False).count()
+        self.assertEqual(book.quantity + active, 5)
+        self.assertEqual(book.is_available, book.quantity > 0)
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Racing checkouts, single and bulk, never lend more copies than exist."""
+
+    threads = 8
+    requests = 15
+
+    def test_stock_is_never_oversold(self):
+        librarian = User.objects.create(email="librarian@example.com", role="librarian")
+        readers = User.objects.bulk_create(
+            User(email=f"reader{i}@example.com") for i in range(self.threads)
+        )
+        books = [
+            Book.objects.create(title="Scarce", quantity=1),
+            Book.objects.create(title="Rare", quantity=2),
+        ]
+        stock = {book.pk: book.quantity for book in books}
+        barrier = threading.Barrier(self.threads + 1)
+        errors = []
+
+        def borrow(seed):
+            rng = random.Random(seed)
+            client = authenticated_client(librarian)
+            try:
+                barrier.wait()
+                for _ in range(self.requests):
+                    response = client.post(
+                        "/api/v1/borrow/",
+                        {"users": readers[seed].pk, "books": rng.choice(books).pk},
+                        format="json",
+                    )
+                    if response.status_code == 201 and rng.random() < 0.5:
+                        # Return some, so the stock keeps changing hands.
+                        borrow_id = Borrow.objects.filter(
+                            users=readers[seed], is_returned=False
+                        ).values_list("pk", flat=True)[0]
+                        response = client.patch(
+                            f"/api/v1/borrow/{borrow_id}/",
+                            {"is_returned": True},
+                            format="json",
+                        )
+                    if response.status_code not in (200, 201, 400):
+                        errors.append(response.status_code)
+            finally:
+                connection.close()
+
+        def borrow_bulk():
+            client = authenticated_client(librarian)
+            try:
+                barrier.wait()
+                for _ in range(self.requests):
+                    response = client.post(
+                        "/api/v1/borrow/bulk/",
+                        {
+                            "items": [
+                                {"users": reader.pk, "books": book.pk}
+                                for reader in readers[:3]
+                                for book in books
+                            ]
+                        },
+                        format="json",
+                    )
+                    if response.status_code not in (201, 400):
+                        errors.append(response.status_code)
+            finally:
+                connection.close()
+
+        workers = [
+            threading.Thread(target=borrow, args=(seed,))
+            for seed in range(self.threads)
+        ]
+        workers.append(threading.Thread(target=borrow_bulk))
+        with override_settings(API_CACHE_TIMEOUT=0):
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+        self.assertEqual(errors, [])
+        for book in books:
+            book.refresh_from_db()
+            active = Borrow.objects.filter(books=book, is_returned=False).count()
+            self.assertGreaterEqual(book.quantity, 0)
+            self.assertEqual(book.quantity + active, stock[book.pk])
+            self.assertEqual(book.is_available, book.quantity > 0)
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class BulkBorrowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create(
+            email="librarian@example.com", role="librarian"
+        )
+        cls.readers = User.objects.bulk_create(
+            User(email=f"reader{i}@example.com") for i in range(3)
+        )
+        cls.pair = Book.objects.create(title="Pair", quantity=2)
+        cls.single = Book.objects.create(title="Single", quantity=1)
+        cls.deleted = Book.objects.create(title="Deleted", quantity=5, is_deleted=True)
+
+    def setUp(self):
+        self.client = authenticated_client(self.librarian)
+
+    def borrow(self, items):
+        return self.client.post("/api/v1/borrow/bulk/", {"items": items}, format="json")
+
+    def give_back(self, ids):
+        return self.client.post(
+            "/api/v1/borrow/bulk/return/", {"ids": ids}, format="json"
+        )
+
+    def test_each_item_gets_a_result(self):
+        r0, r1, r2 = (reader.pk for reader in self.readers)
+        response = self.borrow(
+            [
+                {"users": r0, "books": self.pair.pk},
+                {"users": r1, "books": self.pair.pk},
+                {"users": r2, "books": self.pair.pk},
+                {"users": 999999, "books": self.single.pk},
+                {"users": r0, "books": self.deleted.pk},
+                {"users": r0, "books": 999999},
+                {"users": r1, "books": self.single.pk},
+            ]
+        )
+
+        self.assertEqual(response.status_code, 201)
+        results = response.json()["data"]
+        self.assertEqual([result["index"] for result in results], list(range(7)))
+        self.assertEqual(
+            [result["success"] for result in results],
+            [True, True, False, False, False, False, True],
+        )
+        unavailable = "This book is not available for borrowing."
+        self.assertEqual(
+            [result.get("error") for result in results],
+            [
+                None,
+                None,
+                unavailable,
+                "User not found.",
+                unavailable,
+                unavailable,
+                None,
+            ],
+        )
+        for result in results:
+            if result["success"]:
+                borrow = Borrow.objects.get(pk=result["id"])
+                self.assertEqual(
+                    (borrow.users_id, borrow.books_id),
+                    (result["users"], result["books"]),
+                )
+            else:
+                self.assertNotIn("id", result)
+        self.assertEqual(Borrow.objects.count(), 3)
+
+    def test_items_for_one_book_share_its_stock(self):
+        self.borrow(
+            [{"users": reader.pk, "books": self.pair.pk} for reader in self.readers]
+            + [{"users": self.readers[0].pk, "books": self.single.pk}]
+        )
+
+        for book, borrowed in ((self.pair, 2), (self.single, 1)):
+            book.refresh_from_db()
+            self.assertEqual(book.quantity, 0)
+            self.assertFalse(book.is_available)
+            self.assertEqual(Borrow.objects.filter(books=book).count(), borrowed)
+
+    def test_nothing_borrowed_is_a_bad_request(self):
+        response = self.borrow([{"users": 999999, "books": self.pair.pk}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()["data"][0]["success"])
+        self.pair.refresh_from_db()
+        self.assertEqual(self.pair.quantity, 2)
+
+    def test_item_cap(self):
+        book = Book.objects.create(title="Stack", quantity=BULK_BORROW_MAX_ITEMS)
+        item = {"users": self.readers[0].pk, "books": book.pk}
+
+        response = self.borrow([item] * (BULK_BORROW_MAX_ITEMS + 1))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Borrow.objects.exists())
+
+        response = self.borrow([item] * BULK_BORROW_MAX_ITEMS)
+        self.assertEqual(response.status_code, 201)
+        book.refresh_from_db()
+        self.assertEqual(book.quantity, 0)
+        self.assertFalse(book.is_available)
+
+        ids = list(Borrow.objects.values_list("pk", flat=True))
+        self.assertEqual(self.give_back(ids + ids[:1]).status_code, 400)
+        self.assertEqual(self.give_back(ids).status_code, 200)
+        book.refresh_from_db()
+        self.assertEqual(book.quantity, BULK_BORROW_MAX_ITEMS)
+
+    def test_return_reports_duplicate_and_unknown_ids(self):
+        results = self.borrow(
+            [
+                {"users": self.readers[0].pk, "books": self.pair.pk},
+                {"users": self.readers[1].pk, "books": self.pair.pk},
+            ]
+        ).json()["data"]
+        first, second = (result["id"] for result in results)
+        self.assertEqual(self.give_back([second]).status_code, 200)
+
+        response = self.give_back([first, first, 999999, second])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["data"],
+            [
+                {"id": first, "success": True},
+                {"id": first, "success": False, "error": "Borrow already returned."},
+                {"id": 999999, "success": False, "error": "Borrow not found."},
+                {"id": second, "success": False, "error": "Borrow already returned."},
+            ],
+        )
+        self.pair.refresh_from_db()
+        self.assertEqual(self.pair.quantity, 2)
+        self.assertTrue(self.pair.is_available)
+        self.assertFalse(Borrow.objects.filter(is_returned=False).exists())
+
+
+class CatalogVersionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.books, cls.librarian = create_catalog(books=3, readers=1)
+
+    def setUp(self):
+        self.client = authenticated_client(self.librarian)
+
+    def test_change_reaches_every_worker(self):
+        first = self.client.get("/api/v1/books/")
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_books()
+        # Another worker has its own cache; the version is in the database.
+        get_cache().clear()
+        second = self.client.get("/api/v1/books/", HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second["ETag"], first["ETag"])
+
+    def test_unchanged_catalog_is_not_modified(self):
+        first = self.client.get("/api/v1/books/")
+        get_cache().clear()
+        second = self.client.get("/api/v1/books/", HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second["Last-Modified"], first["Last-Modified"])
+
+
+@override_settings(API_CACHE_TIMEOUT=300)
+class CatalogPageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.books, cls.librarian = create_catalog(books=3, readers=1)
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = authenticated_client(self.librarian)
+
+    def titles(self):
+        response = self.client.get("/api/v1/books/", {"fields": "title"})
+        return {book["title"] for book in response.json()["data"]}
+
+    def test_pages_are_retired_by_a_change_anywhere(self):
+        self.titles()
+        Book.objects.filter(pk=self.books[0].pk).update(title="Renamed")
+        self.assertNotIn("Renamed", self.titles())
+
+        # As import_catalog, or the admin, in another process would.
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_books()
+        self.assertIn("Renamed", self.titles())
+
+    def borrow(self, book):
+        reader = User.objects.get(email="reader0@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/v1/borrow/",
+                {"users": reader.pk, "books": book.pk},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+
+    def stock(self, **params):
+        response = self.client.get("/api/v1/books/", params)
+        return response, {
+            book["id"]: (book["quantity"], book["is_available"])
+            for book in response.json()["data"]
+        }
+
+    def test_borrows_keep_pages_and_refresh_their_stock(self):
+        Book.objects.filter(pk=self.books[0].pk).update(quantity=1)
+        first, stock = self.stock(fields="id,quantity,is_available")
+        self.assertEqual(stock[self.books[0].pk], (1, True))
+        hits = cache_stats()["catalog"]["hits"]
+
+        self.borrow(self.books[0])
+        second, stock = self.stock(fields="id,quantity,is_available")
+
+        self.assertEqual(cache_stats()["catalog"]["hits"], hits + 1)
+        self.assertEqual(stock[self.books[0].pk], (0, False))
+        self.assertEqual(stock[self.books[1].pk], (1, True))
+        self.assertNotEqual(second["ETag"], first["ETag"])
+        self.assertNotEqual(
+            self.client.get(
+                "/api/v1/books/",
+                {"fields": "id,quantity,is_available"},
+                HTTP_IF_NONE_MATCH=first["ETag"],
+            ).status_code,
+            304,
+        )
+
+    def test_pages_without_stock_lookup_are_retired_by_borrows(self):
+        Book.objects.filter(pk=self.books[0].pk).update(quantity=1)
+        self.assertIn(self.books[0].pk, self.stock(available="true")[1])
+        self.assertEqual(
+            self.client.get("/api/v1/books/", {"fields": "quantity"}).json()["data"][
+                -1
+            ],
+            {"quantity": 1},
+        )
+
+        self.borrow(self.books[0])
+
+        self.assertNotIn(self.books[0].pk, self.stock(available="true")[1])
+        self.assertEqual(
+            self.client.get("/api/v1/books/", {"fields": "quantity"}).json()["data"][
+                -1
+            ],
+            {"quantity": 0},
+        )
+
+
+@override_settings(API_CACHE_TIMEOUT=0, SEARCH_RANK_LIMIT=1000)
+class CatalogSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.books, cls.librarian = create_catalog(books=8, readers=1)
+        Book.objects.update(genre="River fiction")
+        # The oldest book is the best match.
+        Book.objects.filter(pk=cls.books[0].pk).update(title="River song")
+        Book.objects.update_search_vectors()
+
+    def setUp(self):
+        self.client = authenticated_client(self.librarian)
+
+    def search(self, path="/api/v1/books/", **params):
+        response = self.client.get(path, {"q": "river", **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_every_match_is_ranked_and_counted(self):
+        first = self.search(limit=5)
+        second = self.search(limit=5, page=2)
+
+        self.assertEqual(first["count"], 8)
+        self.assertEqual(first["data"][0]["id"], self.books[0].pk)
+        ids = [book["id"] for book in first["data"] + second["data"]]
+        self.assertEqual(sorted(ids), sorted(book.pk for book in self.books))
+
+    def test_broad_terms_list_every_match_newest_first(self):
+        # The planner expects at least one match of any search.
+        with override_settings(SEARCH_RANK_LIMIT=0):
+            page = self.search(limit=3)
+            self.assertNotIn("count", page)
+            ids = []
+            while True:
+                ids += [book["id"] for book in page["data"]]
+                if page["next"] is None:
+                    break
+                page = self.client.get(page["next"]).json()
+
+        self.assertEqual(ids, [book.pk for book in reversed(self.books)])
+        self.assertIsNotNone(page["previous"])
+
+    @override_settings(SEARCH_RANK_LIMIT=0)
+    def test_rare_terms_are_ranked_whatever_the_estimate(self):
+        page = self.client.get("/api/v1/books/", {"q": "song"}).json()
+
+        self.assertEqual(page["count"], 1)
+        self.assertEqual(page["data"][0]["id"], self.books[0].pk)
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class AsyncBookWriteTests(TestCase):
+    """The async book views run their blocking writes through sync_to_async."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.books, cls.librarian = create_catalog(books=2, readers=1)
+        cls.reader = User.objects.get(email="reader0@example.com")
+
+    def setUp(self):
+        self.client = authenticated_client(self.librarian)
+
+    def test_create(self):
+        response = self.client.post(
+            "/api/v1/books/",
+            {
+                "title": "Muna Madan",
+                "quantity": 2,
+                "authors": [{"first_name": "Laxmi Prasad", "last_name": "Devkota"}],
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        book = Book.objects.get(title="Muna Madan")
+        self.assertEqual(book.authors.get().last_name, "Devkota")
+        page = self.client.get("/api/v1/books/", {"q": "devkota"}).json()
+        self.assertEqual([row["id"] for row in page["data"]], [book.pk])
+
+    def test_create_rejects_invalid_data(self):
+        response = self.client.post("/api/v1/books/", {"quantity": 2}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Book.objects.count(), 2)
+
+    def test_update(self):
+        book = self.books[0]
+        response = self.client.patch(
+            f"/api/v1/books/{book.pk}/", {"genre": "Poetry"}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        detail = self.client.get(f"/api/v1/books/{book.pk}/").json()
+        self.assertEqual(detail["data"]["genre"], "Poetry")
+
+    def test_delete(self):
+        book = self.books[0]
+        response = self.client.delete(f"/api/v1/books/{book.pk}/")
+
+        self.assertEqual(response.status_code, 200)
+        book.refresh_from_db()
+        self.assertTrue(book.is_deleted)
+        detail = self.client.get(f"/api/v1/books/{book.pk}/")
+        self.assertEqual(detail.status_code, 404)
+        again = self.client.delete(f"/api/v1/books/{book.pk}/")
+        self.assertEqual(again.status_code, 404)
+
+    def test_readers_cannot_write(self):
+        client = authenticated_client(self.reader)
+        book = self.books[0]
+
+        self.assertEqual(
+            client.post("/api/v1/books/", {"title": "X"}, format="json").status_code,
+            403,
+        )
+        self.assertEqual(client.delete(f"/api/v1/books/{book.pk}/").status_code, 403)
+        self.assertFalse(Book.objects.get(pk=book.pk).is_deleted)
+
+
+class ConcurrencyProbeView(AsyncAPIView):
+    """Records how many requests are inside the view at once."""
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    active = 0
+    peak = 0
+
+    async def get(self, request, *args, **kwargs):
+        cls = type(self)
+        cls.active += 1
+        cls.peak = max(cls.peak, cls.active)
+        await asyncio.sleep(0.01)
+        cls.active -= 1
+        return api_response(message="Done", status_code=status.HTTP_200_OK)
+
+
+class AsyncViewConcurrencyTests(SimpleTestCase):
+    requests = 6
+
+    def setUp(self):
+        ConcurrencyProbeView.active = ConcurrencyProbeView.peak = 0
+
+    async def serve_burst(self):
+        view = ConcurrencyProbeView.as_view()
+        factory = APIRequestFactory()
+        responses = await asyncio.gather(
+            *(view(factory.get("/")) for _ in range(self.requests))
+        )
+        self.assertEqual(
+            [response.status_code for response in responses],
+            [200] * self.requests,
+        )
+
+    @override_settings(ASYNC_VIEW_CONCURRENCY=2)
+    async def test_requests_past_the_limit_wait_their_turn(self):
+        await self.serve_burst()
+
+        self.assertEqual(ConcurrencyProbeView.peak, 2)
+
+    @override_settings(ASYNC_VIEW_CONCURRENCY=16)
+    async def test_requests_under_the_limit_run_together(self):
+        await self.serve_burst()
+
+        self.assertEqual(ConcurrencyProbeView.peak, self.requests)
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class FieldSelectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.books, cls.librarian = create_catalog(books=3, readers=2)
+        cls.admin = User.objects.create(
+            email="admin@example.com", role="admin", is_superuser=True
+        )
+
+    def setUp(self):
+        self.client = authenticated_client(self.librarian)
+
+    def rows(self, path, **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()["data"]
+
+    def test_relations_left_out_of_expand_are_ids(self):
+        borrow = self.rows("/api/v1/borrow/", expand="")[0]
+        self.assertIsInstance(borrow["users"], int)
+        self.assertIsInstance(borrow["books"], int)
+
+        borrow = self.rows("/api/v1/borrow/", expand="books", fields="id,users,books")[
+            0
+        ]
+        self.assertIsInstance(borrow["users"], int)
+        self.assertEqual(
+            set(borrow["books"]) - {"reviews", "authors"},
+            {
+                "id",
+                "title",
+                "is_available",
+                "quantity",
+                "publisher",
+                "genre",
+                "created_at",
+                "is_deleted",
+                "review_count",
+                "rating_avg",
+            },
+        )
+        self.assertTrue(all(isinstance(pk, int) for pk in borrow["books"]["authors"]))
+
+        book = self.rows(
+            "/api/v1/books/", expand="reviews", fields="id,authors,reviews"
+        )[0]
+        self.assertEqual(set(book), {"id", "authors", "reviews"})
+        self.assertTrue(all(isinstance(pk, int) for pk in book["authors"]))
+        self.assertIsInstance(book["reviews"][0], dict)
+
+    def test_nested_fields_narrow_expanded_relations(self):
+        borrow = self.rows(
+            "/api/v1/borrow/", fields="id,books.title,books.authors", expand="books"
+        )[0]
+
+        self.assertEqual(set(borrow), {"id", "books"})
+        self.assertEqual(set(borrow["books"]), {"title", "authors"})
+
+    def test_unknown_names_are_rejected(self):
+        for path, params, errors in (
+            (
+                "/api/v1/books/",
+                {"fields": "id,pages"},
+                {"fields": ["Unknown field: pages"]},
+            ),
+            (
+                "/api/v1/books/",
+                {"expand": "title"},
+                {"expand": ["Unknown field: title"]},
+            ),
+            (
+                "/api/v1/borrow/",
+                {"fields": "id,books.pages", "expand": "books"},
+                {"fields": ["Unknown field: books.pages"]},
+            ),
+            (
+                f"/api/v1/books/{self.books[0].pk}/",
+                {"fields": "id,pages"},
+                {"fields": ["Unknown field: pages"]},
+            ),
+        ):
+            with self.subTest(path=path, **params):
+                response = self.client.get(path, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()["errors"], errors)
+
+    def test_unrequested_relations_are_not_queried(self):
+        def queries(path, **params):
+            with CaptureQueriesContext(connection) as captured:
+                self.rows(path, **params)
+            return [query["sql"] for query in captured.captured_queries]
+
+        full = queries("/api/v1/books/")
+        sparse = queries("/api/v1/books/", fields="id,title")
+        self.assertEqual(len(full) - len(sparse), 2)
+        self.assertFalse(
+            any('"authors"' in sql or '"book_reviews"' in sql for sql in sparse)
+        )
+
+        expanded = queries("/api/v1/borrow/")
+        collapsed = queries("/api/v1/borrow/", expand="")
+        self.assertLess(len(collapsed), len(expanded))
+        self.assertFalse(any("JOIN" in sql for sql in collapsed))
+
+    def test_compiled_output_matches_drf(self):
+        admin = authenticated_client(self.admin)
+        for client, path, params in (
+            (self.client, "/api/v1/books/", {}),
+            (self.client, "/api/v1/books/", {"reviews": "top3"}),
+            (self.client, "/api/v1/books/", {"fields": "id,authors", "expand": ""}),
+            (self.client, f"/api/v1/books/{self.books[0].pk}/", {}),
+            (self.client, "/api/v1/review/", {}),
+            (self.client, "/api/v1/review/", {"expand": "book"}),
+            (self.client, "/api/v1/borrow/", {}),
+            (admin, "/api/v1/user/all/", {}),
+            (admin, "/api/v1/user/all/", {"fields": "id,full_name"}),
+        ):
+            with self.subTest(path=path, **params):
+                with override_settings(COMPILED_SERIALIZERS=False):
+                    expected = client.get(path, params)
+                with override_settings(COMPILED_SERIALIZERS=True):
+                    compiled = client.get(path, params)
+                self.assertEqual(expected.status_code, 200)
+                self.assertEqual(compiled.content, expected.content)
@@ -1,15 +1,20 @@
 from django.urls import path
 from .views import (
     BookAPIView,
+    BookExportAPIView,
     SpecificBookAPIView,
     BorrowAPIView,
     BorrowUpdateAPIView,
     SpecificBookBorrowAPIView,
+    BorrowBulkAPIView,
+    BorrowBulkReturnAPIView,
+    BorrowExportAPIView,
 )
 
 
 urlpatterns = [
     path("books/", BookAPIView.as_view(), name="book-api"),
+    path("books/export/", BookExportAPIView.as_view(), name="book-export-api"),
     path("books/<int:id>/", SpecificBookAPIView.as_view(), name="book-detail-api"),
     path(
         "books/<int:id>/borrow/",
@@ -17,5 +22,12 @@ urlpatterns = [
         name="specific-book-borrow-api",
     ),
     path("borrow/", BorrowAPIView.as_view(), name="borrow-api"),
+    path("borrow/export/", BorrowExportAPIView.as_view(), name="borrow-export-api"),
+    path("borrow/bulk/", BorrowBulkAPIView.as_view(), name="borrow-bulk-api"),
+    path(
+        "borrow/bulk/return/",
+        BorrowBulkReturnAPIView.as_view(),
+        name="borrow-bulk-return-api",
+    ),
     path("borrow/<int:id>/", BorrowUpdateAPIView.as_view(), name="borrow-update-api"),
 ]
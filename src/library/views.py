@@ -1,13 +1,18 @@
-from typing import Any
+from functools import partial
+from typing import Any, Dict, Optional
 
 
+from asgiref.sync import sync_to_async
+from django.db.models import QuerySet
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .filters import arank_search, filter_books, search_query
 from .models import Book, Borrow
 from .serializers import (
     BookAddSerializer,
@@ -15,23 +20,49 @@ from .serializers import (
     BorrowSerializer,
     BorrowListSerializer,
     BorrowUpdateSerializer,
+    BorrowBulkSerializer,
+    BorrowBulkReturnSerializer,
 )
 from lms.permissions import IsLibrarianOrReadOnly, IsAdminOrLibrarian
+from lms.utils.cache import (
+    acached_response,
+    acatalog_version,
+    book_detail_key,
+    catalog_page_key,
+    invalidate_books,
+)
+from lms.utils.conditional import aconditional_response, make_etag
+from lms.utils.export import ExportAPIView
 from lms.utils.response import api_response
-from lms.utils.pagination import CustomPagination
+from lms.utils.pagination import (
+    KeysetPagination,
+    UncountedPagination,
+    WindowCountPagination,
+    apaginated_list_response,
+    paginated_list_response,
+)
+from lms.utils.serializers import field_selection, wants
+from lms.utils.timing import timed
+from lms.utils.views import AsyncAPIView
 
 
-class BookAPIView(APIView):
+class BookAPIView(AsyncAPIView):
+    """
+    Async view: reads use the async ORM, writes run the blocking serializer
+    code in a worker thread.
+    """
 
     permission_classes = [IsLibrarianOrReadOnly]
 
     @swagger_auto_schema(
         request_body=BookAddSerializer,
     )
-    def post(
+    async def post(
         self: "BookAPIView", request: Request, *args: Any, **kwargs: Any
     ) -> Response:
+        return await sync_to_async(self.create)(request)
 
+    def create(self: "BookAPIView", request: Request) -> Response:
         serializer = BookAddSerializer(data=request.data)
         if serializer.is_valid(raise_exception=True):
             serializer.save()
@@ -44,29 +75,117 @@ class BookAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                "q",
+                openapi.IN_QUERY,
+                description="Full-text search over title, publisher, genre "
+                "and author names",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter("genre", openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter("publisher", openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter(
+                "author",
+                openapi.IN_QUERY,
+                description="Author id, first name or last name",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter("available", openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN),
+            openapi.Parameter(
+                "reviews",
+                openapi.IN_QUERY,
+                description="Inline reviews: all (default), top3 or none",
+                type=openapi.TYPE_STRING,
+                enum=list(BookListSerializer.REVIEW_MODES),
+            ),
+        ],
         responses={
             status.HTTP_200_OK: BookListSerializer(many=True),
-        }
+        },
     )
-    def get(
+    async def get(
         self: "BookAPIView", request: Request, *args: Any, **kwargs: Any
     ) -> Response:
-        books = Book.objects.filter(is_deleted=False).order_by("-created_at")
-        serializer = BookListSerializer(books, many=True)
-        paginator = CustomPagination()
-        page = paginator.paginate_queryset(books, request)
+        books = filter_books(
+            Book.objects.filter(is_deleted=False).order_by("-created_at", "-pk"),
+            request.query_params,
+        )
+        reviews = request.query_params.get("reviews", "all")
+        if reviews not in BookListSerializer.REVIEW_MODES:
+            raise ValidationError({"reviews": ["Must be one of: all, top3, none."]})
+        selection = field_selection(request)
+        version, stock_version, changed_at = await acatalog_version()
+        # Borrows and returns only bump the stock version, so cached pages
+        # outlive them and get the current stock of their books on each hit.
+        # Pages filtered on availability, or without ids to look the stock
+        # up by, are cached under the stock version as well.
+        stock_cached = "available" not in request.query_params and wants(
+            selection["fields"], "id"
+        )
+        if not stock_cached:
+            version = f"{version}.{stock_version}"
+        return await aconditional_response(
+            request,
+            lambda: acached_response(
+                "catalog",
+                catalog_page_key(request, version),
+                partial(self.list_books, request, books, reviews, selection),
+                refresh=self.refresh_stock if stock_cached else None,
+            ),
+            etag=make_etag(request, version, stock_version),
+            last_modified=changed_at.timestamp(),
+        )
 
-        if page is not None:
-            return paginator.get_paginated_response(serializer.data)
+    async def refresh_stock(self: "BookAPIView", payload: Dict[str, Any]) -> None:
+        """Overwrite the stock in a cached catalog page with the current one."""
+        rows = [
+            row for row in payload["data"] if "quantity" in row or "is_available" in row
+        ]
+        if not rows:
+            return
+        stock = {
+            pk: {"quantity": quantity, "is_available": is_available}
+            async for pk, quantity, is_available in Book.objects.filter(
+                pk__in=[row["id"] for row in rows]
+            ).values_list("pk", "quantity", "is_available")
+        }
+        for row in rows:
+            current = stock.get(row["id"], {})
+            for name in row.keys() & current.keys():
+                row[name] = current[name]
 
-        return api_response(
-            data=serializer.data,
+    async def list_books(
+        self: "BookAPIView",
+        request: Request,
+        books: QuerySet,
+        reviews: str,
+        selection: Dict[str, Any],
+    ) -> Response:
+        paginator = None
+        query = search_query(request.query_params)
+        # Keyset cursors seek on a model field, so relevance ordering is only
+        # used with page-number pagination.
+        if (
+            query is not None
+            and KeysetPagination.cursor_query_param not in request.query_params
+        ):
+            ranked = await arank_search(books, query)
+            if ranked is None:
+                paginator = UncountedPagination()
+            else:
+                books, paginator = ranked, WindowCountPagination()
+        return await apaginated_list_response(
+            request,
+            BookListSerializer.setup_eager_loading(books, reviews=reviews, **selection),
+            BookListSerializer,
             message="Books retrieved successfully",
-            status_code=status.HTTP_200_OK,
+            context={"reviews": reviews, **selection},
+            paginator=paginator,
         )
 
 
-class SpecificBookAPIView(APIView):
+class SpecificBookAPIView(AsyncAPIView):
 
     permission_classes = [IsLibrarianOrReadOnly]
 
@@ -75,18 +194,54 @@ class SpecificBookAPIView(APIView):
             status.HTTP_200_OK: BookListSerializer,
         }
     )
-    def get(
+    async def get(
         self: "SpecificBookAPIView",
         request: Request,
         id: int,
         *args: Any,
         **kwargs: Any,
     ) -> Response:
+        updated_at = (
+            await Book.objects.filter(id=id, is_deleted=False)
+            .values_list("updated_at", flat=True)
+            .afirst()
+        )
+        if updated_at is None:
+            return api_response(
+                message="Book not found", status_code=status.HTTP_404_NOT_FOUND
+            )
+
+        selection = field_selection(request)
+        if selection["fields"] is not None or selection["expand"] is not None:
+            # Only the full representation is cached.
+            build = partial(self.retrieve, id, selection)
+        else:
+            build = partial(
+                acached_response,
+                "book_detail",
+                book_detail_key(id, updated_at),
+                partial(self.retrieve, id),
+            )
+        return await aconditional_response(
+            request,
+            build,
+            etag=make_etag(request, updated_at.isoformat()),
+            last_modified=updated_at.timestamp(),
+        )
+
+    async def retrieve(
+        self: "SpecificBookAPIView", id: int, selection: Optional[dict] = None
+    ) -> Response:
+        selection = selection or {}
         try:
-            book = Book.objects.get(id=id, is_deleted=False)
-            serializer = BookListSerializer(book)
+            book = await BookListSerializer.setup_eager_loading(
+                Book.objects.all(), **selection
+            ).aget(id=id, is_deleted=False)
+            serializer = BookListSerializer(book, context=selection)
+            with timed("serialize"):
+                data = serializer.data
             return api_response(
-                data=serializer.data,
+                data=data,
                 message="Book retrieved successfully",
                 status_code=status.HTTP_200_OK,
             )
@@ -98,13 +253,16 @@ class SpecificBookAPIView(APIView):
     @swagger_auto_schema(
         request_body=BookAddSerializer,
     )
-    def patch(
+    async def patch(
         self: "SpecificBookAPIView",
         request: Request,
         id: int,
         *args: Any,
         **kwargs: Any,
     ) -> Response:
+        return await sync_to_async(self.update)(request, id)
+
+    def update(self: "SpecificBookAPIView", request: Request, id: int) -> Response:
         try:
             book = Book.objects.get(id=id, is_deleted=False)
             serializer = BookAddSerializer(book, data=request.data, partial=True)
@@ -127,17 +285,21 @@ class SpecificBookAPIView(APIView):
             )
 
     @swagger_auto_schema()
-    def delete(
+    async def delete(
         self: "SpecificBookAPIView",
         request: Request,
         id: int,
         *args: Any,
         **kwargs: Any,
     ) -> Response:
+        return await sync_to_async(self.destroy)(id)
+
+    def destroy(self: "SpecificBookAPIView", id: int) -> Response:
         try:
             book = Book.objects.get(id=id, is_deleted=False)
             book.is_deleted = True
             book.save()
+            invalidate_books(book.id)
             return api_response(
                 message="Book deleted successfully",
                 status_code=status.HTTP_200_OK,
@@ -148,6 +310,53 @@ class SpecificBookAPIView(APIView):
             )
 
 
+class BookExportAPIView(ExportAPIView):
+    """Stream the catalog; ``from``/``to`` filter on ``created_at``."""
+
+    permission_classes = [IsAdminOrLibrarian]
+    columns = {
+        "id": "id",
+        "title": "title",
+        "authors": "author_names",
+        "publisher": "publisher",
+        "genre": "genre",
+        "quantity": "quantity",
+        "is_available": "is_available",
+        "review_count": "review_count",
+        "rating_avg": "rating_avg",
+        "created_at": "created_at",
+        "updated_at": "updated_at",
+    }
+    date_field = "created_at"
+    filename = "books"
+
+    def get_queryset(self: "BookExportAPIView", request: Request) -> QuerySet:
+        return Book.objects.filter(is_deleted=False).annotate(
+            author_names=Book.objects.author_names(delimiter=", ")
+        )
+
+
+class BorrowExportAPIView(ExportAPIView):
+    """Stream the borrow history; ``from``/``to`` filter on ``borrowed_at``."""
+
+    permission_classes = [IsAdminOrLibrarian]
+    columns = {
+        "id": "id",
+        "user_id": "users_id",
+        "user_email": "users__email",
+        "book_id": "books_id",
+        "book_title": "books__title",
+        "borrowed_at": "borrowed_at",
+        "borrow_duration": "borrow_duration",
+        "is_returned": "is_returned",
+    }
+    date_field = "borrowed_at"
+    filename = "borrows"
+
+    def get_queryset(self: "BorrowExportAPIView", request: Request) -> QuerySet:
+        return Borrow.objects.all()
+
+
 class SpecificBookBorrowAPIView(APIView):
     permission_classes = [IsAdminOrLibrarian]
 
@@ -161,20 +370,17 @@ class SpecificBookBorrowAPIView(APIView):
     ) -> Response:
         try:
             book = Book.objects.get(id=id, is_deleted=False)
-            borrows = Borrow.objects.filter(books=book)
-
-            serializer = BorrowListSerializer(borrows, many=True)
-
-            paginator = CustomPagination()
-            page = paginator.paginate_queryset(borrows, request)
-
-            if page is not None:
-                return paginator.get_paginated_response(serializer.data)
-
-            return api_response(
-                data=serializer.data,
+            selection = field_selection(request)
+            borrows = BorrowListSerializer.setup_eager_loading(
+                Borrow.objects.filter(books=book).order_by("-borrowed_at"),
+                **selection,
+            )
+            return paginated_list_response(
+                request,
+                borrows,
+                BorrowListSerializer,
                 message="Borrowed books retrieved successfully",
-                status_code=status.HTTP_200_OK,
+                context=selection,
             )
         except Book.DoesNotExist:
             return api_response(
@@ -204,7 +410,7 @@ class BorrowAPIView(APIView):
                 status_code=status.HTTP_400_BAD_REQUEST,
             )
 
-        except serializer.ValidationError as e:
+        except ValidationError as e:
             return api_response(
                 message=str(e),
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -226,21 +432,19 @@ class BorrowAPIView(APIView):
             if user.is_superuser or user.role == "librarian":
                 borrowed_books = Borrow.objects.all().order_by("-borrowed_at")
             else:
-                borrowed_books = Borrow.objects.filter(users=user).order_by(
+                borrowed_books = Borrow.objects.filter(users=user.id).order_by(
                     "-borrowed_at"
                 )
-            serializer = BorrowListSerializer(borrowed_books, many=True)
-
-            paginator = CustomPagination()
-            page = paginator.paginate_queryset(borrowed_books, request)
-
-            if page is not None:
-                return paginator.get_paginated_response(serializer.data)
-
-            return api_response(
-                data=serializer.data,
+            selection = field_selection(request)
+            borrowed_books = BorrowListSerializer.setup_eager_loading(
+                borrowed_books, **selection
+            )
+            return paginated_list_response(
+                request,
+                borrowed_books,
+                BorrowListSerializer,
                 message="Borrowed books retrieved successfully",
-                status_code=status.HTTP_200_OK,
+                context=selection,
             )
         except Borrow.DoesNotExist:
             return api_response(
@@ -273,7 +477,7 @@ class BorrowUpdateAPIView(APIView):
             if user.is_superuser or user.role == "librarian":
                 borrow = Borrow.objects.get(id=id)
             else:
-                borrow = Borrow.objects.get(id=id, users=user)
+                borrow = Borrow.objects.get(id=id, users=user.id)
 
             serializer = BorrowUpdateSerializer(borrow, data=request.data, partial=True)
             if serializer.is_valid(raise_exception=True):
@@ -287,3 +491,51 @@ class BorrowUpdateAPIView(APIView):
             return api_response(
                 message="Borrow not found", status_code=status.HTTP_404_NOT_FOUND
             )
+
+
+class BorrowBulkAPIView(APIView):
+    permission_classes = [IsAdminOrLibrarian]
+
+    @swagger_auto_schema(request_body=BorrowBulkSerializer)
+    def post(
+        self: "BorrowBulkAPIView", request: Request, *args: Any, **kwargs: Any
+    ) -> Response:
+        serializer = BorrowBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+
+        if not any(result["success"] for result in results):
+            return api_response(
+                data=results,
+                message="No books were borrowed",
+                status_code=status.HTTP_400_BAD_REQUEST,
+            )
+        return api_response(
+            data=results,
+            message="Bulk borrow processed successfully",
+            status_code=status.HTTP_201_CREATED,
+        )
+
+
+class BorrowBulkReturnAPIView(APIView):
+    permission_classes = [IsAdminOrLibrarian]
+
+    @swagger_auto_schema(request_body=BorrowBulkReturnSerializer)
+    def post(
+        self: "BorrowBulkReturnAPIView", request: Request, *args: Any, **kwargs: Any
+    ) -> Response:
+        serializer = BorrowBulkReturnSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+
+        if not any(result["success"] for result in results):
+            return api_response(
+                data=results,
+                message="No books were returned",
+                status_code=status.HTTP_400_BAD_REQUEST,
+            )
+        return api_response(
+            data=results,
+            message="Bulk return processed successfully",
+            status_code=status.HTTP_200_OK,
+        )
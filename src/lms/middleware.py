@@ -0,0 +1,324 @@
+import json
+import logging
+import random
+import time
+import zlib
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.http import HttpRequest, HttpResponseBase
+from django.utils.cache import patch_vary_headers
+
+from lms.utils import metrics
+from lms.utils.timing import RequestTimer, install_query_recorder, request_timer
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional, gzip is used instead
+    brotli = None
+
+logger = logging.getLogger("lms.timing")
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    """Map each coding in an ``Accept-Encoding`` header to its q-value."""
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    """
+    Pick ``br`` or ``gzip`` from an ``Accept-Encoding`` header, preferring
+    Brotli on a tie. ``None`` when the client accepts neither.
+    """
+    accepted = _accepted_encodings(header)
+    wildcard = accepted.get("*", 0.0)
+    candidates = ("br", "gzip") if brotli is not None else ("gzip",)
+    best, best_quality = None, 0.0
+    for coding in candidates:
+        quality = accepted.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class _Compressor:
+    """One compression stream; ``compress`` may be called once per chunk."""
+
+    def __init__(self, encoding: str) -> None:
+        if encoding == "br":
+            self._brotli = brotli.Compressor(
+                quality=settings.COMPRESSION_BROTLI_QUALITY
+            )
+        else:
+            self._brotli = None
+            # wbits=31 writes a gzip header and trailer around the stream.
+            self._zlib = zlib.compressobj(
+                settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31
+            )
+
+    def compress(self, chunk: bytes) -> bytes:
+        """Compress ``chunk`` and flush it so the client can decode it now."""
+        if self._brotli is not None:
+            return self._brotli.process(chunk) + self._brotli.flush()
+        return self._zlib.compress(chunk) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+    def compress_all(self, content: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(content) + self._brotli.finish()
+        return self._zlib.compress(content) + self._zlib.flush(zlib.Z_FINISH)
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    return _Compressor(encoding).compress_all(content)
+
+
+def _compress_iterator(iterator: Iterator[bytes], encoding: str) -> Iterator[bytes]:
+    compressor = _Compressor(encoding)
+    for chunk in iterator:
+        if chunk:
+            yield compressor.compress(chunk)
+    yield compressor.finish()
+
+
+async def _acompress_iterator(
+    iterator: AsyncIterator[bytes], encoding: str
+) -> AsyncIterator[bytes]:
+    compressor = _Compressor(encoding)
+    async for chunk in iterator:
+        if chunk:
+            yield compressor.compress(chunk)
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with Brotli or gzip, whichever the client prefers,
+    Brotli only when the ``brotli`` package is installed.
+
+    Only content types listed in ``COMPRESSION_MIN_SIZES`` are compressed,
+    and only when the body is at least that many bytes, since small bodies
+    cost CPU without saving a packet. Streaming responses cannot be sized up
+    front and are compressed chunk by chunk, each chunk flushed so the
+    client still receives data as it is produced.
+
+    Unlike ``GZipMiddleware`` the gzip output is not padded against BREACH;
+    no response here reflects request input next to a secret.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> Any:
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(
+        self, request: HttpRequest, response: HttpResponseBase
+    ) -> HttpResponseBase:
+        if response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "").split(";")[0].strip()
+        min_size = settings.COMPRESSION_MIN_SIZES.get(content_type.lower())
+        if min_size is None:
+            return response
+        if not response.streaming and len(response.content) < min_size:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _acompress_iterator(
+                    response.streaming_content, encoding
+                )
+            else:
+                response.streaming_content = _compress_iterator(
+                    response.streaming_content, encoding
+                )
+            del response.headers["Content-Length"]
+        else:
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # A compressed body is a different byte sequence, so a strong ETag
+        # has to become weak (RFC 9110 8.8.1).
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+class RequestTimingMiddleware:
+    """
+    Time a sample of requests: the queries they run and how long those
+    took, and the time spent serializing and rendering. Each sampled
+    request gets a ``Server-Timing`` header and one JSON log line on the
+    ``lms.timing`` logger; query shapes repeated
+    ``REQUEST_TIMING_REPEATED_QUERIES`` times or more are listed in it and
+    turn it into a warning.
+
+    ``REQUEST_TIMING_SAMPLE_RATE`` is the fraction of requests sampled;
+    the others cost one random number. ``app`` is the time left after
+    serializing and rendering, middleware included, and ``db`` overlaps
+    all of them. Queries a streaming response runs after the view has
+    returned are not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        install_query_recorder()
+
+    def __call__(self, request: HttpRequest) -> Any:
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        with request_timer() as timer:
+            response = self.get_response(request)
+        return self.process_response(request, response, timer)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        if not self.sampled():
+            return await self.get_response(request)
+        with request_timer() as timer:
+            response = await self.get_response(request)
+        return self.process_response(request, response, timer)
+
+    def sampled(self) -> bool:
+        rate = settings.REQUEST_TIMING_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    def process_response(
+        self, request: HttpRequest, response: HttpResponseBase, timer: RequestTimer
+    ) -> HttpResponseBase:
+        total = time.perf_counter() - timer.started
+        serialize = timer.phases.get("serialize", 0.0)
+        render = timer.phases.get("render", 0.0)
+        phases = {
+            "app": total - serialize - render,
+            "serialize": serialize,
+            "render": render,
+        }
+        repeated = timer.repeated_queries(settings.REQUEST_TIMING_REPEATED_QUERIES)
+
+        if settings.REQUEST_TIMING_HEADER:
+            response.headers["Server-Timing"] = ", ".join(
+                [
+                    f'db;dur={timer.db_seconds * 1000:.1f};desc="{timer.queries} queries"',
+                    *(
+                        f"{name};dur={seconds * 1000:.1f}"
+                        for name, seconds in phases.items()
+                    ),
+                    f"total;dur={total * 1000:.1f}",
+                ]
+            )
+
+        match = request.resolver_match
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "route": match.route if match else None,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 2),
+            "db_ms": round(timer.db_seconds * 1000, 2),
+            "queries": timer.queries,
+            **{
+                f"{name}_ms": round(seconds * 1000, 2)
+                for name, seconds in phases.items()
+            },
+            "repeated_queries": repeated,
+        }
+        logger.log(logging.WARNING if repeated else logging.INFO, json.dumps(record))
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Count every request and its queries in the Prometheus metrics served by
+    ``lms.utils.metrics.metrics_view``, labelled with the URL name. Goes
+    first in ``MIDDLEWARE`` so the latency covers the other middleware; the
+    timer it starts is shared with ``RequestTimingMiddleware``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        install_query_recorder()
+        connection_created.connect(
+            metrics.count_connection, dispatch_uid="count_connection"
+        )
+
+    def __call__(self, request: HttpRequest) -> Any:
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics.observe_pools()
+        with request_timer() as timer:
+            response = self.get_response(request)
+        return self.process_response(request, response, timer)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        metrics.observe_pools()
+        with request_timer() as timer:
+            response = await self.get_response(request)
+        return self.process_response(request, response, timer)
+
+    def process_response(
+        self, request: HttpRequest, response: HttpResponseBase, timer: RequestTimer
+    ) -> HttpResponseBase:
+        metrics.observe_request(
+            request, response, timer, time.perf_counter() - timer.started
+        )
+        return response
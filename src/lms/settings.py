@@ -54,7 +54,10 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = "users.User"
 
 MIDDLEWARE = [
+    "lms.middleware.MetricsMiddleware",
+    "lms.middleware.RequestTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "lms.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -65,11 +68,32 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.StatelessJWTAuthentication",
     ),
     "EXCEPTION_HANDLER": "lms.utils.response.custom_exception_handler",
+    "DEFAULT_RENDERER_CLASSES": (
+        "lms.utils.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "lms.utils.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+    # Trusted proxies in front of the app that append to X-Forwarded-For.
+    # With the default 0 the login IP throttle keys on REMOTE_ADDR and ignores
+    # the header, which clients can set to anything.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", 0)),
+    "DEFAULT_THROTTLE_RATES": {
+        "login_ip": os.getenv("LOGIN_IP_RATE", "30/min"),
+        "login_account": os.getenv("LOGIN_ACCOUNT_RATE", "10/min"),
+    },
 }
 
+# Cache holding the login throttle counters; point it at a shared cache
+# (see CACHE_URL) when running more than one worker process.
+THROTTLE_CACHE_ALIAS = os.getenv("THROTTLE_CACHE_ALIAS", "default")
+
 ROOT_URLCONF = "lms.urls"
 
 SIMPLE_JWT = {
@@ -83,8 +107,14 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
     "USER_ID_FIELD": "id",
     "USER_ID_CLAIM": "user_id",
+    "TOKEN_USER_CLASS": "users.authentication.ClaimsUser",
 }
 
+# Per-process cache of user rows for requests that need more than the token
+# claims. Role or status changes reach issued access tokens only on refresh.
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 30))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", 10000))
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -112,9 +142,36 @@ SWAGGER_SETTINGS = {
     },
     "USE_SESSION_AUTH": False,
 }
+# Render hot read-only serializers through compiled row functions
+# (lms.utils.serializers.CompiledReadMixin); off means DRF's generic path.
+COMPILED_SERIALIZERS = os.getenv("COMPILED_SERIALIZERS", "true").lower() == "true"
+
+# Rows fetched per round trip and rendered per chunk by the export endpoints.
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 2000))
+
+# Requests let into async views at once, per event loop (ASGI worker).
+ASYNC_VIEW_CONCURRENCY = int(os.getenv("ASYNC_VIEW_CONCURRENCY", 32))
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
-
+# With DATABASE_POOL each process keeps a psycopg pool (psycopg-pool package)
+# and requests borrow a connection from it instead of connecting. Otherwise
+# a connection is reused for DATABASE_CONN_MAX_AGE seconds, 0 meaning one
+# per request; Django advises against persistent connections under ASGI.
+# Health checks test a reused connection before a request's first query.
+# A streaming export holds its connection until the last row is sent, so
+# size the pool for the async view concurrency plus concurrent exports.
+#
+# Pools are per process: N gunicorn or uvicorn workers can open up to
+# N * DATABASE_POOL_MAX_SIZE connections, and with 4 workers the default 36
+# already exceeds PostgreSQL's default max_connections of 100, so lower
+# max_size or put PgBouncer in front. A WSGI worker never uses more
+# connections than it has threads (gunicorn --threads), so that number is
+# enough there; an ASGI worker needs ASYNC_VIEW_CONCURRENCY plus exports.
+# min_size connections per worker stay open even when idle.
+
+DATABASE_POOL = os.getenv("DATABASE_POOL", "true").lower() == "true"
+DATABASE_HEALTH_CHECKS = os.getenv("DATABASE_HEALTH_CHECKS", "true").lower() == "true"
 
 DATABASES = {
     "default": {
@@ -124,9 +181,171 @@ DATABASES = {
         "PASSWORD": os.getenv("DATABASE_PASSWORD", "lms_db"),
         "HOST": os.getenv("DATABASE_HOST", "db"),
         "PORT": 5432,
+        "CONN_MAX_AGE": (
+            0 if DATABASE_POOL else int(os.getenv("DATABASE_CONN_MAX_AGE", 60))
+        ),
+        "CONN_HEALTH_CHECKS": DATABASE_HEALTH_CHECKS,
+        "OPTIONS": {},
     }
 }
 
+if DATABASE_POOL:
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.getenv("DATABASE_POOL_MIN_SIZE", 2)),
+        "max_size": int(
+            os.getenv("DATABASE_POOL_MAX_SIZE", ASYNC_VIEW_CONCURRENCY + 4)
+        ),
+        # Seconds a request waits for a free connection before failing.
+        "timeout": float(os.getenv("DATABASE_POOL_TIMEOUT", 10)),
+        # Idle connections above min_size are closed after max_idle seconds,
+        # and every connection is replaced after max_lifetime seconds.
+        "max_idle": float(os.getenv("DATABASE_POOL_MAX_IDLE", 600)),
+        "max_lifetime": float(os.getenv("DATABASE_POOL_MAX_LIFETIME", 3600)),
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local-memory (LRU) by default; set CACHE_URL to any Redis-compatible server
+# (requires the ``redis`` package) to share the cache between workers.
+
+if os.getenv("CACHE_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("CACHE_URL"),
+            "KEY_PREFIX": "lms",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "lms",
+            "OPTIONS": {
+                "MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 1000)),
+            },
+        }
+    }
+
+# Catalog pages are cached per catalog version (lms.utils.cache), which any
+# book, author or review change bumps, retiring every cached page at once.
+# Borrows and returns only bump the stock version: cached pages stay, and
+# the quantity and availability in them are read again, one query per hit.
+# Pages filtered on ``available``, or selecting no ids, are cached per stock
+# version too and so are retired by every borrow.
+# ETags include the stock version, so clients revalidate after each borrow.
+API_CACHE_ALIAS = "default"
+API_CACHE_TIMEOUT = int(os.getenv("API_CACHE_TIMEOUT", 300))
+
+# Catalog searches (library.filters) the planner expects to match at most this
+# many books, or with few matches among the newest books, are ranked by
+# relevance and counted. Broader ones list every match newest first, without a
+# count: ranking costs about 6 ms per thousand matches, and a common word
+# matches tens of thousands of a million books.
+SEARCH_RANK_LIMIT = int(os.getenv("SEARCH_RANK_LIMIT", 3000))
+
+# Cache-Control on public catalog reads (lms.utils.conditional). Browsers
+# revalidate with the ETag after HTTP_CACHE_MAX_AGE seconds; shared caches
+# such as a CDN may serve a stored copy for HTTP_CACHE_S_MAXAGE seconds.
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", 0))
+HTTP_CACHE_S_MAXAGE = int(os.getenv("HTTP_CACHE_S_MAXAGE", 0))
+HTTP_CACHE_STALE_WHILE_REVALIDATE = int(
+    os.getenv("HTTP_CACHE_STALE_WHILE_REVALIDATE", 0)
+)
+
+
+# Response compression (lms.middleware.CompressionMiddleware)
+# Minimum body size in bytes per content type; other types are never
+# compressed. Below about one packet compression saves no round trip.
+# Streaming responses of a listed type are always compressed.
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1400))
+COMPRESSION_MIN_SIZES = {
+    "application/json": COMPRESSION_MIN_SIZE,
+    "application/x-ndjson": COMPRESSION_MIN_SIZE,
+    "text/csv": COMPRESSION_MIN_SIZE,
+    "text/html": COMPRESSION_MIN_SIZE,
+    "text/css": COMPRESSION_MIN_SIZE,
+    "text/javascript": COMPRESSION_MIN_SIZE,
+    "application/javascript": COMPRESSION_MIN_SIZE,
+}
+# Brotli needs the ``brotli`` package; without it gzip is always used.
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+
+
+# Request timing (lms.middleware.RequestTimingMiddleware)
+# Fraction of requests timed, from 0 (off) to 1. Timed requests log one JSON
+# line on the ``lms.timing`` logger and, unless REQUEST_TIMING_HEADER is
+# false, answer with a Server-Timing header. A query shape run
+# REQUEST_TIMING_REPEATED_QUERIES times in one request is logged as a
+# warning, since it is usually an N+1.
+
+REQUEST_TIMING_SAMPLE_RATE = float(os.getenv("REQUEST_TIMING_SAMPLE_RATE", 0))
+REQUEST_TIMING_HEADER = os.getenv("REQUEST_TIMING_HEADER", "true").lower() == "true"
+REQUEST_TIMING_REPEATED_QUERIES = int(os.getenv("REQUEST_TIMING_REPEATED_QUERIES", 5))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "lms.timing": {
+            "handlers": ["console"],
+            "level": os.getenv("REQUEST_TIMING_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
+
+# Prometheus metrics (lms.middleware.MetricsMiddleware), served at /metrics.
+# With METRICS_TOKEN set, scrapes must send "Authorization: Bearer <token>".
+# Under several worker processes (gunicorn), point PROMETHEUS_MULTIPROC_DIR
+# at an empty directory, wiped on every restart, where workers write their
+# samples; a gunicorn child_exit hook should call
+# prometheus_client.multiprocess.mark_process_dead(worker.pid).
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+# Password hashing
+# The first hasher hashes new passwords. The others only verify existing
+# hashes, which are rehashed with the first one on the next login.
+
+PASSWORD_HASHER_CHOICES = {
+    "argon2": "users.hashers.TunedArgon2PasswordHasher",
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "argon2")
+PASSWORD_HASHERS = [PASSWORD_HASHER_CHOICES[PASSWORD_HASHER]] + [
+    hasher
+    for name, hasher in PASSWORD_HASHER_CHOICES.items()
+    if name != PASSWORD_HASHER
+]
+
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 2))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 19456))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 1))
+
+# Hashing runs in a process pool per web worker process, and 0 workers hashes
+# on the request thread. Unset, each pool gets the CPU cores divided by
+# WEB_CONCURRENCY, the number of gunicorn or uvicorn worker processes (both
+# read it from the environment too), so that N workers do not each start a
+# pool of every core. Requests beyond the queue size get a 503.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+PASSWORD_HASH_WORKERS = (
+    int(os.getenv("PASSWORD_HASH_WORKERS"))
+    if os.getenv("PASSWORD_HASH_WORKERS")
+    else None
+)
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 16))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,389 @@
+import asyncio
+import datetime
+import decimal
+import gzip
+import os
+import runpy
+import uuid
+import zlib
+import zoneinfo
+from unittest import mock
+
+import brotli
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from prometheus_client import REGISTRY
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from lms.middleware import CompressionMiddleware, choose_encoding
+from lms.utils.renderers import FastJSONRenderer
+from users.models import User
+from users.serializers import UserSerializer
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    payloads = {
+        "scalars": {"none": None, "true": True, "int": 2**40, "float": 3.5},
+        "small float": {"value": 0.1},
+        "text": {"title": "नेपाल — Muna Madan", "quote": 'say "hi"\n'},
+        "line separators": {"text": "a\u2028b\u2029c"},
+        "utc datetime": {"at": datetime.datetime(2026, 1, 2, 3, 4, 5, 6, datetime.UTC)},
+        "zoned datetime": {
+            "at": datetime.datetime(
+                2026, 1, 2, 3, 4, tzinfo=zoneinfo.ZoneInfo("Asia/Kathmandu")
+            )
+        },
+        "naive datetime": {"at": datetime.datetime(2026, 1, 2, 3, 4, 5)},
+        "date and time": {
+            "date": datetime.date(2026, 1, 2),
+            "time": datetime.time(1, 2, 3, 456789),
+        },
+        "decimal": {"price": decimal.Decimal("3.50")},
+        "uuid": {"id": uuid.UUID("12345678-1234-5678-1234-567812345678")},
+        "lazy string": {"message": gettext_lazy("Books retrieved successfully")},
+        "int keys": {"counts": {1: "one", 2: "two"}},
+        "error": {"email": [ErrorDetail("Enter a valid email.", code="invalid")]},
+        "nested": ReturnDict(
+            {
+                "data": ReturnList([{"id": 1, "tags": ("a", "b")}], serializer=None),
+                "count": 1,
+            },
+            serializer=None,
+        ),
+        "list": [1, "two", None, [3.25]],
+    }
+
+    def test_output_matches_json_renderer(self):
+        for name, payload in self.payloads.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    FastJSONRenderer().render(payload), JSONRenderer().render(payload)
+                )
+
+    def test_serializer_output_matches_json_renderer(self):
+        user = User(
+            id=7,
+            email="reader@example.com",
+            first_name="Laxmi",
+            last_name=None,
+            date_joined=timezone.now(),
+        )
+        data = UserSerializer(user).data
+
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indented_output_matches_json_renderer(self):
+        payload = self.payloads["nested"]
+        media_type = "application/json; indent=2"
+
+        self.assertEqual(
+            FastJSONRenderer().render(payload, media_type),
+            JSONRenderer().render(payload, media_type),
+        )
+
+    def test_non_finite_floats_are_refused(self):
+        for value in (
+            float("nan"),
+            float("inf"),
+            float("-inf"),
+            decimal.Decimal("NaN"),
+            decimal.Decimal("-Infinity"),
+        ):
+            payload = {"data": [{"rating_avg": value, "note": None}]}
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    JSONRenderer().render(payload)
+                with self.assertRaises(ValueError):
+                    FastJSONRenderer().render(payload)
+
+    def test_non_finite_floats_without_strict_json(self):
+        class LenientJSONRenderer(JSONRenderer):
+            strict = False
+
+        class LenientFastJSONRenderer(FastJSONRenderer):
+            strict = False
+
+        payload = {"values": [float("nan"), float("inf"), None]}
+
+        self.assertEqual(
+            LenientFastJSONRenderer().render(payload),
+            LenientJSONRenderer().render(payload),
+        )
+        self.assertEqual(
+            LenientFastJSONRenderer().render(payload),
+            b'{"values":[NaN,Infinity,null]}',
+        )
+
+
+@override_settings(COMPRESSION_MIN_SIZES={"application/json": 1400})
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = (
+        b'{"data":['
+        + b",".join(b'{"id":%d,"title":"Muna Madan"}' % i for i in range(100))
+        + b"]}"
+    )
+
+    def process(self, response, accept_encoding="gzip, br"):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def json_response(self, body=None):
+        return HttpResponse(body or self.body, content_type="application/json")
+
+    def test_choose_encoding_follows_q_values(self):
+        cases = {
+            "gzip, br": "br",
+            "br;q=0.5, gzip": "gzip",
+            "gzip;q=0.8, br;q=0.9": "br",
+            "GZIP; Q=1": "gzip",
+            "br;q=0, gzip;q=0": None,
+            "*": "br",
+            "*;q=0.5, br;q=0": "gzip",
+            "identity": None,
+            "gzip;q=oops, deflate": None,
+            "": None,
+        }
+        for header, expected in cases.items():
+            with self.subTest(header):
+                self.assertEqual(choose_encoding(header), expected)
+
+    def test_brotli_response(self):
+        response = self.process(self.json_response())
+
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertEqual(brotli.decompress(response.content), self.body)
+
+    def test_gzip_response(self):
+        response = self.process(self.json_response(), "br;q=0.1, gzip")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_body_below_threshold_is_left_alone(self):
+        body = self.body[:1399]
+        response = self.process(self.json_response(body))
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, body)
+
+        response = self.process(self.json_response(self.body[:1400]))
+
+        self.assertTrue(response.has_header("Content-Encoding"))
+
+    def test_unlisted_content_type_is_left_alone(self):
+        response = self.process(HttpResponse(self.body, content_type="image/png"))
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertFalse(response.has_header("Vary"))
+        self.assertEqual(response.content, self.body)
+
+    def test_no_accepted_encoding_still_varies(self):
+        response = self.process(self.json_response(), "identity")
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(response.content, self.body)
+
+    def test_vary_is_added_to_existing_values(self):
+        response = self.json_response()
+        response["Vary"] = "Authorization"
+
+        response = self.process(response)
+
+        self.assertEqual(response["Vary"], "Authorization, Accept-Encoding")
+
+    def test_already_encoded_response_is_left_alone(self):
+        response = self.json_response()
+        response["Content-Encoding"] = "identity"
+
+        response = self.process(response)
+
+        self.assertEqual(response["Content-Encoding"], "identity")
+        self.assertEqual(response.content, self.body)
+
+    def test_incompressible_body_is_sent_as_is(self):
+        body = os.urandom(4000)
+        response = self.process(self.json_response(body))
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, body)
+
+    def test_strong_etag_is_weakened(self):
+        response = self.json_response()
+        response["ETag"] = '"abc"'
+
+        response = self.process(response)
+
+        self.assertEqual(response["ETag"], 'W/"abc"')
+
+    def test_streaming_response_is_compressed_per_chunk(self):
+        chunks = [self.body[:10], b"", self.body[10:]]
+        response = StreamingHttpResponse(iter(chunks), content_type="application/json")
+
+        response = self.process(response, "gzip")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertFalse(response.has_header("Content-Length"))
+        streamed = list(response.streaming_content)
+        # Every chunk is flushed, so the first one decodes on its own.
+        decoder = zlib.decompressobj(31)
+        self.assertEqual(decoder.decompress(streamed[0]), self.body[:10])
+        self.assertEqual(gzip.decompress(b"".join(streamed)), self.body)
+
+    def test_small_streaming_response_is_compressed(self):
+        response = StreamingHttpResponse(iter([b"[]"]), content_type="application/json")
+
+        response = self.process(response, "br")
+
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(b"".join(response.streaming_content)), b"[]")
+
+    def test_async_streaming_response_is_compressed(self):
+        async def chunks():
+            yield self.body[:10]
+            yield self.body[10:]
+
+        response = StreamingHttpResponse(chunks(), content_type="application/json")
+        response = self.process(response, "br")
+
+        async def consume():
+            return b"".join([chunk async for chunk in response.streaming_content])
+
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(asyncio.run(consume())), self.body)
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class MetricsTests(TestCase):
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token_is_required(self):
+        for header in (None, "Bearer wrong", "s3cret", "Bearer s3cret "):
+            extra = {} if header is None else {"HTTP_AUTHORIZATION": header}
+            with self.subTest(header):
+                response = self.client.get("/metrics", **extra)
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response.content, b"")
+
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"lms_http_requests_total", response.content)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_open_without_token(self):
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+
+    def test_requests_are_counted_and_timed(self):
+        requests = self.sample(
+            "lms_http_requests_total", view="book-api", method="GET", status="200"
+        )
+        timed = self.sample("lms_http_request_duration_seconds_count", view="book-api")
+        queries = self.sample("lms_db_queries_total", view="book-api")
+
+        for _ in range(2):
+            self.assertEqual(self.client.get("/api/v1/books/").status_code, 200)
+        response = self.client.get("/metrics")
+
+        self.assertEqual(
+            self.sample(
+                "lms_http_requests_total", view="book-api", method="GET", status="200"
+            ),
+            requests + 2,
+        )
+        self.assertEqual(
+            self.sample("lms_http_request_duration_seconds_count", view="book-api"),
+            timed + 2,
+        )
+        self.assertGreater(
+            self.sample("lms_db_queries_total", view="book-api"), queries
+        )
+        body = response.content.decode()
+        self.assertIn(
+            'lms_http_requests_total{method="GET",status="200",view="book-api"}',
+            body,
+        )
+        self.assertIn(
+            'lms_http_request_duration_seconds_bucket{le="0.005",view="book-api"}',
+            body,
+        )
+
+    def test_unmatched_paths_share_one_label(self):
+        before = self.sample(
+            "lms_http_requests_total", view="unmatched", method="GET", status="404"
+        )
+
+        self.client.get("/no/such/page/")
+        self.client.get("/another/missing/page/")
+
+        self.assertEqual(
+            self.sample(
+                "lms_http_requests_total", view="unmatched", method="GET", status="404"
+            ),
+            before + 2,
+        )
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    def load_settings(self, **env):
+        """``lms.settings`` as loaded in an environment holding only ``env``."""
+        with mock.patch.dict(os.environ, env, clear=True):
+            return runpy.run_module("lms.settings")
+
+    def test_pool_by_default(self):
+        database = self.load_settings()["DATABASES"]["default"]
+
+        self.assertEqual(database["CONN_MAX_AGE"], 0)
+        self.assertEqual(
+            database["OPTIONS"]["pool"],
+            {
+                "min_size": 2,
+                "max_size": 36,
+                "timeout": 10.0,
+                "max_idle": 600.0,
+                "max_lifetime": 3600.0,
+            },
+        )
+
+    def test_pool_ignores_conn_max_age(self):
+        # Django refuses persistent connections together with a pool.
+        database = self.load_settings(
+            DATABASE_POOL="true",
+            DATABASE_CONN_MAX_AGE="60",
+            DATABASE_POOL_MIN_SIZE="1",
+            DATABASE_POOL_MAX_SIZE="8",
+        )["DATABASES"]["default"]
+
+        self.assertEqual(database["CONN_MAX_AGE"], 0)
+        self.assertEqual(database["OPTIONS"]["pool"]["min_size"], 1)
+        self.assertEqual(database["OPTIONS"]["pool"]["max_size"], 8)
+
+    def test_pool_max_size_follows_async_view_concurrency(self):
+        database = self.load_settings(ASYNC_VIEW_CONCURRENCY="10")["DATABASES"][
+            "default"
+        ]
+
+        self.assertEqual(database["OPTIONS"]["pool"]["max_size"], 14)
+
+    def test_persistent_connections_without_pool(self):
+        for env, max_age in (({}, 60), ({"DATABASE_CONN_MAX_AGE": "0"}, 0)):
+            with self.subTest(env):
+                database = self.load_settings(DATABASE_POOL="false", **env)[
+                    "DATABASES"
+                ]["default"]
+
+                self.assertEqual(database["CONN_MAX_AGE"], max_age)
+                self.assertNotIn("pool", database["OPTIONS"])
+                self.assertTrue(database["CONN_HEALTH_CHECKS"])
@@ -4,6 +4,8 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework.permissions import AllowAny
 
+from lms.utils.metrics import metrics_view
+
 schema_view = get_schema_view(
     openapi.Info(
         title="Library Management System",
@@ -24,4 +26,5 @@ urlpatterns = [
         schema_view.with_ui("swagger", cache_timeout=0),
         name="schema-swagger-ui",
     ),
+    path("metrics", metrics_view, name="metrics"),
 ]
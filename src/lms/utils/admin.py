@@ -0,0 +1,22 @@
+from django.contrib import admin
+
+from lms.utils.cache import invalidate_books
+
+
+class CatalogAdmin(admin.ModelAdmin):
+    """
+    Admin for models shown in the cached catalog and review lists: every
+    change bumps the catalog version, like the API writes do.
+    """
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_books()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_books()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        invalidate_books()
@@ -0,0 +1,144 @@
+import hashlib
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from lms.utils.metrics import CACHE_LOOKUPS
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def _record(namespace: str, outcome: str) -> None:
+    with _stats_lock:
+        _stats[namespace][outcome] += 1
+    CACHE_LOOKUPS.labels(namespace, outcome).inc()
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """Hit/miss counters per cached namespace for this process."""
+    with _stats_lock:
+        return {namespace: dict(counts) for namespace, counts in _stats.items()}
+
+
+def cached_response(
+    namespace: str, key: str, build: Callable[[], Response]
+) -> Response:
+    """
+    Return the cached payload for ``key`` or build the response and store its
+    data. Only ``200 OK`` responses are cached.
+    """
+    cache = get_cache()
+    payload = cache.get(key)
+    if payload is not None:
+        _record(namespace, "hits")
+        return Response(payload)
+
+    _record(namespace, "misses")
+    response = build()
+    if response.status_code == status.HTTP_200_OK:
+        cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+    return response
+
+
+async def acached_response(
+    namespace: str,
+    key: str,
+    build: Callable[[], Awaitable[Response]],
+    refresh: Optional[Callable[[Any], Awaitable[None]]] = None,
+) -> Response:
+    """
+    ``cached_response`` for async views; ``build`` is a coroutine function.
+    ``refresh``, when given, updates a payload read from the cache in place
+    before it is served.
+    """
+    cache = get_cache()
+    payload = await cache.aget(key)
+    if payload is not None:
+        _record(namespace, "hits")
+        if refresh is not None:
+            await refresh(payload)
+        return Response(payload)
+
+    _record(namespace, "misses")
+    response = await build()
+    if response.status_code == status.HTTP_200_OK:
+        await cache.aset(key, response.data, settings.API_CACHE_TIMEOUT)
+    return response
+
+
+def catalog_version() -> Tuple[int, int, datetime]:
+    """
+    Version of the whole catalog, version of its stock and when either last
+    changed. They are read from the database, not the cache, so every worker
+    sees the bumps made by the others, by the admin and by management
+    commands.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT version, stock_version, changed_at FROM catalog_version")
+        return cursor.fetchone()
+
+
+async def acatalog_version() -> Tuple[int, int, datetime]:
+    return await sync_to_async(catalog_version)()
+
+
+def catalog_page_key(request: Request, version: Any) -> str:
+    """Key of a catalog page under catalog ``version``."""
+    digest = hashlib.sha1(request.build_absolute_uri().encode("utf-8")).hexdigest()
+    return f"catalog:{version}:{digest}"
+
+
+def book_detail_key(book_id: Any, updated_at: datetime) -> str:
+    """
+    Key of a book's detail payload. It changes with ``Book.updated_at``, so
+    entries for older versions are never read again and simply expire.
+    """
+    return f"book:{book_id}:{updated_at.timestamp()}"
+
+
+def invalidate_books(*book_ids: Any) -> None:
+    """
+    Retire every cached catalog page once the current transaction commits,
+    so a concurrent read cannot re-cache the old rows. Detail payloads of
+    ``book_ids`` are keyed by ``updated_at`` and need no invalidation.
+    """
+
+    def invalidate() -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE catalog_version SET version = version + 1, changed_at = now()"
+            )
+
+    transaction.on_commit(invalidate)
+
+
+def invalidate_stock(*book_ids: Any) -> None:
+    """
+    ``invalidate_books`` for changes to nothing but the stock of ``book_ids``,
+    as borrows and returns make. Only the stock version is bumped: cached
+    catalog pages stay, and the catalog view replaces the stock in them with
+    the current one as it serves them.
+    """
+
+    def invalidate() -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE catalog_version "
+                "SET stock_version = stock_version + 1, changed_at = now()"
+            )
+
+    transaction.on_commit(invalidate)
@@ -0,0 +1,92 @@
+import hashlib
+from typing import Any, Awaitable, Callable, Optional
+
+from django.conf import settings
+from django.http import HttpResponseBase
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.request import Request
+
+
+def make_etag(request: Request, version: Any, *parts: Any) -> str:
+    """
+    Weak ETag for ``version`` of the resource at the request's URL, in the
+    negotiated media type. ``parts`` add anything else the body depends on,
+    such as the requesting user.
+    """
+    key = "|".join(
+        str(part)
+        for part in (
+            version,
+            request.get_full_path(),
+            getattr(request, "accepted_media_type", ""),
+            *parts,
+        )
+    )
+    return f'W/"{hashlib.sha1(key.encode("utf-8")).hexdigest()}"'
+
+
+def _not_modified(
+    request: Request, etag: str, last_modified: Optional[float]
+) -> Optional[HttpResponseBase]:
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified) if last_modified is not None else None,
+    )
+
+
+def _add_validators(
+    response: HttpResponseBase,
+    etag: str,
+    last_modified: Optional[float],
+    public: bool,
+) -> HttpResponseBase:
+    if response.status_code not in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+        return response
+
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    if public:
+        directives = {
+            "public": True,
+            "max_age": settings.HTTP_CACHE_MAX_AGE,
+            "s_maxage": settings.HTTP_CACHE_S_MAXAGE,
+        }
+        if settings.HTTP_CACHE_STALE_WHILE_REVALIDATE:
+            directives["stale_while_revalidate"] = (
+                settings.HTTP_CACHE_STALE_WHILE_REVALIDATE
+            )
+        patch_cache_control(response, **directives)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ("Authorization",))
+    return response
+
+
+async def aconditional_response(
+    request: Request,
+    build: Callable[[], Awaitable[HttpResponseBase]],
+    etag: str,
+    last_modified: Optional[float] = None,
+    public: bool = True,
+) -> HttpResponseBase:
+    """
+    Answer ``If-None-Match`` / ``If-Modified-Since`` with ``304 Not Modified``
+    before anything is queried or serialized, otherwise await ``build()``.
+    Successful responses carry the validators and a ``Cache-Control`` that
+    lets a CDN store public responses; private ones are only kept by the
+    client and always revalidated.
+
+    ``etag`` and ``last_modified`` (a Unix timestamp) must be read before the
+    body is built, so that a concurrent write can only make them older than
+    the body, never newer.
+    """
+    response = _not_modified(request, etag, last_modified) or await build()
+    return _add_validators(response, etag, last_modified, public)
@@ -0,0 +1,131 @@
+import hmac
+import os
+from typing import Any
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.http import HttpRequest, HttpResponse, HttpResponseBase
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from lms.utils.timing import RequestTimer
+
+# Label for requests that matched no URL pattern, so 404 scans cannot create
+# one time series per path.
+UNMATCHED = "unmatched"
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+REQUESTS = Counter(
+    "lms_http_requests",
+    "Requests served, by URL name, method and status code.",
+    ["view", "method", "status"],
+)
+REQUEST_SECONDS = Histogram(
+    "lms_http_request_duration_seconds",
+    "Time until the response was returned, by URL name.",
+    ["view"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_QUERIES = Counter(
+    "lms_db_queries", "Queries run while serving requests, by URL name.", ["view"]
+)
+DB_SECONDS = Counter(
+    "lms_db_query_seconds",
+    "Time spent in queries while serving requests, by URL name.",
+    ["view"],
+)
+DB_CONNECTIONS = Counter(
+    "lms_db_connections",
+    "Database connections opened, or taken from the pool when pooling is on.",
+    ["alias"],
+)
+DB_POOL = Gauge(
+    "lms_db_pool_connections",
+    "Pooled connections: size, available, and requests waiting for one.",
+    ["alias", "state"],
+    multiprocess_mode="livesum",
+)
+CACHE_LOOKUPS = Counter(
+    "lms_cache_lookups",
+    "Response cache lookups, by namespace and result (hits or misses).",
+    ["namespace", "result"],
+)
+BORROWS = Counter("lms_borrows", "Books borrowed, counted when committed.")
+RETURNS = Counter("lms_returns", "Books returned, counted when committed.")
+
+
+def observe_request(
+    request: HttpRequest,
+    response: HttpResponseBase,
+    timer: RequestTimer,
+    seconds: float,
+) -> None:
+    match = request.resolver_match
+    view = (match.url_name or match.route) if match else UNMATCHED
+    method = request.method if request.method in METHODS else "OTHER"
+    REQUESTS.labels(view, method, response.status_code).inc()
+    REQUEST_SECONDS.labels(view).observe(seconds)
+    if timer.queries:
+        DB_QUERIES.labels(view).inc(timer.queries)
+        DB_SECONDS.labels(view).inc(timer.db_seconds)
+
+
+def observe_pools() -> None:
+    """
+    Publish the state of every psycopg connection pool. Called as a request
+    starts, before it takes a connection, so the request does not count
+    itself.
+    """
+    for alias in settings.DATABASES:
+        pool = getattr(connections[alias], "pool", None)
+        if pool is None:
+            continue
+        stats = pool.get_stats()
+        DB_POOL.labels(alias, "size").set(stats.get("pool_size", 0))
+        DB_POOL.labels(alias, "available").set(stats.get("pool_available", 0))
+        DB_POOL.labels(alias, "waiting").set(stats.get("requests_waiting", 0))
+
+
+def count_connection(sender: Any, connection: Any, **kwargs: Any) -> None:
+    """``connection_created`` receiver."""
+    DB_CONNECTIONS.labels(connection.alias).inc()
+
+
+def record_borrows(count: int = 1) -> None:
+    """Count ``count`` borrows once the current transaction commits."""
+    if count:
+        transaction.on_commit(lambda: BORROWS.inc(count))
+
+
+def record_returns(count: int = 1) -> None:
+    """Count ``count`` returns once the current transaction commits."""
+    if count:
+        transaction.on_commit(lambda: RETURNS.inc(count))
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """
+    Metrics in the Prometheus text format. With ``PROMETHEUS_MULTIPROC_DIR``
+    set, every worker writes its samples to files there and this view sums
+    them, so any worker can answer a scrape.
+    """
+    token = settings.METRICS_TOKEN
+    if token and not hmac.compare_digest(
+        request.headers.get("Authorization", "").encode(),
+        f"Bearer {token}".encode(),
+    ):
+        return HttpResponse(status=401)
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
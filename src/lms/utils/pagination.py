@@ -1,7 +1,18 @@
-from typing import Any
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple, Type
 
+from django.core.paginator import InvalidPage
+from django.db.models import Count, Q, QuerySet, Window
+from rest_framework import serializers, status
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from lms.utils.response import api_response
+from lms.utils.timing import timed
 
 
 class CustomPagination(PageNumberPagination):
@@ -9,6 +20,50 @@ class CustomPagination(PageNumberPagination):
     page_size_query_param = "limit"
     max_page_size = 100
 
+    async def apaginate_queryset(
+        self: Any, queryset: QuerySet, request: Request, view: Any = None
+    ) -> Optional[List[Any]]:
+        """``paginate_queryset`` for async views, using the async ORM."""
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Count up front so the paginator never queries synchronously.
+        paginator.count = await queryset.acount()
+        self._set_page(paginator, request)
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        return list(self.page)
+
+    def _offset_page_number(self: Any, request: Request) -> int:
+        """The ``?page=`` number, for pages fetched with ``OFFSET`` directly."""
+        page_number = request.query_params.get(self.page_query_param, "1")
+        try:
+            number = int(page_number)
+        except ValueError:
+            number = 0
+        if number < 1:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number,
+                    message="That page number is not a positive integer",
+                )
+            )
+        return number
+
+    def _set_page(self: Any, paginator: Any, request: Request) -> None:
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(page_number=page_number, message=exc)
+            )
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+
     def get_paginated_response(self: Any, data: Any, extras: Any = None) -> Response:
         return Response(
             {
@@ -20,3 +75,303 @@ class CustomPagination(PageNumberPagination):
                 "data": data,
             }
         )
+
+
+class KeysetPagination(CustomPagination):
+    """
+    Opt-in cursor pagination selected with ``?cursor=``.
+
+    Pages are found with a seek predicate on ``(<ordering field>, id)``
+    instead of ``COUNT(*)`` plus ``OFFSET``, so deep pages cost the same as
+    the first one. The ordering field is taken from the queryset's own
+    ``order_by``.
+    """
+
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(
+        self: Any, queryset: QuerySet, request: Request, view: Any = None
+    ) -> List[Any]:
+        queryset, page_size, field, position = self._seek(queryset, request)
+        return self._finish_page(list(queryset), page_size, field, position)
+
+    async def apaginate_queryset(
+        self: Any, queryset: QuerySet, request: Request, view: Any = None
+    ) -> List[Any]:
+        queryset, page_size, field, position = self._seek(queryset, request)
+        rows = [row async for row in queryset]
+        return self._finish_page(rows, page_size, field, position)
+
+    def _seek(
+        self: Any, queryset: QuerySet, request: Request
+    ) -> Tuple[QuerySet, int, str, Optional[Tuple[Any, Any, bool]]]:
+        """Build the query for the requested page, plus one lookahead row."""
+        self.request = request
+        page_size = self.get_page_size(request)
+        field, descending = self._get_ordering(queryset)
+        position = self._decode_cursor(request, queryset, field)
+
+        reverse = position is not None and position[2]
+        # Walking backwards flips the ordering; rows are put back in
+        # display order once fetched.
+        seek_descending = descending != reverse
+        prefix = "-" if seek_descending else ""
+        order_by = [f"{prefix}{field}"]
+        if field != "pk":
+            order_by.append(f"{prefix}pk")
+        queryset = queryset.order_by(*order_by)
+
+        if position is not None:
+            value, pk = position[0], position[1]
+            lookup = "lt" if seek_descending else "gt"
+            if field == "pk":
+                queryset = queryset.filter(**{f"pk__{lookup}": pk})
+            else:
+                queryset = queryset.filter(
+                    Q(**{f"{field}__{lookup}": value})
+                    | Q(**{field: value, f"pk__{lookup}": pk})
+                )
+
+        return queryset[: page_size + 1], page_size, field, position
+
+    def _finish_page(
+        self: Any,
+        rows: List[Any],
+        page_size: int,
+        field: str,
+        position: Optional[Tuple[Any, Any, bool]],
+    ) -> List[Any]:
+        reverse = position is not None and position[2]
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        first = self._position(rows[0], field) if rows else position
+        last = self._position(rows[-1], field) if rows else position
+
+        if reverse:
+            self.next_position = last
+            self.previous_position = first if has_more else None
+        else:
+            self.next_position = last if has_more else None
+            self.previous_position = first if position is not None else None
+        return rows
+
+    def get_paginated_response(self: Any, data: Any, extras: Any = None) -> Response:
+        return Response(
+            {
+                "status": "success",
+                "message": "Retrieved successfully",
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "data": data,
+            }
+        )
+
+    def get_next_link(self: Any) -> Optional[str]:
+        if self.next_position is None:
+            return None
+        return self._build_link(self.next_position, reverse=False)
+
+    def get_previous_link(self: Any) -> Optional[str]:
+        if self.previous_position is None:
+            return None
+        return self._build_link(self.previous_position, reverse=True)
+
+    def _get_ordering(self: Any, queryset: QuerySet) -> Tuple[str, bool]:
+        ordering = queryset.query.order_by
+        field = ordering[0] if ordering else "-pk"
+        if not isinstance(field, str):
+            raise TypeError("Keyset pagination requires a plain field ordering.")
+        descending = field.startswith("-")
+        field = field.lstrip("-")
+        if field == queryset.model._meta.pk.name:
+            field = "pk"
+        return field, descending
+
+    def _position(self: Any, row: Any, field: str) -> Tuple[Any, Any, bool]:
+        return getattr(row, field), row.pk, False
+
+    def _decode_cursor(
+        self: Any, request: Request, queryset: QuerySet, field: str
+    ) -> Optional[Tuple[Any, Any, bool]]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            raw = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            opts = queryset.model._meta
+            model_field = opts.pk if field == "pk" else opts.get_field(field)
+            value = model_field.to_python(raw["v"])
+            pk = opts.pk.to_python(raw["i"])
+            return value, pk, bool(raw["r"])
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _build_link(self: Any, position: Tuple[Any, Any, bool], reverse: bool) -> str:
+        value, pk = position[0], position[1]
+        if hasattr(value, "isoformat"):
+            value = value.isoformat()
+        payload = json.dumps({"v": value, "i": pk, "r": reverse}, separators=(",", ":"))
+        encoded = base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(url, self.cursor_query_param, encoded.rstrip("="))
+
+
+class WindowCountPagination(CustomPagination):
+    """
+    Page numbers with the count taken from a ``COUNT(*) OVER ()`` column of
+    the page's own rows, for lists that cost as much to count as to fetch,
+    such as ones sorted on a computed value.
+    """
+
+    async def apaginate_queryset(
+        self: Any, queryset: QuerySet, request: Request, view: Any = None
+    ) -> List[Any]:
+        page_size = self.get_page_size(request)
+        page_number = self._offset_page_number(request)
+        offset = (page_number - 1) * page_size
+        queryset = queryset.annotate(window_count=Window(Count("*")))
+        rows = [row async for row in queryset[offset : offset + page_size]]
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Past the last page there is no row to read the count from.
+        paginator.count = rows[0].window_count if rows else offset
+        self._set_page(paginator, request)
+        self.page.object_list = rows
+        return rows
+
+
+class UncountedPagination(CustomPagination):
+    """
+    Page numbers without ``COUNT(*)``, for lists too large to count on every
+    request. One row past the page tells whether there is a next one; the
+    response has no ``count``.
+    """
+
+    async def apaginate_queryset(
+        self: Any, queryset: QuerySet, request: Request, view: Any = None
+    ) -> List[Any]:
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.page_number = self._offset_page_number(request)
+        offset = (self.page_number - 1) * page_size
+        rows = [row async for row in queryset[offset : offset + page_size + 1]]
+        if not rows and self.page_number > 1:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=self.page_number,
+                    message="That page contains no results",
+                )
+            )
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_paginated_response(self: Any, data: Any, extras: Any = None) -> Response:
+        return Response(
+            {
+                "status": "success",
+                "message": "Retrieved successfully",
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "data": data,
+            }
+        )
+
+    def get_next_link(self: Any) -> Optional[str]:
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self: Any) -> Optional[str]:
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+
+def get_paginator(request: Request) -> CustomPagination:
+    """Keyset pagination when ``?cursor=`` is passed, page numbers otherwise."""
+    if KeysetPagination.cursor_query_param in request.query_params:
+        return KeysetPagination()
+    return CustomPagination()
+
+
+def paginated_list_response(
+    request: Request,
+    queryset: QuerySet,
+    serializer_class: Type[serializers.BaseSerializer],
+    message: str = "Retrieved successfully",
+    context: Optional[Dict[str, Any]] = None,
+) -> Response:
+    """
+    Slice ``queryset`` down to the requested page before serializing it, so
+    the cost of a list request depends on the page size, not the table size.
+    Passing ``?cursor=`` switches to keyset pagination.
+    """
+    paginator = get_paginator(request)
+    page = paginator.paginate_queryset(queryset, request)
+    return _list_response(
+        request, queryset, page, paginator, serializer_class, message, context
+    )
+
+
+async def apaginated_list_response(
+    request: Request,
+    queryset: QuerySet,
+    serializer_class: Type[serializers.BaseSerializer],
+    message: str = "Retrieved successfully",
+    context: Optional[Dict[str, Any]] = None,
+    paginator: Optional[CustomPagination] = None,
+) -> Response:
+    """
+    ``paginated_list_response`` for async views. The page is fetched with the
+    async ORM; ``queryset`` must prefetch everything the serializer reads.
+    ``paginator`` replaces the one ``get_paginator`` picks.
+    """
+    if paginator is None:
+        paginator = get_paginator(request)
+    page = await paginator.apaginate_queryset(queryset, request)
+    if page is None:
+        page = [obj async for obj in queryset]
+        paginator = None
+    return _list_response(
+        request, queryset, page, paginator, serializer_class, message, context
+    )
+
+
+def _list_response(
+    request: Request,
+    queryset: Any,
+    page: Optional[List[Any]],
+    paginator: Optional[CustomPagination],
+    serializer_class: Type[serializers.BaseSerializer],
+    message: str,
+    context: Optional[Dict[str, Any]],
+) -> Response:
+    context = {"request": request, **(context or {})}
+
+    if page is not None and paginator is not None:
+        serializer = serializer_class(page, many=True, context=context)
+        with timed("serialize"):
+            data = serializer.data
+        return paginator.get_paginated_response(data)
+
+    serializer = serializer_class(
+        queryset if page is None else page, many=True, context=context
+    )
+    with timed("serialize"):
+        data = serializer.data
+    return api_response(
+        data=data,
+        message=message,
+        status_code=status.HTTP_200_OK,
+    )
@@ -0,0 +1,38 @@
+import codecs
+from typing import Any, IO, Mapping, Optional
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from lms.utils.renderers import FastJSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+class FastJSONParser(JSONParser):
+    """
+    ``JSONParser`` backed by orjson when it is installed and the request
+    body is UTF-8; anything else goes through the stdlib parser.
+    """
+
+    renderer_class = FastJSONRenderer
+
+    def parse(
+        self,
+        stream: IO[bytes],
+        media_type: Optional[str] = None,
+        parser_context: Optional[Mapping[str, Any]] = None,
+    ) -> Any:
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
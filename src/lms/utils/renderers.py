@@ -0,0 +1,178 @@
+import csv
+import datetime
+import decimal
+import io
+import json
+import math
+from typing import Any, Iterable, Mapping, Optional, Sequence
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from lms.utils.timing import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+def _has_non_finite(value: Any) -> bool:
+    """
+    Whether ``value`` holds a NaN or infinite float anywhere, or a Decimal
+    that ``JSONEncoder.default`` would turn into one.
+    """
+    if isinstance(value, dict):
+        value = value.values()
+    elif not isinstance(value, (list, tuple)):
+        if isinstance(value, decimal.Decimal):
+            return not value.is_finite()
+        return isinstance(value, float) and not math.isfinite(value)
+    for item in value:
+        # Most items are scalars; skip them without a call.
+        kind = type(item)
+        if kind is str or kind is int or kind is bool or item is None:
+            continue
+        if _has_non_finite(item):
+            return True
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` backed by orjson when it is installed.
+
+    The output matches the stdlib renderer for compact, non-ASCII-escaped
+    JSON, which are DRF's defaults, except that floats in exponent notation
+    are written as ``1e20`` rather than ``1e+20``. Types orjson does not
+    know (``Decimal``, lazy strings, querysets, ...) go through DRF's
+    ``JSONEncoder.default``. Indented output, any payload orjson rejects and
+    payloads with NaN or infinite floats, which orjson would write as
+    ``null``, fall back to the stdlib renderer; with ``STRICT_JSON`` on, as
+    by default, that raises ``ValueError``.
+    """
+
+    options = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(
+        self,
+        data: Any,
+        accepted_media_type: Optional[str] = None,
+        renderer_context: Optional[Mapping[str, Any]] = None,
+    ) -> bytes:
+        with timed("render"):
+            return self.dumps(data, accepted_media_type, renderer_context)
+
+    def dumps(
+        self,
+        data: Any,
+        accepted_media_type: Optional[str] = None,
+        renderer_context: Optional[Mapping[str, Any]] = None,
+    ) -> bytes:
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_encoder.default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Only look for non-finite floats when there is a null they could
+        # have become.
+        if b"null" in ret and _has_non_finite(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same escaping as JSONRenderer, so the output stays a JavaScript
+        # subset.
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return ret
+
+
+class NDJSONRenderer(FastJSONRenderer):
+    """
+    Newline-delimited JSON, one object per line. ``render`` writes a single
+    payload as one line; exports stream rows through ``render_rows``.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(
+        self,
+        data: Any,
+        accepted_media_type: Optional[str] = None,
+        renderer_context: Optional[Mapping[str, Any]] = None,
+    ) -> bytes:
+        if data is None:
+            return b""
+        # Called once per row by exports, so it skips the render timing.
+        return self.dumps(data, accepted_media_type, renderer_context) + b"\n"
+
+    def render_rows(
+        self, header: Sequence[str], rows: Iterable[Sequence[Any]]
+    ) -> bytes:
+        return b"".join(self.render(dict(zip(header, row))) for row in rows)
+
+
+# Spreadsheets evaluate cells starting with these as formulas.
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, str):
+        # Quote user text that a spreadsheet would run as a formula.
+        return "'" + value if value.startswith(_FORMULA_PREFIXES) else value
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime.datetime):
+        # Same format as DRF's JSON encoder.
+        value = value.isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+    return value
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    CSV with a header row. ``render`` accepts a dict or a list of dicts, so
+    error responses are readable too; exports stream rows through
+    ``render_header`` and ``render_rows``.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(
+        self,
+        data: Any,
+        accepted_media_type: Optional[str] = None,
+        renderer_context: Optional[Mapping[str, Any]] = None,
+    ) -> bytes:
+        if data is None:
+            return b""
+        rows = data if isinstance(data, list) else [data]
+        header = list(rows[0]) if rows else []
+        return self.render_header(header) + self.render_rows(
+            header, ([row.get(name) for name in header] for row in rows)
+        )
+
+    def render_header(self, header: Sequence[str]) -> bytes:
+        return self.render_rows(header, [header])
+
+    def render_rows(
+        self, header: Sequence[str], rows: Iterable[Sequence[Any]]
+    ) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([_csv_value(value) for value in row] for row in rows)
+        return buffer.getvalue().encode(self.charset)
@@ -0,0 +1,264 @@
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.manager import BaseManager
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.request import Request
+
+Selection = Optional[Set[str]]
+
+
+def _parse(value: Optional[str]) -> Selection:
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def field_selection(request: Request) -> Dict[str, Selection]:
+    """
+    Read ``?fields=`` and ``?expand=`` into the serializer context keys used
+    by ``SparseFieldsMixin``. Both take comma separated, dotted paths such as
+    ``fields=id,books.title`` or ``expand=books,books.authors``. A missing
+    param means "everything", an empty one means "nothing".
+    """
+    return {
+        "fields": _parse(request.query_params.get("fields")),
+        "expand": _parse(request.query_params.get("expand")),
+    }
+
+
+def wants(selection: Selection, name: str) -> bool:
+    if selection is None:
+        return True
+    prefix = f"{name}."
+    return any(item == name or item.startswith(prefix) for item in selection)
+
+
+def sub_fields(fields: Selection, name: str) -> Selection:
+    """Fields requested under ``name``; all of them unless narrowed."""
+    if fields is None:
+        return None
+    prefix = f"{name}."
+    nested = {item[len(prefix) :] for item in fields if item.startswith(prefix)}
+    return nested or None
+
+
+def sub_expand(expand: Selection, name: str) -> Selection:
+    """Relations expanded under ``name``; none of them unless listed."""
+    if expand is None:
+        return None
+    prefix = f"{name}."
+    return {item[len(prefix) :] for item in expand if item.startswith(prefix)}
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin that drops fields not listed in the ``fields`` context
+    value and renders relations missing from ``expand`` as ids. Names that
+    are neither a field nor an expandable relation raise ``ValidationError``.
+
+    ``collapsed_fields`` maps a relation name to a factory for the field used
+    when it is not expanded. Nested serializers resolve their part of the
+    selection from their position in the tree.
+    """
+
+    collapsed_fields: Dict[str, Callable[[], serializers.Field]] = {}
+
+    def get_path(self) -> List[str]:
+        """Field names from the root serializer down to this one."""
+        path = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        return path[::-1]
+
+    def get_selection(self):
+        fields = self.context.get("fields")
+        expand = self.context.get("expand")
+        for name in self.get_path():
+            fields = sub_fields(fields, name)
+            expand = sub_expand(expand, name)
+        return fields, expand
+
+    def check_selection(self, fields, requested: Selection, expand: Selection):
+        """Reject names in ``fields`` or ``expand`` this serializer lacks."""
+        prefix = "".join(f"{name}." for name in self.get_path())
+        errors = {}
+        for param, selection, known in (
+            ("fields", requested, fields),
+            ("expand", expand, self.collapsed_fields.keys() & fields.keys()),
+        ):
+            unknown = sorted(
+                prefix + item
+                for item in selection or ()
+                if item.split(".", 1)[0] not in known
+            )
+            if unknown:
+                errors[param] = [f"Unknown field: {name}" for name in unknown]
+        if errors:
+            raise serializers.ValidationError(errors)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested, expand = self.get_selection()
+        self.check_selection(fields, requested, expand)
+
+        for name, make_field in self.collapsed_fields.items():
+            if name in fields and not wants(expand, name):
+                fields[name] = make_field()
+
+        if requested is not None:
+            for name in list(fields):
+                if not wants(requested, name):
+                    fields.pop(name)
+        return fields
+
+    def is_expanded(self, name: str) -> bool:
+        return wants(self.get_selection()[1], name)
+
+    def nested_context(self, name: str) -> Dict[str, Any]:
+        """Context for a serializer built by hand to render field ``name``."""
+        requested, expand = self.get_selection()
+        return {
+            **self.context,
+            "fields": sub_fields(requested, name),
+            "expand": sub_expand(expand, name),
+        }
+
+
+_SKIP = object()
+
+# Field classes whose ``to_representation`` is exactly this conversion.
+_FAST_CONVERTERS: Dict[type, Callable[[Any], Any]] = {
+    serializers.CharField: str,
+    serializers.EmailField: str,
+    serializers.IntegerField: int,
+    serializers.FloatField: float,
+    serializers.BooleanField: bool,
+}
+
+
+def _model_attribute(serializer: Any, field: serializers.Field) -> Optional[str]:
+    """The attribute name when ``field`` reads a plain concrete model column."""
+    model = getattr(getattr(serializer, "Meta", None), "model", None)
+    if model is None or len(field.source_attrs) != 1:
+        return None
+    try:
+        model_field = model._meta.get_field(field.source_attrs[0])
+    except FieldDoesNotExist:
+        return None
+    if not model_field.concrete or model_field.is_relation:
+        return None
+    return model_field.attname
+
+
+def _compile_field(serializer: Any, field: serializers.Field) -> Callable[[Any], Any]:
+    if isinstance(field, serializers.SerializerMethodField):
+        return getattr(serializer, field.method_name)
+
+    if isinstance(field, serializers.ListSerializer) and isinstance(
+        field.child, CompiledReadMixin
+    ):
+        child = field.child.compiled_representation
+        if child is not None:
+
+            def many(instance: Any) -> Any:
+                try:
+                    value = field.get_attribute(instance)
+                except SkipField:
+                    return _SKIP
+                if value is None:
+                    return None
+                if isinstance(value, BaseManager):
+                    value = value.all()
+                return [child(item) for item in value]
+
+            return many
+
+    if isinstance(field, CompiledReadMixin) and field.compiled_representation:
+        nested = field.compiled_representation
+
+        def one(instance: Any) -> Any:
+            try:
+                value = field.get_attribute(instance)
+            except SkipField:
+                return _SKIP
+            return None if value is None else nested(value)
+
+        return one
+
+    attname = _model_attribute(serializer, field)
+    convert = _FAST_CONVERTERS.get(type(field))
+    if attname is not None:
+        to_representation = convert or field.to_representation
+
+        def column(instance: Any) -> Any:
+            value = getattr(instance, attname)
+            return None if value is None else to_representation(value)
+
+        return column
+
+    def generic(instance: Any) -> Any:
+        try:
+            attribute = field.get_attribute(instance)
+        except SkipField:
+            return _SKIP
+        if isinstance(attribute, PKOnlyObject):
+            check_for_none = attribute.pk
+        else:
+            check_for_none = attribute
+        return None if check_for_none is None else field.to_representation(attribute)
+
+    return generic
+
+
+def compile_serializer(serializer: Any) -> Callable[[Any], Dict[str, Any]]:
+    """
+    Turn a bound serializer's readable fields into one function from an
+    instance to its representation, equal to ``to_representation``.
+
+    Plain model columns are read with ``getattr`` and converted directly,
+    nested compiled serializers are inlined, everything else goes through
+    the field as DRF would call it.
+    """
+    readers = [
+        (field.field_name, _compile_field(serializer, field))
+        for field in serializer._readable_fields
+    ]
+
+    def represent(instance: Any) -> Dict[str, Any]:
+        ret = {}
+        for name, read in readers:
+            value = read(instance)
+            if value is not _SKIP:
+                ret[name] = value
+        return ret
+
+    return represent
+
+
+class CompiledReadMixin:
+    """
+    Serializer mixin that renders instances through ``compile_serializer``.
+    The field list is compiled once per serializer instance, so a list
+    serializer compiles its child once for the whole page. Setting
+    ``COMPILED_SERIALIZERS = False`` restores DRF's own path.
+    """
+
+    @cached_property
+    def compiled_representation(self) -> Optional[Callable[[Any], Dict[str, Any]]]:
+        if not settings.COMPILED_SERIALIZERS:
+            return None
+        return compile_serializer(self)
+
+    def to_representation(self, instance: Any) -> Dict[str, Any]:
+        represent = self.compiled_representation
+        if represent is None:
+            return super().to_representation(instance)
+        return represent(instance)
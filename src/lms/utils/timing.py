@@ -0,0 +1,127 @@
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, List, Optional
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_PARAMETER_LIST = re.compile(r"%s(?:\s*,\s*%s)+")
+
+
+def query_shape(sql: str) -> str:
+    """``sql`` with parameter lists collapsed, so ``IN`` lists of any length match."""
+    return _PARAMETER_LIST.sub("%s, ...", sql)
+
+
+class RequestTimer:
+    """
+    Time spent in one request: the queries it ran, through
+    ``record_query``, and the named phases measured with ``timed``.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.queries = 0
+        self.db_seconds = 0.0
+        self._statements: Counter = Counter()
+
+    def __call__(
+        self, execute: Callable, sql: str, params: Any, many: bool, context: Any
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+            self._statements[sql] += 1
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def repeated_queries(self, threshold: int) -> List[Dict[str, Any]]:
+        """Query shapes run at least ``threshold`` times, the N+1 suspects."""
+        shapes: Counter = Counter()
+        for sql, count in self._statements.items():
+            shapes[query_shape(sql)] += count
+        return [
+            {"sql": sql, "count": count}
+            for sql, count in shapes.most_common()
+            if count >= threshold
+        ]
+
+
+_current: ContextVar[Optional[RequestTimer]] = ContextVar("request_timer", default=None)
+
+
+class request_timer:
+    """
+    Time the block with a new ``RequestTimer``, or with the one already
+    running when middleware further out started it, so both share it.
+    """
+
+    __slots__ = ("timer", "token")
+
+    def __enter__(self) -> RequestTimer:
+        self.timer = _current.get()
+        if self.timer is None:
+            self.timer = RequestTimer()
+            self.token: Optional[Token] = _current.set(self.timer)
+        else:
+            self.token = None
+        return self.timer
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self.token is not None:
+            _current.reset(self.token)
+
+
+def record_query(
+    execute: Callable, sql: str, params: Any, many: bool, context: Any
+) -> Any:
+    """
+    Execute wrapper installed on every connection. Async views run their
+    queries on the executor thread's connection, not the one the middleware
+    sees, so the timer is found through the context variable, which
+    ``sync_to_async`` copies into that thread.
+    """
+    timer = _current.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def _add_record_query(sender: Any, connection: Any, **kwargs: Any) -> None:
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_query_recorder() -> None:
+    """Add ``record_query`` to every connection, open now or opened later."""
+    connection_created.connect(_add_record_query, dispatch_uid="record_query")
+    for conn in connections.all(initialized_only=True):
+        _add_record_query(None, conn)
+
+
+class timed:
+    """
+    Add the time spent in the block to ``phase`` of the current request's
+    timer. Costs one context variable lookup when the request is not timed.
+    """
+
+    __slots__ = ("phase", "timer", "started")
+
+    def __init__(self, phase: str) -> None:
+        self.phase = phase
+        self.timer = _current.get()
+
+    def __enter__(self) -> None:
+        if self.timer is not None:
+            self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self.timer is not None:
+            self.timer.add(self.phase, time.perf_counter() - self.started)
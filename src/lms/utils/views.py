@@ -0,0 +1,33 @@
+import asyncio
+import weakref
+from typing import Any
+
+from adrf.views import APIView
+from django.conf import settings
+
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]"
+_limiters = weakref.WeakKeyDictionary()
+
+
+def _get_limiter() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        limiter = _limiters[loop] = asyncio.Semaphore(settings.ASYNC_VIEW_CONCURRENCY)
+    return limiter
+
+
+class AsyncAPIView(APIView):
+    """
+    Base class for views with ``async def`` handlers.
+
+    Every request served by an async view runs its ORM calls on a thread of
+    its own, each with its own database connection. At most
+    ``ASYNC_VIEW_CONCURRENCY`` requests per event loop are let in at once so
+    a burst of connections cannot exhaust the database; the rest wait on the
+    loop without holding a thread.
+    """
+
+    async def async_dispatch(self, request: Any, *args: Any, **kwargs: Any) -> Any:
+        async with _get_limiter():
+            return await super().async_dispatch(request, *args, **kwargs)
@@ -1,4 +1,5 @@
 from django.contrib import admin
 from .models import BookReview
+from lms.utils.admin import CatalogAdmin
 
-admin.site.register(BookReview)
+admin.site.register(BookReview, CatalogAdmin)
@@ -0,0 +1,50 @@
+from django.db.models import Avg, Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from library.models import Book
+from lms.utils.cache import invalidate_books
+from reviews.models import BookReview
+
+
+class Command(BaseCommand):
+    help = "Recompute review_count and rating_avg on every book from its reviews"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10000,
+            help="Number of book ids updated per statement",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        reviews = BookReview.objects.filter(
+            book=OuterRef("pk"), is_deleted=False
+        ).values("book")
+        review_count = reviews.annotate(n=Count("id")).values("n")
+        rating_avg = reviews.annotate(avg=Avg("rating")).values("avg")
+
+        ids = Book.objects.order_by("pk").values_list("pk", flat=True)
+        last_id = ids.last()
+        if last_id is None:
+            self.stdout.write("No books to rebuild.")
+            return
+
+        updated = 0
+        start = ids.first()
+        while start <= last_id:
+            end = start + batch_size
+            updated += Book.objects.filter(pk__gte=start, pk__lt=end).update(
+                review_count=Coalesce(
+                    Subquery(review_count, output_field=IntegerField()), Value(0)
+                ),
+                rating_avg=Coalesce(Subquery(rating_avg), Value(0.0)),
+                updated_at=timezone.now(),
+            )
+            self.stdout.write(f"Rebuilt review aggregates for {updated} books...")
+            start = end
+
+        invalidate_books()
+        self.stdout.write(self.style.SUCCESS("Review aggregates rebuilt!"))
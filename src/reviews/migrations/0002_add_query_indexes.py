@@ -0,0 +1,42 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:42
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking writes to tables that are already
+    # large; CREATE INDEX CONCURRENTLY cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ("library", "0004_add_query_indexes"),
+        ("reviews", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="bookreview",
+            index=models.Index(
+                condition=models.Q(("is_deleted", False)),
+                fields=["-created_at", "-id"],
+                name="reviews_active_created_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="bookreview",
+            index=models.Index(
+                fields=["book", "is_deleted", "-created_at", "-id"],
+                name="reviews_book_created_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="bookreview",
+            index=models.Index(
+                fields=["user", "is_deleted", "-created_at", "-id"],
+                name="reviews_user_created_idx",
+            ),
+        ),
+    ]
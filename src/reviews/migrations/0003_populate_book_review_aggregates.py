@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-18 20:15
+
+from django.db import migrations
+
+POPULATE_REVIEW_AGGREGATES = """
+UPDATE books
+SET review_count = aggregates.review_count, rating_avg = aggregates.rating_avg
+FROM (
+    SELECT book_id, COUNT(*) AS review_count, AVG(rating) AS rating_avg
+    FROM book_reviews
+    WHERE NOT is_deleted
+    GROUP BY book_id
+) AS aggregates
+WHERE books.id = aggregates.book_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0007_book_review_aggregates"),
+        ("reviews", "0002_add_query_indexes"),
+    ]
+
+    operations = [
+        migrations.RunSQL(POPULATE_REVIEW_AGGREGATES, migrations.RunSQL.noop),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from users.models import User
 from library.models import Book
 
@@ -6,6 +6,21 @@ from library.models import Book
 class BookReview(models.Model):
     class Meta:
         db_table = "book_reviews"
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(is_deleted=False),
+                name="reviews_active_created_idx",
+            ),
+            models.Index(
+                fields=["book", "is_deleted", "-created_at", "-id"],
+                name="reviews_book_created_idx",
+            ),
+            models.Index(
+                fields=["user", "is_deleted", "-created_at", "-id"],
+                name="reviews_user_created_idx",
+            ),
+        ]
 
     book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="reviews")
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="reviews")
@@ -13,3 +28,17 @@ class BookReview(models.Model):
     comment = models.TextField(null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     is_deleted = models.BooleanField(default=False)
+
+    def soft_delete(self):
+        """
+        Mark the review deleted and drop its rating from the book aggregates.
+        Returns False if it was already deleted.
+        """
+        with transaction.atomic():
+            updated = BookReview.objects.filter(pk=self.pk, is_deleted=False).update(
+                is_deleted=True
+            )
+            if updated:
+                Book.objects.discard_review(self.book_id, self.rating)
+        self.is_deleted = True
+        return updated == 1
@@ -1,7 +1,19 @@
+from django.db import transaction
+from django.db.models import QuerySet
 from rest_framework import serializers
 from .models import BookReview
 from users.serializers import UserSerializer
+from library.models import Book
 from library.serializers import BookListSerializer
+from lms.utils.cache import invalidate_books
+from lms.utils.serializers import (
+    CompiledReadMixin,
+    Selection,
+    SparseFieldsMixin,
+    sub_expand,
+    sub_fields,
+    wants,
+)
 
 
 class BookReviewAddSerializer(serializers.ModelSerializer):
@@ -15,14 +27,22 @@ class BookReviewAddSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         user = self.context["request"].user
-        book_review = BookReview.objects.create(user=user, **validated_data)
+        with transaction.atomic():
+            book_review = BookReview.objects.create(user_id=user.id, **validated_data)
+            Book.objects.record_review(book_review.book_id, book_review.rating)
+        invalidate_books(book_review.book_id)
         return book_review
 
 
-class BookReviewSerializer(serializers.ModelSerializer):
+class BookReviewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer()
     book = BookListSerializer()
 
+    collapsed_fields = {
+        "user": lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+        "book": lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+    }
+
     class Meta:
         model = BookReview
         fields = [
@@ -35,9 +55,30 @@ class BookReviewSerializer(serializers.ModelSerializer):
             "is_deleted",
         ]
 
+    @staticmethod
+    def setup_eager_loading(
+        queryset: QuerySet, fields: Selection = None, expand: Selection = None
+    ) -> QuerySet:
+        if wants(fields, "user") and wants(expand, "user"):
+            queryset = queryset.select_related("user")
+        if wants(fields, "book") and wants(expand, "book"):
+            queryset = BookListSerializer.setup_eager_loading(
+                queryset.select_related("book"),
+                prefix="book__",
+                fields=sub_fields(fields, "book"),
+                expand=sub_expand(expand, "book"),
+            )
+        return queryset
 
-class BookReviewListSerializer(serializers.ModelSerializer):
-    user = UserSerializer()
+
+class BookReviewListSerializer(
+    CompiledReadMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
+    user = serializers.SerializerMethodField()
+
+    collapsed_fields = {
+        "user": lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+    }
 
     class Meta:
         model = BookReview
@@ -49,12 +90,10 @@ class BookReviewListSerializer(serializers.ModelSerializer):
             "created_at",
         ]
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        representation["user"] = {
+    def get_user(self, instance):
+        return {
             "id": instance.user.id,
             "email": instance.user.email,
             "first_name": instance.user.first_name,
             "last_name": instance.user.last_name,
         }
-        return representation
@@ -1,3 +1,163 @@
-from django.test import TestCase
+import csv
+import io
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db.models import Avg
+from django.test import TestCase, override_settings
+
+from library.models import Book
+from library.tests import IndexTestCase, authenticated_client, create_catalog
+from users.models import User
+from .models import BookReview
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class ListQueryCountTests(TestCase):
+    """Each list runs a fixed number of queries, whatever the page size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.books, cls.librarian = create_catalog()
+
+    def setUp(self):
+        self.client = authenticated_client(self.librarian)
+
+    def assertQueriesPerPage(self, path, queries):
+        for limit in (2, 10):
+            with self.subTest(limit=limit), self.assertNumQueries(queries):
+                response = self.client.get(path, {"limit": limit})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()["data"]), limit)
+
+    def test_reviews(self):
+        # One of them reads the catalog version.
+        self.assertQueriesPerPage("/api/v1/review/", 5)
+
+    def test_book_reviews(self):
+        self.assertQueriesPerPage(f"/api/v1/review/book/{self.books[0].pk}/", 5)
+
+
+class QueryIndexTests(IndexTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.books, cls.librarian = create_catalog(books=3, readers=3)
+        cls.book = cls.books[0]
+        cls.user = cls.book.reviews.first().user
+
+    def test_review_list(self):
+        self.assertUsesIndex(
+            BookReview.objects.filter(is_deleted=False).order_by("-created_at", "-id")[
+                :20
+            ],
+            "reviews_active_created_idx",
+        )
+
+    def test_reviews_of_book(self):
+        self.assertUsesIndex(
+            BookReview.objects.filter(book=self.book, is_deleted=False).order_by(
+                "-created_at", "-id"
+            )[:20],
+            "reviews_book_created_idx",
+        )
+
+    def test_reviews_of_user(self):
+        self.assertUsesIndex(
+            BookReview.objects.filter(user=self.user, is_deleted=False).order_by(
+                "-created_at", "-id"
+            )[:20],
+            "reviews_user_created_idx",
+        )
+
+
+class ReviewExportTests(TestCase):
+    def test_csv_neutralises_formulas(self):
+        books, librarian = create_catalog(books=1, readers=1)
+        comments = ['=HYPERLINK("http://x")', "+1", "-1", "@SUM(A1)", "\tx", "ok"]
+        BookReview.objects.all().delete()
+        BookReview.objects.bulk_create(
+            BookReview(user=librarian, book=books[0], comment=comment)
+            for comment in comments
+        )
+
+        response = authenticated_client(librarian).get(
+            "/api/v1/review/export/", {"format": "csv"}
+        )
+        rows = list(csv.DictReader(io.StringIO(b"".join(response).decode())))
+
+        self.assertEqual(
+            sorted(row["comment"] for row in rows),
+            sorted(
+                ['\'=HYPERLINK("http://x")', "'+1", "'-1", "'@SUM(A1)", "'\tx", "ok"]
+            ),
+        )
+        self.assertEqual({row["rating"] for row in rows}, {"0"})
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class ReviewAggregateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.books, cls.librarian = create_catalog(books=2, readers=2)
+        cls.book = Book.objects.create(title="Unreviewed", quantity=1)
+        cls.readers = list(User.objects.filter(email__startswith="reader"))
+
+    def setUp(self):
+        self.client = authenticated_client(self.librarian)
+
+    def review(self, reader, rating):
+        response = authenticated_client(reader).post(
+            "/api/v1/review/",
+            {"book": self.book.pk, "rating": rating, "comment": "Read it"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return BookReview.objects.filter(book=self.book).latest("pk")
+
+    def assertAggregates(self, book, count, average):
+        book.refresh_from_db()
+        self.assertEqual(book.review_count, count)
+        self.assertAlmostEqual(book.rating_avg, average)
+        live = BookReview.objects.filter(book=book, is_deleted=False)
+        self.assertEqual(live.count(), count)
+        if count:
+            self.assertAlmostEqual(live.aggregate(avg=Avg("rating"))["avg"], average)
+
+    def test_new_reviews_are_counted(self):
+        self.review(self.readers[0], 4)
+        self.assertAggregates(self.book, 1, 4)
+        self.review(self.readers[1], 1)
+        self.assertAggregates(self.book, 2, 2.5)
+
+    def test_soft_deleted_reviews_are_taken_out(self):
+        first = self.review(self.readers[0], 4)
+        second = self.review(self.readers[1], 1)
+
+        response = self.client.delete(f"/api/v1/review/{second.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertAggregates(self.book, 1, 4)
+
+        self.client.delete(f"/api/v1/review/{first.pk}/")
+        self.assertAggregates(self.book, 0, 0)
+
+    def test_deleting_twice_changes_nothing(self):
+        self.review(self.readers[0], 4)
+        review = self.review(self.readers[1], 1)
+        self.client.delete(f"/api/v1/review/{review.pk}/")
+
+        response = self.client.delete(f"/api/v1/review/{review.pk}/")
+        self.assertEqual(response.status_code, 404)
+        # A stale copy loaded before the first delete.
+        self.assertFalse(review.soft_delete())
+        self.assertAggregates(self.book, 1, 4)
+
+    def test_rebuild_fixes_drift(self):
+        self.review(self.readers[0], 5)
+        empty = Book.objects.create(title="Empty", quantity=1)
+        Book.objects.update(review_count=99, rating_avg=1.5)
+
+        call_command("rebuild_review_aggregates", batch_size=1, stdout=io.StringIO())
+
+        self.assertAggregates(self.book, 1, 5)
+        self.assertAggregates(empty, 0, 0)
+        for book in self.books:
+            self.assertAggregates(book, 2, 4)
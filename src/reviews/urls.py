@@ -1,12 +1,19 @@
 from django.urls import path
-from .views import BookReviewAPIView, SpecificBookReviewAPIView
+from .views import (
+    BookReviewAPIView,
+    ReviewDeleteAPIView,
+    ReviewExportAPIView,
+    SpecificBookReviewAPIView,
+)
 
 
 urlpatterns = [
-    path("review/", BookReviewAPIView.as_view(), name="book-api"),
+    path("review/", BookReviewAPIView.as_view(), name="review-api"),
+    path("review/export/", ReviewExportAPIView.as_view(), name="review-export-api"),
     path(
         "review/book/<int:id>/",
         SpecificBookReviewAPIView.as_view(),
-        name="book-detail-api",
+        name="book-review-api",
     ),
+    path("review/<int:id>/", ReviewDeleteAPIView.as_view(), name="review-delete-api"),
 ]
@@ -1,5 +1,7 @@
 from typing import Any
 
+from asgiref.sync import sync_to_async
+from django.db.models import QuerySet
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
@@ -13,19 +15,28 @@ from .serializers import (
     BookReviewSerializer,
 )
 from library.models import Book
-from lms.utils.pagination import CustomPagination
+from lms.permissions import IsAdminOrLibrarian
+from lms.utils.cache import acatalog_version, invalidate_books
+from lms.utils.conditional import aconditional_response, make_etag
+from lms.utils.export import ExportAPIView
+from lms.utils.pagination import apaginated_list_response
 from lms.utils.response import api_response
+from lms.utils.serializers import field_selection
+from lms.utils.views import AsyncAPIView
 
 
-class BookReviewAPIView(APIView):
+class BookReviewAPIView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
         request_body=BookReviewAddSerializer,
     )
-    def post(
+    async def post(
         self: "BookReviewAPIView", request: Request, *args: Any, **kwargs: Any
     ) -> Response:
+        return await sync_to_async(self.create)(request)
+
+    def create(self: "BookReviewAPIView", request: Request) -> Response:
         serializer = BookReviewAddSerializer(
             data=request.data, context={"request": request}
         )
@@ -47,7 +58,7 @@ class BookReviewAPIView(APIView):
             status.HTTP_200_OK: BookReviewSerializer(many=True),
         }
     )
-    def get(
+    async def get(
         self: "BookReviewAPIView", request: Request, *args: Any, **kwargs: Any
     ) -> Response:
         user = request.user
@@ -58,24 +69,31 @@ class BookReviewAPIView(APIView):
             )
         else:
             book_reviews = BookReview.objects.filter(
-                user=user, is_deleted=False
+                user=user.id, is_deleted=False
             ).order_by("-created_at")
-        serializer = BookReviewSerializer(book_reviews, many=True)
-
-        paginator = CustomPagination()
-        page = paginator.paginate_queryset(book_reviews, request)
-
-        if page is not None:
-            return paginator.get_paginated_response(serializer.data)
-
-        return api_response(
-            data=serializer.data,
-            message="Book reviews retrieved successfully",
-            status_code=status.HTTP_200_OK,
+        selection = field_selection(request)
+        book_reviews = BookReviewSerializer.setup_eager_loading(
+            book_reviews, **selection
+        )
+        # Every review and book change bumps the catalog version, and the
+        # stock version covers the stock of the books inlined in reviews.
+        version, stock_version, changed_at = await acatalog_version()
+        return await aconditional_response(
+            request,
+            lambda: apaginated_list_response(
+                request,
+                book_reviews,
+                BookReviewSerializer,
+                message="Book reviews retrieved successfully",
+                context=selection,
+            ),
+            etag=make_etag(request, version, stock_version, user.id, user.role),
+            last_modified=changed_at.timestamp(),
+            public=False,
         )
 
 
-class SpecificBookReviewAPIView(APIView):
+class SpecificBookReviewAPIView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
@@ -83,7 +101,7 @@ class SpecificBookReviewAPIView(APIView):
             status.HTTP_200_OK: BookReviewSerializer,
         }
     )
-    def get(
+    async def get(
         self: "SpecificBookReviewAPIView",
         request: Request,
         id: int,
@@ -91,30 +109,94 @@ class SpecificBookReviewAPIView(APIView):
         **kwargs: Any,
     ) -> Response:
         try:
-            if not Book.objects.filter(id=id, is_deleted=False).exists():
+            # Adding or deleting a review bumps the book's updated_at.
+            updated_at = (
+                await Book.objects.filter(id=id, is_deleted=False)
+                .values_list("updated_at", flat=True)
+                .afirst()
+            )
+            if updated_at is None:
                 return api_response(
                     message="Book not found",
                     status_code=status.HTTP_404_NOT_FOUND,
                 )
 
-            book_reviews = BookReview.objects.filter(
-                book=id, is_deleted=False
-            ).order_by("-created_at")
-            serializer = BookReviewSerializer(book_reviews, many=True)
+            selection = field_selection(request)
+            book_reviews = BookReviewSerializer.setup_eager_loading(
+                BookReview.objects.filter(book=id, is_deleted=False).order_by(
+                    "-created_at"
+                ),
+                **selection,
+            )
+            return await aconditional_response(
+                request,
+                lambda: apaginated_list_response(
+                    request,
+                    book_reviews,
+                    BookReviewSerializer,
+                    message="Book review retrieved successfully",
+                    context=selection,
+                ),
+                etag=make_etag(request, updated_at.isoformat()),
+                last_modified=updated_at.timestamp(),
+                public=False,
+            )
+        except BookReview.DoesNotExist:
+            return api_response(
+                message="Book review not found",
+                status_code=status.HTTP_404_NOT_FOUND,
+            )
 
-            paginator = CustomPagination()
-            page = paginator.paginate_queryset(book_reviews, request)
 
-            if page is not None:
-                return paginator.get_paginated_response(serializer.data)
+class ReviewDeleteAPIView(APIView):
+    permission_classes = [IsAuthenticated]
 
-            return api_response(
-                data=serializer.data,
-                message="Book review retrieved successfully",
-                status_code=status.HTTP_200_OK,
-            )
+    @swagger_auto_schema()
+    def delete(
+        self: "ReviewDeleteAPIView",
+        request: Request,
+        id: int,
+        *args: Any,
+        **kwargs: Any,
+    ) -> Response:
+        user = request.user
+        try:
+            if user.is_superuser or user.role == "librarian":
+                book_review = BookReview.objects.get(id=id, is_deleted=False)
+            else:
+                book_review = BookReview.objects.get(
+                    id=id, user=user.id, is_deleted=False
+                )
         except BookReview.DoesNotExist:
             return api_response(
                 message="Book review not found",
                 status_code=status.HTTP_404_NOT_FOUND,
             )
+
+        if book_review.soft_delete():
+            invalidate_books(book_review.book_id)
+        return api_response(
+            message="Book review deleted successfully",
+            status_code=status.HTTP_200_OK,
+        )
+
+
+class ReviewExportAPIView(ExportAPIView):
+    """Stream all reviews; ``from``/``to`` filter on ``created_at``."""
+
+    permission_classes = [IsAdminOrLibrarian]
+    columns = {
+        "id": "id",
+        "book_id": "book_id",
+        "book_title": "book__title",
+        "user_id": "user_id",
+        "user_email": "user__email",
+        "rating": "rating",
+        "comment": "comment",
+        "created_at": "created_at",
+    }
+    date_field = "created_at"
+    filename = "reviews"
+
+    def get_queryset(self: "ReviewExportAPIView", request: Request) -> QuerySet:
+        return BookReview.objects.filter(is_deleted=False)
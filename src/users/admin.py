@@ -1,4 +1,6 @@
 from django.contrib import admin
 from .models import User
+from lms.utils.admin import CatalogAdmin
 
-admin.site.register(User)
+# Reviews list their authors' names and email.
+admin.site.register(User, CatalogAdmin)
@@ -0,0 +1,86 @@
+import time
+from typing import Dict, Tuple, Union
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import Token
+
+from .models import User
+from .tokens import USER_CLAIMS
+
+_user_rows: Dict[int, Tuple[float, User]] = {}
+
+
+def get_cached_user(user_id: int) -> User:
+    """
+    Load a user row, reusing a copy held by this process for
+    ``USER_CACHE_TTL`` seconds. Raises ``User.DoesNotExist``.
+    """
+    now = time.monotonic()
+    entry = _user_rows.get(user_id)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+
+    user = User.objects.get(pk=user_id)
+    if len(_user_rows) >= settings.USER_CACHE_MAX_ENTRIES:
+        for key, (expires_at, _row) in list(_user_rows.items()):
+            if expires_at <= now:
+                _user_rows.pop(key, None)
+        if len(_user_rows) >= settings.USER_CACHE_MAX_ENTRIES:
+            _user_rows.clear()
+    _user_rows[user_id] = (now + settings.USER_CACHE_TTL, user)
+    return user
+
+
+def forget_user(user_id: int) -> None:
+    _user_rows.pop(user_id, None)
+
+
+class ClaimsUser(TokenUser):
+    """
+    ``request.user`` for requests authenticated by a token that carries the
+    user claims. ``role``, ``is_superuser`` and ``is_active`` come from the
+    token; ``instance`` loads the full row when a view needs it.
+    """
+
+    @cached_property
+    def is_active(self) -> bool:
+        return self.token.get("is_active", True)
+
+    @cached_property
+    def role(self) -> str:
+        return self.token.get("role", User.Roles.USER)
+
+    @cached_property
+    def instance(self) -> User:
+        return get_cached_user(self.id)
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication that trusts the user claims in the token instead of
+    reading the user row on every request. Tokens issued before the claims
+    were added fall back to the cached row.
+    """
+
+    def get_user(self, validated_token: Token) -> Union[ClaimsUser, User]:
+        if not all(claim in validated_token for claim in USER_CLAIMS):
+            return self.get_legacy_user(validated_token)
+
+        user = super().get_user(validated_token)
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+    def get_legacy_user(self, validated_token: Token) -> User:
+        try:
+            user = get_cached_user(validated_token["user_id"])
+        except (KeyError, User.DoesNotExist):
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
@@ -0,0 +1,218 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Server is busy, please retry shortly."
+    default_code = "hashing_unavailable"
+    # Picked up by DRF's exception handler as the Retry-After header.
+    wait = 1
+
+
+def _init_worker() -> None:
+    import django
+
+    django.setup()
+
+
+def _make_password(password: str) -> str:
+    return hashers.make_password(password)
+
+
+def _verify_password(password: str, encoded: str) -> Tuple[bool, bool]:
+    """Return whether ``password`` matches and whether the hash is outdated."""
+    if not encoded or not hashers.is_password_usable(encoded):
+        hashers.make_password(password)
+        return False, False
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return False, False
+
+    preferred = hashers.get_hasher("default")
+    hasher_changed = hasher.algorithm != preferred.algorithm
+    must_update = hasher_changed or preferred.must_update(encoded)
+    is_correct = hasher.verify(password, encoded)
+    if not is_correct and not hasher_changed and must_update:
+        hasher.harden_runtime(password, encoded)
+    return is_correct, must_update
+
+
+class HashingService:
+    """
+    Runs password hashing in a process pool so request threads only wait for
+    the result. At most ``queue_size`` hashes may be pending; further calls
+    fail straight away with ``HashingUnavailable``. ``workers=0`` hashes on
+    the calling thread.
+    """
+
+    def __init__(self, workers: int, queue_size: int, timeout: float) -> None:
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "pending": 0,
+            "completed": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "seconds_total": 0.0,
+            "seconds_max": 0.0,
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    def _reset_executor(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _release(self, future: Any = None) -> None:
+        with self._lock:
+            self._stats["pending"] -= 1
+        self._slots.release()
+
+    def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise HashingUnavailable()
+
+        with self._lock:
+            self._stats["pending"] += 1
+        started = time.perf_counter()
+        try:
+            if self.workers == 0:
+                try:
+                    result = func(*args)
+                finally:
+                    self._release()
+            else:
+                try:
+                    future = self._get_executor().submit(func, *args)
+                except BaseException:
+                    self._release()
+                    raise
+                # Free the slot when the hash finishes, not when the caller
+                # gives up waiting: a timed out hash still occupies a worker.
+                future.add_done_callback(self._release)
+                result = future.result(self.timeout)
+        except BrokenProcessPool:
+            self._reset_executor()
+            raise HashingUnavailable()
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise HashingUnavailable()
+        else:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._stats["completed"] += 1
+                self._stats["seconds_total"] += elapsed
+                self._stats["seconds_max"] = max(self._stats["seconds_max"], elapsed)
+            return result
+
+    def make_password(self, password: Optional[str]) -> str:
+        if password is None:
+            # Unusable password, nothing to hash.
+            return hashers.make_password(None)
+        return self._run(_make_password, password)
+
+    def check_password(
+        self,
+        password: str,
+        encoded: str,
+        setter: Optional[Callable[[str], None]] = None,
+    ) -> bool:
+        """Like ``django.contrib.auth.hashers.check_password``."""
+        if password is None:
+            return False
+        is_correct, must_update = self._run(_verify_password, password, encoded)
+        if is_correct and must_update and setter:
+            setter(password)
+        return is_correct
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and hash latency for this process."""
+        with self._lock:
+            stats = dict(self._stats)
+        completed = stats["completed"]
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "pending": stats["pending"],
+            "completed": completed,
+            "rejected": stats["rejected"],
+            "timeouts": stats["timeouts"],
+            "latency_avg_ms": (
+                round(1000 * stats["seconds_total"] / completed, 2)
+                if completed
+                else 0.0
+            ),
+            "latency_max_ms": round(1000 * stats["seconds_max"], 2),
+        }
+
+
+_service: Optional[HashingService] = None
+_service_lock = threading.Lock()
+
+
+def default_workers() -> int:
+    """
+    ``PASSWORD_HASH_WORKERS``, or else this process' share of the CPU cores:
+    every web worker process starts a hashing pool of its own.
+    """
+    if settings.PASSWORD_HASH_WORKERS is not None:
+        return settings.PASSWORD_HASH_WORKERS
+    return max(1, (os.cpu_count() or 1) // max(1, settings.WEB_CONCURRENCY))
+
+
+def get_hashing_service() -> HashingService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            workers = default_workers()
+            _service = HashingService(
+                workers=workers,
+                queue_size=settings.PASSWORD_HASH_QUEUE_SIZE,
+                timeout=settings.PASSWORD_HASH_TIMEOUT,
+            )
+        return _service
+
+
+def make_password(password: Optional[str]) -> str:
+    return get_hashing_service().make_password(password)
+
+
+def check_password(
+    password: str, encoded: str, setter: Optional[Callable[[str], None]] = None
+) -> bool:
+    return get_hashing_service().check_password(password, encoded, setter)
+
+
+def hashing_stats() -> Dict[str, Any]:
+    return get_hashing_service().stats()
@@ -3,6 +3,7 @@ from typing import Any
 from rest_framework import serializers
 
 from .models import User
+from lms.utils.serializers import CompiledReadMixin, SparseFieldsMixin
 
 
 class UserRegisterSerializer(serializers.ModelSerializer):
@@ -36,18 +37,23 @@ class UserLoginSerializer(serializers.Serializer):
         if not email or not password:
             raise serializers.ValidationError("Email and password are required.")
 
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            raise serializers.ValidationError("User with this email does not exist.")
+        user = User.objects.filter(email=email).first()
+        if user is None:
+            # Hash anyway so that unknown emails cost as much as wrong
+            # passwords and cannot be told apart by response time.
+            User().set_password(password)
+            raise serializers.ValidationError("Invalid email or password.")
 
+        # check_password rehashes with the preferred hasher when needed.
         if not user.check_password(password):
-            raise serializers.ValidationError("Incorrect password.")
+            raise serializers.ValidationError("Invalid email or password.")
 
         return {"user": user}
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(CompiledReadMixin, SparseFieldsMixin, serializers.ModelSerializer):
+    full_name = serializers.SerializerMethodField()
+
     class Meta:
         model = User
         fields = [
@@ -59,19 +65,30 @@ class UserSerializer(serializers.ModelSerializer):
             "phone_number",
             "date_joined",
             "role",
+            "full_name",
         ]
         read_only_fields = ["id", "date_joined"]
 
-    def to_representation(self, instance: User) -> dict[str, Any]:
-        representation = super().to_representation(instance)
-        representation["full_name"] = f"{instance.first_name} {instance.last_name}"
-        return representation
+    def get_full_name(self, instance: User) -> str:
+        return f"{instance.first_name} {instance.last_name}"
+
 
+class UserListSerializer(
+    CompiledReadMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
+    full_name = serializers.SerializerMethodField()
 
-class UserListSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ["id", "email", "first_name", "last_name", "date_joined", "role"]
+        fields = [
+            "id",
+            "email",
+            "first_name",
+            "last_name",
+            "date_joined",
+            "role",
+            "full_name",
+        ]
         read_only_fields = [
             "id",
             "email",
@@ -81,10 +98,8 @@ class UserListSerializer(serializers.ModelSerializer):
             "role",
         ]
 
-    def to_representation(self, instance: User) -> dict[str, Any]:
-        representation = super().to_representation(instance)
-        representation["full_name"] = f"{instance.first_name} {instance.last_name}"
-        return representation
+    def get_full_name(self, instance: User) -> str:
+        return f"{instance.first_name} {instance.last_name}"
 
 
 class UserUpdateSerializer(serializers.ModelSerializer):
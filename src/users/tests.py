@@ -1,3 +1,220 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    get_hasher,
+    identify_hasher,
+    make_password,
+)
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import ClaimsUser, StatelessJWTAuthentication, _user_rows
+from .hashing import (
+    HashingService,
+    HashingUnavailable,
+    default_workers,
+    hashing_stats,
+)
+from .models import User
+from .throttles import LoginIPThrottle
+from .tokens import UserRefreshToken
+from lms.permissions import IsAdminOrLibrarian, IsLibrarianOrReadOnly
+
+
+class LoginIPThrottleTests(TestCase):
+    def cache_key(self, forwarded_for, remote_addr="10.0.0.1"):
+        request = APIRequestFactory().post(
+            "/api/v1/auth/login/",
+            HTTP_X_FORWARDED_FOR=forwarded_for,
+            REMOTE_ADDR=remote_addr,
+        )
+        return LoginIPThrottle().get_cache_key(request, None)
+
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        self.assertEqual(api_settings.NUM_PROXIES, 0)
+        self.assertEqual(self.cache_key("1.1.1.1"), self.cache_key("2.2.2.2"))
+        self.assertNotEqual(
+            self.cache_key("1.1.1.1"), self.cache_key("1.1.1.1", "10.0.0.2")
+        )
+
+    def test_client_address_from_trusted_proxy(self):
+        with override_settings(REST_FRAMEWORK={"NUM_PROXIES": 1}):
+            self.assertEqual(
+                self.cache_key("6.6.6.6, 1.1.1.1"), self.cache_key("1.1.1.1")
+            )
+            self.assertNotEqual(self.cache_key("1.1.1.1"), self.cache_key("2.2.2.2"))
+
+
+class HashingServiceTests(SimpleTestCase):
+    def test_timed_out_hash_keeps_its_slot_until_it_finishes(self):
+        service = HashingService(workers=1, queue_size=1, timeout=0.1)
+        self.addCleanup(service._reset_executor)
+
+        with self.assertRaises(HashingUnavailable):
+            service._run(time.sleep, 1)
+        # The worker is still busy with it, so there is no room for another.
+        with self.assertRaises(HashingUnavailable):
+            service._run(abs, -1)
+        self.assertEqual(service.stats()["rejected"], 1)
+
+        deadline = time.monotonic() + 30
+        while service.stats()["pending"] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(service.stats()["pending"], 0)
+        service.timeout = 30
+        self.assertEqual(service._run(abs, -1), 1)
+
+    def test_default_workers_share_the_cores_between_web_workers(self):
+        cases = [
+            (None, 1, 8, 8),
+            (None, 4, 8, 2),
+            (None, 3, 8, 2),
+            (None, 16, 8, 1),
+            (None, 0, 8, 8),
+            (None, 2, None, 1),
+            (3, 4, 8, 3),
+            (0, 4, 8, 0),
+        ]
+        for workers, web_concurrency, cpus, expected in cases:
+            with self.subTest(
+                workers=workers, web_concurrency=web_concurrency, cpus=cpus
+            ), override_settings(
+                PASSWORD_HASH_WORKERS=workers, WEB_CONCURRENCY=web_concurrency
+            ), mock.patch(
+                "users.hashing.os.cpu_count", return_value=cpus
+            ):
+                self.assertEqual(default_workers(), expected)
+
+
+class StatelessJWTAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create(
+            email="librarian@example.com", role=User.Roles.LIBRARIAN
+        )
+        cls.reader = User.objects.create(email="reader@example.com")
+
+    def setUp(self):
+        _user_rows.clear()
+        self.addCleanup(_user_rows.clear)
+
+    def request(self, token, method="get"):
+        wsgi_request = getattr(APIRequestFactory(), method)(
+            "/", HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+        return Request(wsgi_request, authenticators=[StatelessJWTAuthentication()])
+
+    def claims_token(self, user):
+        return UserRefreshToken.for_user(user).access_token
+
+    def test_claims_answer_permissions_without_queries(self):
+        with self.assertNumQueries(0):
+            librarian = self.request(self.claims_token(self.librarian), "post")
+            reader = self.request(self.claims_token(self.reader), "post")
+
+            self.assertIsInstance(librarian.user, ClaimsUser)
+            self.assertTrue(IsLibrarianOrReadOnly().has_permission(librarian, None))
+            self.assertTrue(IsAdminOrLibrarian().has_permission(librarian, None))
+            self.assertFalse(IsLibrarianOrReadOnly().has_permission(reader, None))
+            self.assertFalse(IsAdminOrLibrarian().has_permission(reader, None))
+
+    def test_token_without_claims_reads_the_user(self):
+        token = AccessToken.for_user(self.librarian)
+        self.assertNotIn("role", token)
+
+        with self.assertNumQueries(1):
+            request = self.request(token, "post")
+            self.assertIsInstance(request.user, User)
+            self.assertTrue(IsLibrarianOrReadOnly().has_permission(request, None))
+        # The row is reused by later requests of this process.
+        with self.assertNumQueries(0):
+            self.assertEqual(self.request(token).user.pk, self.librarian.pk)
+
+    @override_settings(USER_CACHE_TTL=30)
+    def test_deactivated_user_is_rejected_once_the_cache_expires(self):
+        token = AccessToken.for_user(self.reader)
+        with mock.patch("users.authentication.time.monotonic", return_value=1000):
+            self.assertEqual(self.request(token).user.pk, self.reader.pk)
+            User.objects.filter(pk=self.reader.pk).update(is_active=False)
+            # Still within the TTL of the cached row.
+            self.assertEqual(self.request(token).user.pk, self.reader.pk)
+
+        with mock.patch("users.authentication.time.monotonic", return_value=1031):
+            with self.assertRaises(AuthenticationFailed):
+                self.request(token).user
+
+    def test_inactive_claim_is_rejected(self):
+        self.reader.is_active = False
+        token = self.claims_token(self.reader)
+
+        with self.assertNumQueries(0), self.assertRaises(AuthenticationFailed):
+            self.request(token).user
+
+
+class LoginTests(TestCase):
+    password = "correct horse"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="reader@example.com", password=cls.password
+        )
+
+    def setUp(self):
+        caches[settings.THROTTLE_CACHE_ALIAS].clear()
+
+    def login(self, email, password):
+        return self.client.post(
+            "/api/v1/user/login/",
+            {"email": email, "password": password},
+            content_type="application/json",
+        )
+
+    def assertRehashedOnLogin(self, outdated):
+        User.objects.filter(pk=self.user.pk).update(password=outdated)
+
+        self.assertEqual(self.login(self.user.email, self.password).status_code, 200)
+        encoded = User.objects.get(pk=self.user.pk).password
+        self.assertNotEqual(encoded, outdated)
+        self.assertEqual(identify_hasher(encoded).algorithm, "argon2")
+        self.assertFalse(get_hasher("default").must_update(encoded))
+        self.assertEqual(self.login(self.user.email, self.password).status_code, 200)
+
+    def test_cheaper_argon2_parameters_are_upgraded_on_login(self):
+        class CheapArgon2PasswordHasher(Argon2PasswordHasher):
+            time_cost = 1
+            memory_cost = 8192
+
+        hasher = CheapArgon2PasswordHasher()
+        self.assertRehashedOnLogin(hasher.encode(self.password, hasher.salt()))
+
+    def test_pbkdf2_hash_is_upgraded_on_login(self):
+        self.assertRehashedOnLogin(make_password(self.password, hasher="pbkdf2_sha256"))
+
+    def test_wrong_password_keeps_the_outdated_hash(self):
+        outdated = make_password(self.password, hasher="pbkdf2_sha256")
+        User.objects.filter(pk=self.user.pk).update(password=outdated)
+
+        self.assertEqual(self.login(self.user.email, "wrong").status_code, 400)
+        self.assertEqual(User.objects.get(pk=self.user.pk).password, outdated)
+
+    def test_unknown_email_is_hashed_too(self):
+        completed = hashing_stats()["completed"]
+
+        self.assertEqual(self.login("nobody@example.com", "wrong").status_code, 400)
+        self.assertEqual(hashing_stats()["completed"], completed + 1)
+
+    def test_unknown_email_and_wrong_password_get_the_same_error(self):
+        unknown = self.login("nobody@example.com", "wrong")
+        wrong = self.login(self.user.email, "wrong")
+
+        self.assertEqual(unknown.status_code, wrong.status_code)
+        self.assertEqual(unknown.json(), wrong.json())
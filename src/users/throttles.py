@@ -0,0 +1,39 @@
+import hashlib
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.request import Request
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginThrottle(SimpleRateThrottle):
+    """
+    Base for the login throttles. Counters live in the cache named by
+    ``THROTTLE_CACHE_ALIAS`` so they can be shared between workers.
+    """
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE_ALIAS]
+
+
+class LoginIPThrottle(LoginThrottle):
+    scope = "login_ip"
+
+    def get_cache_key(self, request: Request, view) -> Optional[str]:
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": self.get_ident(request),
+        }
+
+
+class LoginAccountThrottle(LoginThrottle):
+    scope = "login_account"
+
+    def get_cache_key(self, request: Request, view) -> Optional[str]:
+        email = request.data.get("email")
+        if not isinstance(email, str) or not email.strip():
+            return None
+        ident = hashlib.sha256(email.strip().lower().encode()).hexdigest()
+        return self.cache_format % {"scope": self.scope, "ident": ident}
@@ -0,0 +1,21 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User
+
+#: User attributes copied into every token so that permission checks can be
+#: answered from the token alone.
+USER_CLAIMS = ("role", "is_superuser", "is_active")
+
+
+class UserRefreshToken(RefreshToken):
+    """
+    Refresh token carrying ``USER_CLAIMS``. Access tokens derived from it
+    through ``access_token`` inherit the same claims.
+    """
+
+    @classmethod
+    def for_user(cls, user: User) -> "UserRefreshToken":
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
@@ -6,6 +6,7 @@ from .views import (
     TokenRefreshView,
     UserListView,
     UserUpdateView,
+    UserExportView,
 )
 
 urlpatterns = [
@@ -13,5 +14,6 @@ urlpatterns = [
     path("user/login/", UserLoginView.as_view(), name="user-login"),
     path("user/<int:id>/", UserUpdateView.as_view(), name="user-update"),
     path("user/all/", UserListView.as_view(), name="user-list"),
+    path("user/export/", UserExportView.as_view(), name="user-export"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token-refresh"),
 ]
@@ -1,13 +1,14 @@
 from typing import Any
 
+from django.db.models import QuerySet
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 
+from .authentication import forget_user
 from .models import User
 from .serializers import (
     UserRegisterSerializer,
@@ -15,9 +16,13 @@ from .serializers import (
     UserListSerializer,
     UserUpdateSerializer,
 )
+from .throttles import LoginAccountThrottle, LoginIPThrottle
+from .tokens import UserRefreshToken
 from lms.permissions import IsAdmin
-from lms.utils.pagination import CustomPagination
+from lms.utils.export import ExportAPIView
+from lms.utils.pagination import paginated_list_response
 from lms.utils.response import api_response
+from lms.utils.serializers import field_selection
 
 
 class UserRegisterView(APIView):
@@ -44,6 +49,7 @@ class UserRegisterView(APIView):
 
 
 class UserLoginView(APIView):
+    throttle_classes = [LoginIPThrottle, LoginAccountThrottle]
 
     @swagger_auto_schema(request_body=UserLoginSerializer)
     def post(
@@ -56,7 +62,7 @@ class UserLoginView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         user = serializer.validated_data["user"]
-        refresh = RefreshToken.for_user(user)
+        refresh = UserRefreshToken.for_user(user)
         return api_response(
             data={
                 "refresh": str(refresh),
@@ -81,6 +87,7 @@ class UserUpdateView(APIView):
             serializer = UserUpdateSerializer(user, data=request.data, partial=True)
             serializer.is_valid(raise_exception=True)
             serializer.save()
+            forget_user(user.id)
 
             return api_response(
                 data=serializer.data,
@@ -110,18 +117,12 @@ class UserListView(APIView):
             users = (
                 User.objects.all().exclude(is_superuser=True).order_by("-date_joined")
             )
-            user_data = UserListSerializer(users, many=True).data
-
-            paginator = CustomPagination()
-            page = paginator.paginate_queryset(user_data, request)
-
-            if page is not None:
-                return paginator.get_paginated_response(user_data)
-
-            return api_response(
-                data=user_data,
+            return paginated_list_response(
+                request,
+                users,
+                UserListSerializer,
                 message="User list retrieved successfully",
-                status_code=status.HTTP_200_OK,
+                context=field_selection(request),
             )
         except Exception as e:
             return api_response(
@@ -130,6 +131,28 @@ class UserListView(APIView):
             )
 
 
+class UserExportView(ExportAPIView):
+    """Stream the user list; ``from``/``to`` filter on ``date_joined``."""
+
+    permission_classes = [IsAdmin]
+    columns = {
+        "id": "id",
+        "email": "email",
+        "first_name": "first_name",
+        "last_name": "last_name",
+        "role": "role",
+        "is_active": "is_active",
+        "address": "address",
+        "phone_number": "phone_number",
+        "date_joined": "date_joined",
+    }
+    date_field = "date_joined"
+    filename = "users"
+
+    def get_queryset(self: "UserExportView", request: Request) -> QuerySet:
+        return User.objects.exclude(is_superuser=True)
+
+
 class TokenRefreshView(APIView):
     @swagger_auto_schema(
         request_body=openapi.Schema(
@@ -147,9 +170,9 @@ class TokenRefreshView(APIView):
         refresh_token = request.data.get("refresh_token")
 
         try:
-            refresh = RefreshToken(refresh_token)
-            user = User.objects.get(id=refresh["user_id"])
-            refresh_token = RefreshToken.for_user(user)
+            refresh = UserRefreshToken(refresh_token)
+            user = User.objects.get(id=refresh["user_id"], is_active=True)
+            refresh_token = UserRefreshToken.for_user(user)
             return api_response(
                 data={
                     "refresh_token": str(refresh_token),